@@ -0,0 +1,41 @@
+"""add stable uid to history
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 00:00:01
+
+"""
+import uuid
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, Sequence[str], None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('history') as batch_op:
+        batch_op.add_column(sa.Column('uid', sa.String(length=36), nullable=True))
+
+    # Backfill existing rows so every history item has a stable id
+    conn = op.get_bind()
+    history = sa.table('history', sa.column('id', sa.Integer), sa.column('uid', sa.String))
+    ids = conn.execute(sa.select(history.c.id).where(history.c.uid.is_(None))).scalars().all()
+    for row_id in ids:
+        conn.execute(history.update().where(history.c.id == row_id).values(uid=str(uuid.uuid4())))
+
+    op.create_index('ix_history_uid', 'history', ['uid'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_history_uid', table_name='history')
+    with op.batch_alter_table('history') as batch_op:
+        batch_op.drop_column('uid')
@@ -0,0 +1,30 @@
+"""composite indexes for dashboard listing
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 00:00:02
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, Sequence[str], None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_history_user_type_created', 'history', ['user_id', 'item_type', 'created_at'])
+    op.create_index('ix_history_user_created_id', 'history', ['user_id', 'created_at', 'id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_history_user_created_id', table_name='history')
+    op.drop_index('ix_history_user_type_created', table_name='history')
@@ -0,0 +1,66 @@
+"""full-text index over history
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 00:00:03
+
+Adds history.search_text, backfills it from existing rows, then builds the
+dialect-specific index defined in backend/fulltext.py (tsvector + GIN on
+PostgreSQL, FTS5 + triggers on SQLite).
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from backend.fulltext import POSTGRES_DDL, POSTGRES_DROP_DDL, SQLITE_DDL, SQLITE_DROP_DDL
+from backend.models import history_search_text
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, Sequence[str], None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('history') as batch_op:
+        batch_op.add_column(sa.Column('search_text', sa.Text(), nullable=True))
+
+    conn = op.get_bind()
+    history = sa.table(
+        'history',
+        sa.column('id', sa.Integer),
+        sa.column('query', sa.Text),
+        sa.column('data', sa.JSON),
+        sa.column('search_text', sa.Text),
+    )
+    rows = conn.execute(sa.select(history.c.id, history.c.query, history.c.data)).all()
+    for row_id, query, data in rows:
+        conn.execute(
+            history.update().where(history.c.id == row_id).values(search_text=history_search_text(query, data))
+        )
+
+    if conn.dialect.name == 'postgresql':
+        for stmt in POSTGRES_DDL:
+            op.execute(stmt)
+    elif conn.dialect.name == 'sqlite':
+        for stmt in SQLITE_DDL:
+            op.execute(stmt)
+        # Index rows that existed before the triggers
+        op.execute("INSERT INTO history_fts(history_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    conn = op.get_bind()
+    if conn.dialect.name == 'postgresql':
+        for stmt in POSTGRES_DROP_DDL:
+            op.execute(stmt)
+    elif conn.dialect.name == 'sqlite':
+        for stmt in SQLITE_DROP_DDL:
+            op.execute(stmt)
+    with op.batch_alter_table('history') as batch_op:
+        batch_op.drop_column('search_text')
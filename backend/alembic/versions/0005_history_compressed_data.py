@@ -0,0 +1,72 @@
+"""compressed history payloads
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 00:00:04
+
+Adds history.data_z for compressed payloads (see backend/compression.py) and
+the compression_dictionaries table, and makes history.data nullable since a
+row now stores its payload in exactly one of the two. Existing rows keep
+their plain JSON; ``python -m backend.compress_history`` moves them over
+while the app is running.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import orjson
+import sqlalchemy as sa
+
+from backend.compression import decompress_json, dictionaries
+from backend.fulltext import SQLITE_DDL
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, Sequence[str], None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'compression_dictionaries',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('codec', sa.String(length=10), nullable=False),
+        sa.Column('data', sa.LargeBinary(), nullable=False),
+        sa.Column('samples', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    with op.batch_alter_table('history') as batch_op:
+        batch_op.add_column(sa.Column('data_z', sa.LargeBinary(), nullable=True))
+        batch_op.alter_column('data', existing_type=sa.JSON(), nullable=True)
+
+    # SQLite rebuilds the table to drop NOT NULL, which drops its FTS triggers
+    if op.get_bind().dialect.name == 'sqlite':
+        for stmt in SQLITE_DDL:
+            op.execute(stmt)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    conn = op.get_bind()
+    for dict_id, codec, data in conn.execute(sa.text('SELECT id, codec, data FROM compression_dictionaries')):
+        dictionaries.add(dict_id, codec, data)
+
+    # Put every compressed payload back into the plain JSON column first
+    history = sa.table('history', sa.column('id', sa.Integer), sa.column('data', sa.JSON), sa.column('data_z', sa.LargeBinary))
+    rows = conn.execute(sa.select(history.c.id, history.c.data_z).where(history.c.data_z.isnot(None))).all()
+    for row_id, blob in rows:
+        conn.execute(
+            history.update().where(history.c.id == row_id)
+            .values(data=orjson.loads(decompress_json(bytes(blob))), data_z=None)
+        )
+
+    with op.batch_alter_table('history') as batch_op:
+        batch_op.alter_column('data', existing_type=sa.JSON(), nullable=False)
+        batch_op.drop_column('data_z')
+    if conn.dialect.name == 'sqlite':
+        for stmt in SQLITE_DDL:
+            op.execute(stmt)
+    op.drop_table('compression_dictionaries')
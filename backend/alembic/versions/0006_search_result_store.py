@@ -0,0 +1,79 @@
+"""deduplicated search results
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 00:00:05
+
+Adds search_results (one row per distinct result, keyed by its digest) and
+history_results (each history row's results by position); see
+backend/result_store.py. Existing rows keep their inline results until
+``python -m backend.dedupe_results`` moves them.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import orjson
+import sqlalchemy as sa
+
+from backend.compression import decompress_json, dictionaries
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, Sequence[str], None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'search_results',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('digest', sa.String(length=64), nullable=False),
+        sa.Column('title', sa.Text(), nullable=True),
+        sa.Column('body', sa.Text(), nullable=True),
+        sa.Column('href', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('digest'),
+    )
+    op.create_table(
+        'history_results',
+        sa.Column('history_id', sa.Integer(), nullable=False),
+        sa.Column('position', sa.Integer(), nullable=False),
+        sa.Column('result_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['history_id'], ['history.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['result_id'], ['search_results.id']),
+        sa.PrimaryKeyConstraint('history_id', 'position'),
+    )
+    op.create_index('ix_history_results_result_id', 'history_results', ['result_id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    conn = op.get_bind()
+    for dict_id, codec, data in conn.execute(sa.text('SELECT id, codec, data FROM compression_dictionaries')):
+        dictionaries.add(dict_id, codec, data)
+
+    # Put linked results back inline, as plain JSON payloads
+    history = sa.table('history', sa.column('id', sa.Integer), sa.column('data', sa.JSON), sa.column('data_z', sa.LargeBinary))
+    links = conn.execute(sa.text(
+        'SELECT l.history_id, r.title, r.body, r.href FROM history_results l '
+        'JOIN search_results r ON r.id = l.result_id ORDER BY l.history_id, l.position'
+    )).all()
+    linked = {}
+    for history_id, title, body, href in links:
+        linked.setdefault(history_id, []).append({"title": title, "body": body, "href": href})
+    for history_id, results in linked.items():
+        data, blob = conn.execute(sa.select(history.c.data, history.c.data_z).where(history.c.id == history_id)).one()
+        if blob is not None:
+            data = orjson.loads(decompress_json(bytes(blob)))
+        conn.execute(
+            history.update().where(history.c.id == history_id)
+            .values(data={"results": results, **(data or {})}, data_z=None)
+        )
+
+    op.drop_index('ix_history_results_result_id', table_name='history_results')
+    op.drop_table('history_results')
+    op.drop_table('search_results')
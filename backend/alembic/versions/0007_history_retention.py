@@ -0,0 +1,80 @@
+"""history retention and partitioning
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 00:00:06
+
+Adds retention_policies (see backend/retention.py). history_results loses
+its foreign key to history in favour of a delete trigger, because on
+PostgreSQL history becomes a table range-partitioned by month on
+created_at (see backend/partitions.py); the existing rows are copied into
+the partitions inside this migration.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from backend.partitions import partition_history, unpartition_history
+from backend.result_store import POSTGRES_LINK_DDL, SQLITE_LINK_DDL
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0007'
+down_revision: Union[str, Sequence[str], None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# SQLite foreign keys are unnamed; batch mode finds this one by convention
+SQLITE_FK = 'fk_history_results_history_id_history'
+NAMING = {"fk": "fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s"}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'retention_policies',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('role', sa.String(length=20), nullable=True),
+        sa.Column('item_type', sa.String(length=20), nullable=True),
+        sa.Column('max_age_days', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(op.f('ix_retention_policies_user_id'), 'retention_policies', ['user_id'], unique=False)
+
+    conn = op.get_bind()
+    if conn.dialect.name == 'sqlite':
+        with op.batch_alter_table('history_results', naming_convention=NAMING) as batch:
+            batch.drop_constraint(SQLITE_FK, type_='foreignkey')
+        for stmt in SQLITE_LINK_DDL:
+            op.execute(stmt)
+    else:
+        op.drop_constraint('history_results_history_id_fkey', 'history_results', type_='foreignkey')
+        for stmt in POSTGRES_LINK_DDL:
+            conn.exec_driver_sql(stmt)
+        partition_history(conn)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    conn = op.get_bind()
+    # Links whose history row is gone would break the foreign key
+    op.execute('DELETE FROM history_results WHERE history_id NOT IN (SELECT id FROM history)')
+    if conn.dialect.name == 'sqlite':
+        op.execute('DROP TRIGGER IF EXISTS history_results_ad')
+        with op.batch_alter_table('history_results', naming_convention=NAMING) as batch:
+            batch.create_foreign_key(SQLITE_FK, 'history', ['history_id'], ['id'], ondelete='CASCADE')
+    else:
+        unpartition_history(conn)
+        op.execute('DROP TRIGGER IF EXISTS history_results_ad ON history')
+        op.execute('DROP FUNCTION IF EXISTS history_results_unlink()')
+        op.create_foreign_key(
+            'history_results_history_id_fkey', 'history_results', 'history',
+            ['history_id'], ['id'], ondelete='CASCADE',
+        )
+
+    op.drop_index(op.f('ix_retention_policies_user_id'), table_name='retention_policies')
+    op.drop_table('retention_policies')
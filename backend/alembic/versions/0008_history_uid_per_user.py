@@ -0,0 +1,51 @@
+"""scope history uid uniqueness to the user
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18 00:00:07
+
+A uid can be the client's X-Request-ID, so one user's id must not block or
+alias another user's row. uid becomes unique per (user_id, uid); a repeated
+uid from the same user is a retried request (see backend/history.py).
+A partitioned PostgreSQL table can't have that unique index, so there the
+pairs are claimed in history_uids instead (see backend/partitions.py).
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+from backend.partitions import claim_uids, is_partitioned, release_uids
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0008'
+down_revision: Union[str, Sequence[str], None] = '0007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _partitioned(conn) -> bool:
+    return conn.dialect.name == 'postgresql' and is_partitioned(conn)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    conn = op.get_bind()
+    op.execute('DROP INDEX IF EXISTS ix_history_uid')
+    # 0007 may already have done this while partitioning
+    if _partitioned(conn):
+        claim_uids(conn)
+    else:
+        op.execute('CREATE UNIQUE INDEX IF NOT EXISTS uq_history_user_uid ON history (user_id, uid)')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Fails if two users hold the same uid; those rows have to be given new ones first
+    conn = op.get_bind()
+    if _partitioned(conn):
+        release_uids(conn)
+        op.execute('CREATE UNIQUE INDEX ix_history_uid ON history (uid, created_at)')
+    else:
+        op.execute('DROP INDEX IF EXISTS uq_history_user_uid')
+        op.execute('CREATE UNIQUE INDEX ix_history_uid ON history (uid)')
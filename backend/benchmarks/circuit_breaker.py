@@ -0,0 +1,90 @@
+# backend/benchmarks/circuit_breaker.py
+"""Fault injection against the MCP circuit breaker.
+
+Runs the app against a stub MCP server whose latency and error rate change
+between phases (healthy -> slow -> failing -> recovered) and reports /search
+latency, which source answered, and the breaker state after each phase. Run
+it once with the breaker on and once with --no-breaker to compare tails.
+
+    python -m backend.benchmarks.circuit_breaker --requests 40 --slow-latency 3
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+
+def _percentile(values, pct):
+    values = sorted(values)
+    return values[max(0, int(round(len(values) * pct)) - 1)] if values else 0.0
+
+
+def _phase(client, headers, name, requests, concurrency):
+    def one(_):
+        start = time.perf_counter()
+        r = client.get("/search", params={"q": f"{name} {uuid.uuid4().hex}"}, headers=headers)
+        return time.perf_counter() - start, r.json().get("search_method", f"http {r.status_code}")
+
+    with ThreadPoolExecutor(concurrency) as pool:
+        outcomes = list(pool.map(one, range(requests)))
+    ms = [t * 1000 for t, _ in outcomes]
+    methods = Counter(m for _, m in outcomes)
+    breaker = client.get("/health").json()["mcp_breakers"]["search"]
+    print(
+        f"{name:10} p50={statistics.median(ms):8.1f}ms p99={_percentile(ms, 0.99):8.1f}ms "
+        f"methods={dict(methods)} breaker={breaker['state']} timeout={breaker['timeout']}s"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=40, help="requests per phase")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--healthy-latency", type=float, default=0.05)
+    parser.add_argument("--slow-latency", type=float, default=3.0)
+    parser.add_argument("--open-seconds", type=float, default=2.0)
+    parser.add_argument("--no-breaker", action="store_true")
+    args = parser.parse_args()
+
+    from backend.benchmarks.stubs import Faults, StubServer, duckduckgo_app, mcp_app
+
+    faults = Faults(latency=args.healthy_latency)
+    with tempfile.TemporaryDirectory() as tmp, \
+            StubServer(mcp_app(faults=faults)) as mcp_stub, \
+            StubServer(duckduckgo_app(0.05)) as ddg_stub:
+        # Settings are read at import time, so configure them before importing the app
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        os.environ["DUCKDUCKGO_API_URL"] = ddg_stub.url
+        os.environ["BCRYPT_ROUNDS"] = "4"
+        # One user sends every request, so per-user rate limits would turn most of them into 429s
+        os.environ["RATE_LIMIT_ENABLED"] = "0"
+        os.environ["SEARCH_CACHE_ENABLED"] = "0"
+        os.environ["MCP_CALL_TIMEOUT"] = "10"
+        os.environ["MCP_BREAKER_OPEN_SECONDS"] = str(args.open_seconds)
+        os.environ["MCP_BREAKER_ENABLED"] = "0" if args.no_breaker else "1"
+        from backend.mcp_clients import search_client
+        search_client.url = search_client.pool.url = mcp_stub.url + "mcp"
+        from backend.main import app
+        import httpx
+
+        with StubServer(app) as api, httpx.Client(base_url=api.url.rstrip("/"), timeout=60) as client:
+            client.post("/auth/register", json={"username": "bench", "email": "bench@example.com", "password": "benchpass"})
+            token = client.post("/auth/login", data={"username": "bench@example.com", "password": "benchpass"}).json()["access_token"]
+            headers = {"Authorization": f"Bearer {token}"}
+
+            _phase(client, headers, "healthy", args.requests, args.concurrency)
+            faults.latency = args.slow_latency
+            _phase(client, headers, "slow", args.requests, args.concurrency)
+            faults.latency, faults.error_rate = args.healthy_latency, 1.0
+            _phase(client, headers, "failing", args.requests, args.concurrency)
+            faults.error_rate = 0.0
+            time.sleep(args.open_seconds)
+            _phase(client, headers, "recovered", args.requests, args.concurrency)
+
+
+if __name__ == "__main__":
+    main()
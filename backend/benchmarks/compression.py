@@ -0,0 +1,83 @@
+# backend/benchmarks/compression.py
+"""History payload compression: size and speed per codec, with and without a dictionary.
+
+Builds --rows synthetic search payloads (distinct titles, bodies and URLs
+around the shared keys and boilerplate), trains a dictionary on the first
+--samples of them the way ``backend.compress_history`` does, and measures
+the rest: stored bytes against compact JSON, and encode/decode throughput.
+zstd rows are skipped unless the zstandard package is installed.
+
+    python -m backend.benchmarks.compression [--rows 2000] [--results 10]
+"""
+import argparse
+import random
+import string
+import time
+
+import orjson
+
+
+def _vocabulary(rng: random.Random, size: int = 5000) -> list:
+    return ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(2, 10))) for _ in range(size)]
+
+
+def _payload(rng: random.Random, vocabulary: list, results: int) -> dict:
+    # Word frequencies follow a rough Zipf curve, like real text
+    weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+
+    def words(n):
+        return " ".join(rng.choices(vocabulary, weights, k=n))
+
+    return {
+        "results": [
+            {"title": words(5).title(), "body": words(30), "href": f"https://{words(1)}.com/{words(2).replace(' ', '/')}"}
+            for _ in range(results)
+        ],
+        "search_method": "mcp",
+        "cache_hit": False,
+        "query_metadata": {"max_results": results, "results_count": results},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--results", type=int, default=10, help="search results per payload")
+    parser.add_argument("--samples", type=int, default=500, help="payloads the dictionary is trained on")
+    args = parser.parse_args()
+
+    from backend import compression
+
+    rng = random.Random(0)
+    vocabulary = _vocabulary(rng)
+    payloads = [orjson.dumps(_payload(rng, vocabulary, args.results)) for _ in range(args.rows)]
+    training, rows = payloads[:args.samples], payloads[args.samples:]
+    raw_bytes = sum(map(len, rows))
+    print(f"{len(rows)} payloads, {raw_bytes / len(rows):.0f} bytes of compact JSON each")
+
+    codecs = ["zlib"]
+    try:
+        compression._zstd()
+        codecs.append("zstd")
+    except RuntimeError:
+        print("(zstandard is not installed, skipping zstd)")
+
+    for codec in codecs:
+        compression.dictionaries.add(len(compression.dictionaries) + 1, codec, compression.train_dictionary(training, codec))
+        for dict_id in (0, len(compression.dictionaries)):
+            start = time.perf_counter()
+            blobs = [compression.compress_json(raw, codec, dict_id) for raw in rows]
+            encode = time.perf_counter() - start
+            start = time.perf_counter()
+            assert [compression.decompress_json(blob) for blob in blobs] == rows
+            decode = time.perf_counter() - start
+            stored = sum(map(len, blobs))
+            label = f"{codec}{' + dictionary' if dict_id else ''}"
+            print(
+                f"  {label:18} {stored / len(rows):6.0f} bytes/row  ratio {raw_bytes / stored:4.1f}x"
+                f"  encode {raw_bytes / encode / 1024 / 1024:6.1f} MiB/s  decode {raw_bytes / decode / 1024 / 1024:6.1f} MiB/s"
+            )
+
+
+if __name__ == "__main__":
+    main()
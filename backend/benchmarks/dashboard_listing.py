@@ -0,0 +1,133 @@
+# backend/benchmarks/dashboard_listing.py
+"""Compare the legacy full-table dashboard listing with keyset pagination.
+
+Seeds --rows history rows for one user into a throwaway SQLite database, then
+times the old behaviour (every row with its data, ordered by created_at) next
+to the paginated endpoint: first page, first page without data, and a page
+reached by following cursors.
+
+    python -m backend.benchmarks.dashboard_listing --rows 100000
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+
+def _payload(i: int) -> dict:
+    return {
+        "results": [
+            {"title": f"Result {i}-{k}", "body": "lorem ipsum dolor sit amet " * 4, "href": f"https://example.com/{i}/{k}"}
+            for k in range(5)
+        ],
+        "search_method": "mcp",
+        "query_metadata": {"max_results": 5, "results_count": 5},
+    }
+
+
+async def _seed(rows: int) -> int:
+    from sqlalchemy import insert
+    from backend.database import SessionLocal, init_db
+    from backend.models import HistoryItem, User
+
+    await init_db()
+    async with SessionLocal() as db:
+        user = User(username="bench", email="bench@example.com", hashed_password="x")
+        db.add(user)
+        await db.commit()
+        start = datetime.utcnow() - timedelta(days=365)
+        batch = []
+        for i in range(rows):
+            batch.append({
+                "item_type": random.choice(("search", "image")),
+                "query": f"query number {i}",
+                "data": _payload(i),
+                "created_at": start + timedelta(seconds=i * 300),
+                "user_id": user.id,
+            })
+            if len(batch) == 5000:
+                await db.execute(insert(HistoryItem), batch)
+                batch = []
+        if batch:
+            await db.execute(insert(HistoryItem), batch)
+        await db.commit()
+        return user.id
+
+
+def _add_legacy_route(app):
+    """The pre-pagination endpoint, kept here only for comparison"""
+    from fastapi import Depends
+    from sqlalchemy import select
+    from backend.database import get_db
+    from backend.models import HistoryItem
+    from backend.utils import decode_token, oauth2_scheme
+
+    @app.get("/_legacy/dashboard")
+    async def legacy_list_items(db=Depends(get_db), token: str = Depends(oauth2_scheme)):
+        user_id = int(decode_token(token))
+        qry = select(HistoryItem).where(HistoryItem.user_id == user_id)
+        items = (await db.scalars(qry.order_by(HistoryItem.created_at.desc()))).all()
+        return {"items": items}
+
+
+async def _time(client, url, headers, repeat):
+    timings, size = [], 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        r = await client.get(url, headers=headers)
+        timings.append((time.perf_counter() - start) * 1000)
+        r.raise_for_status()
+        size = len(r.content)
+    return statistics.median(timings), size
+
+
+async def _run(rows: int, repeat: int, depth: int):
+    import httpx
+    from backend.main import app
+    from backend.utils import create_access_token
+
+    t0 = time.perf_counter()
+    user_id = await _seed(rows)
+    print(f"seeded {rows} rows in {time.perf_counter() - t0:.1f}s")
+    _add_legacy_route(app)
+    headers = {"Authorization": f"Bearer {create_access_token(str(user_id))}"}
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        # Follow cursors to find a deep page
+        cursor = None
+        for _ in range(depth):
+            r = await client.get("/dashboard", params={"include_data": "false", **({"cursor": cursor} if cursor else {})}, headers=headers)
+            cursor = r.json()["next_cursor"]
+
+        cases = [
+            ("legacy: all rows with data", "/_legacy/dashboard", max(1, repeat // 5)),
+            ("keyset: first page", "/dashboard", repeat),
+            ("keyset: first page, light", "/dashboard?include_data=false", repeat),
+            (f"keyset: page {depth + 1}", f"/dashboard?cursor={cursor}", repeat),
+        ]
+        print(f"{'case':32} {'median ms':>10} {'bytes':>12}")
+        for name, url, n in cases:
+            ms, size = await _time(client, url, headers, n)
+            print(f"{name:32} {ms:10.1f} {size:12d}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--depth", type=int, default=100, help="pages to follow for the deep-page case")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # database.py reads DATABASE_URL at import time, so set it before importing the app
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        asyncio.run(_run(args.rows, args.repeat, args.depth))
+
+
+if __name__ == "__main__":
+    main()
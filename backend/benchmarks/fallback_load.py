@@ -0,0 +1,67 @@
+# backend/benchmarks/fallback_load.py
+"""Event-loop responsiveness while the DuckDuckGo fallback is slow.
+
+Starts a local DuckDuckGo stub that answers after --latency seconds, fires
+--concurrency fallback searches at once and, in parallel, a ticker that
+wakes every 10 ms and records how late it was. With the async pooled client
+the ticker lag stays in the low milliseconds; a blocking client would show
+lag on the order of latency * concurrency.
+
+    python -m backend.benchmarks.fallback_load --latency 1.0 --concurrency 50
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+
+async def _ticker(stop: asyncio.Event, lags: list, interval: float = 0.01):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - start - interval)
+
+
+async def _run(url: str, concurrency: int):
+    from backend.mcp_clients import fallbacks
+
+    fallbacks.DUCKDUCKGO_API_URL = url
+    await fallbacks.init_http_client()
+    stop = asyncio.Event()
+    lags: list = []
+    ticker = asyncio.create_task(_ticker(stop, lags))
+    start = time.perf_counter()
+    results = await asyncio.gather(
+        *(fallbacks.fallback_search(f"query {i}", 5) for i in range(concurrency)),
+        return_exceptions=True,
+    )
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await ticker
+    await fallbacks.close_http_client()
+    return results, elapsed, lags
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency", type=float, default=1.0, help="stub response delay (s)")
+    parser.add_argument("--concurrency", type=int, default=50, help="simultaneous searches")
+    args = parser.parse_args()
+
+    from backend.benchmarks.stubs import StubServer, duckduckgo_app
+
+    with StubServer(duckduckgo_app(latency=args.latency)) as stub:
+        results, elapsed, lags = asyncio.run(_run(stub.url, args.concurrency))
+
+    errors = [r for r in results if isinstance(r, Exception)]
+    lags_ms = sorted(l * 1000 for l in lags) or [0.0]
+    print(f"searches:      {len(results)} ({len(errors)} errors)")
+    print(f"wall time:     {elapsed:.2f}s (stub latency {args.latency:.2f}s)")
+    print(f"ticker lag:    p50={statistics.median(lags_ms):.1f}ms "
+          f"p99={lags_ms[int(len(lags_ms) * 0.99) - 1]:.1f}ms max={lags_ms[-1]:.1f}ms")
+    if errors:
+        print(f"first error:   {errors[0]!r}")
+
+
+if __name__ == "__main__":
+    main()
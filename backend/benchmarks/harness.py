@@ -0,0 +1,278 @@
+# backend/benchmarks/harness.py
+"""End-to-end load test for /search, /image, /dashboard and /auth/login.
+
+Starts local stand-ins for the MCP streamable-HTTP servers, the DuckDuckGo
+API and Pollinations (each with configurable latency and error rate), runs
+the app under uvicorn in a subprocess against a fresh SQLite database, and
+drives concurrent traffic from several users. Each scenario reports
+throughput, error rate and p50/p95/p99 latency.
+
+Results can be saved as a named baseline and later runs compared against
+it; the comparison exits non-zero when throughput drops or p95 grows by
+more than --threshold, so it can gate CI.
+
+    python -m backend.benchmarks.harness --save main
+    python -m backend.benchmarks.harness --compare main
+    python -m backend.benchmarks.harness --scenarios search --mcp-latency 0.5 --mcp-error-rate 0.2
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+SCENARIOS = ("search", "image", "dashboard", "login")
+BASELINE_DIR = os.path.join(os.path.dirname(__file__), "baselines")
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+WORDS = (
+    "python async rust typing database index cache latency queue stream "
+    "image sunset city forest ocean mountain robot galaxy portrait painting"
+).split()
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    values = sorted(values)
+    return values[max(0, int(round(len(values) * pct)) - 1)] if values else 0.0
+
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> Dict[str, float]:
+    total = len(latencies) + errors
+    ms = [l * 1000 for l in latencies]
+    return {
+        "requests": total,
+        "errors": errors,
+        "error_rate": round(errors / total, 4) if total else 0.0,
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(_percentile(ms, 0.50), 2),
+        "p95_ms": round(_percentile(ms, 0.95), 2),
+        "p99_ms": round(_percentile(ms, 0.99), 2),
+    }
+
+
+class Traffic:
+    """Request generators for each scenario; ``repeat`` is the share of repeated queries"""
+
+    def __init__(self, users: List[Tuple[str, str]], tokens: List[str], repeat: float):
+        self.users = users
+        self.tokens = tokens
+        self.repeat = repeat
+        self.recent: List[str] = []
+
+    def _text(self, words: int) -> str:
+        if self.recent and random.random() < self.repeat:
+            return random.choice(self.recent)
+        text = " ".join(random.choice(WORDS) for _ in range(words)) + f" {random.randrange(10 ** 6)}"
+        self.recent = (self.recent + [text])[-50:]
+        return text
+
+    def _auth(self) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {random.choice(self.tokens)}"}
+
+    async def search(self, client):
+        return await client.get("/search", params={"q": self._text(3)}, headers=self._auth())
+
+    async def image(self, client):
+        return await client.post("/image", json={"prompt": self._text(5)}, headers=self._auth())
+
+    async def dashboard(self, client):
+        return await client.get("/dashboard", params={"limit": 50}, headers=self._auth())
+
+    async def login(self, client):
+        email, password = random.choice(self.users)
+        return await client.post("/auth/login", data={"username": email, "password": password})
+
+
+async def run_scenario(client, request, requests: int, concurrency: int) -> Dict[str, float]:
+    latencies: List[float] = []
+    errors = 0
+    remaining = requests
+
+    async def worker():
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            start = time.perf_counter()
+            try:
+                r = await request(client)
+                ok = r.status_code < 400
+            except Exception:
+                ok = False
+            if ok:
+                latencies.append(time.perf_counter() - start)
+            else:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - start)
+
+
+async def drive(base_url: str, args) -> Dict[str, Dict[str, float]]:
+    import httpx
+
+    limits = httpx.Limits(max_connections=args.concurrency * 2)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client:
+        users, tokens = [], []
+        for i in range(args.users):
+            email, password = f"bench{i}@example.com", "benchpass"
+            await client.post("/auth/register", json={"username": f"bench{i}", "email": email, "password": password})
+            r = await client.post("/auth/login", data={"username": email, "password": password})
+            r.raise_for_status()
+            users.append((email, password))
+            tokens.append(r.json()["access_token"])
+        traffic = Traffic(users, tokens, args.repeat)
+
+        # Seed history so /dashboard pages over real rows
+        await run_scenario(client, traffic.search, args.users * 20, args.concurrency)
+
+        results = {}
+        for name in args.scenarios:
+            await run_scenario(client, getattr(traffic, name), min(args.warmup, args.requests), args.concurrency)
+            results[name] = await run_scenario(client, getattr(traffic, name), args.requests, args.concurrency)
+            print(format_row(name, results[name]), flush=True)
+        return results
+
+
+def format_row(name: str, r: Dict[str, float]) -> str:
+    return (
+        f"{name:10} {r['throughput_rps']:8.1f} req/s  p50={r['p50_ms']:8.1f}ms  "
+        f"p95={r['p95_ms']:8.1f}ms  p99={r['p99_ms']:8.1f}ms  errors={r['errors']}/{r['requests']}"
+    )
+
+
+def compare(results: Dict, baseline: Dict, threshold: float) -> bool:
+    """Print deltas against a baseline; True when any scenario regressed past threshold"""
+    regressed = False
+    print(f"\nvs baseline '{baseline['name']}' ({baseline['created_at']}):")
+    for name, r in results.items():
+        base = baseline["results"].get(name)
+        if base is None:
+            continue
+        rps = (r["throughput_rps"] - base["throughput_rps"]) / base["throughput_rps"] if base["throughput_rps"] else 0.0
+        p95 = (r["p95_ms"] - base["p95_ms"]) / base["p95_ms"] if base["p95_ms"] else 0.0
+        bad = rps < -threshold or p95 > threshold
+        regressed = regressed or bad
+        print(f"{name:10} throughput {rps:+7.1%}  p95 {p95:+7.1%}  {'REGRESSION' if bad else 'ok'}")
+    return regressed
+
+
+class App:
+    """The API under uvicorn in a subprocess, so load generation doesn't share its GIL"""
+
+    def __init__(self, env: Dict[str, str]):
+        from backend.benchmarks.stubs import free_port
+
+        self.port = free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        self.env = {**os.environ, **env}
+        self.proc = None
+
+    def __enter__(self):
+        import httpx
+
+        self.proc = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "backend.main:app", "--port", str(self.port), "--log-level", "warning"],
+            cwd=REPO_ROOT, env=self.env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        deadline = time.monotonic() + 60
+        while time.monotonic() < deadline:
+            try:
+                # /ready rather than /health, so MCP warm-up isn't counted against the first scenario
+                if httpx.get(f"{self.url}/ready", timeout=1).status_code == 200:
+                    return self
+            except httpx.HTTPError:
+                pass
+            if self.proc.poll() is not None:
+                break
+            time.sleep(0.2)
+        self.__exit__()
+        raise RuntimeError("API failed to start; rerun without the harness to see its logs")
+
+    def __exit__(self, *exc):
+        if self.proc is not None and self.proc.poll() is None:
+            self.proc.terminate()
+            try:
+                self.proc.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                self.proc.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=500, help="measured requests per scenario")
+    parser.add_argument("--warmup", type=int, default=50, help="unmeasured requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--users", type=int, default=8)
+    parser.add_argument("--repeat", type=float, default=0.3, help="share of repeated queries/prompts")
+    parser.add_argument("--mcp-latency", type=float, default=0.2)
+    parser.add_argument("--mcp-error-rate", type=float, default=0.0)
+    parser.add_argument("--mcp-inline-images", action="store_true", help="image tool returns base64 bytes")
+    parser.add_argument("--ddg-latency", type=float, default=0.1)
+    parser.add_argument("--ddg-error-rate", type=float, default=0.0)
+    parser.add_argument("--pollinations-latency", type=float, default=0.3)
+    parser.add_argument("--pollinations-error-rate", type=float, default=0.0)
+    parser.add_argument("--bcrypt-rounds", type=int, default=None, help="defaults to the app's BCRYPT_ROUNDS")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="extra app settings")
+    parser.add_argument("--save", metavar="NAME", help="save results as baselines/NAME.json")
+    parser.add_argument("--compare", metavar="NAME", help="compare against baselines/NAME.json")
+    parser.add_argument("--threshold", type=float, default=0.15, help="allowed relative regression")
+    args = parser.parse_args()
+
+    from backend.benchmarks.stubs import Faults, StubServer, duckduckgo_app, mcp_app, pollinations_app
+
+    faults = Faults(args.mcp_latency, args.mcp_error_rate)
+    with tempfile.TemporaryDirectory() as tmp, \
+            StubServer(mcp_app(faults=faults, inline_images=args.mcp_inline_images)) as mcp_stub, \
+            StubServer(duckduckgo_app(args.ddg_latency, args.ddg_error_rate)) as ddg_stub, \
+            StubServer(pollinations_app(args.pollinations_latency, args.pollinations_error_rate)) as pollinations_stub:
+        env = {
+            "DATABASE_URL": f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+            "BLOB_STORE_DIR": os.path.join(tmp, "blobs"),
+            "MCP_SEARCH_URL": mcp_stub.url + "mcp",
+            "MCP_IMAGE_URL": mcp_stub.url + "mcp",
+            "DUCKDUCKGO_API_URL": ddg_stub.url,
+            "POLLINATIONS_API_URL": pollinations_stub.url,
+            # A handful of users drive all the load, so per-user limits would cap it; --env re-enables them
+            "RATE_LIMIT_ENABLED": "0",
+        }
+        if args.bcrypt_rounds is not None:
+            env["BCRYPT_ROUNDS"] = str(args.bcrypt_rounds)
+        env.update(kv.split("=", 1) for kv in args.env)
+
+        with App(env) as app:
+            results = asyncio.run(drive(app.url, args))
+
+    record = {
+        "name": args.save or "latest",
+        "created_at": datetime.utcnow().isoformat() + "Z",
+        "machine": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+        "config": {k: v for k, v in vars(args).items() if k not in ("save", "compare")},
+        "results": results,
+    }
+    if args.save:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        path = os.path.join(BASELINE_DIR, f"{args.save}.json")
+        with open(path, "w") as f:
+            json.dump(record, f, indent=2)
+        print(f"\nSaved baseline to {path}")
+    if args.compare:
+        with open(os.path.join(BASELINE_DIR, f"{args.compare}.json")) as f:
+            baseline = json.load(f)
+        ignored = ("scenarios", "threshold")
+        if any(baseline["config"].get(k) != v for k, v in record["config"].items() if k not in ignored):
+            print("\nnote: baseline was recorded with different settings")
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
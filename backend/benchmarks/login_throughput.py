@@ -0,0 +1,75 @@
+# backend/benchmarks/login_throughput.py
+"""Logins per second through /auth/login at different password-pool sizes.
+
+Registers one user in a throwaway SQLite database, then for each pool size
+drives --concurrency concurrent logins for --duration seconds and reports
+throughput, latency and how many requests were shed with 503.
+
+    python -m backend.benchmarks.login_throughput --sizes 1 2 4 8 --rounds 10
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+
+async def _drive(client, duration: float, concurrency: int):
+    form = {"username": "bench@example.com", "password": "benchpass"}
+    latencies, statuses = [], {}
+    deadline = time.perf_counter() + duration
+
+    async def worker():
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            r = await client.post("/auth/login", data=form)
+            latencies.append(time.perf_counter() - start)
+            statuses[r.status_code] = statuses.get(r.status_code, 0) + 1
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, statuses
+
+
+async def _run(sizes, duration: float, concurrency: int, queue_limit: int):
+    import httpx
+    from backend.database import init_db
+    from backend.main import app
+    from backend import utils
+
+    await init_db()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        r = await client.post("/auth/register", json={
+            "username": "bench", "email": "bench@example.com", "password": "benchpass",
+        })
+        r.raise_for_status()
+        print(f"bcrypt rounds {utils.BCRYPT_ROUNDS}, concurrency {concurrency}, queue limit {queue_limit}")
+        print(f"{'pool':>5} {'logins/s':>10} {'p50 ms':>9} {'p99 ms':>9} {'503s':>6}")
+        for size in sizes:
+            utils.configure_password_pool(size, queue_limit)
+            latencies, statuses = await _drive(client, duration, concurrency)
+            ok = statuses.get(200, 0)
+            ms = sorted(l * 1000 for l in latencies) or [0.0]
+            print(f"{size:5d} {ok / duration:10.1f} {statistics.median(ms):9.1f} "
+                  f"{ms[max(0, int(len(ms) * 0.99) - 1)]:9.1f} {statuses.get(503, 0):6d}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--rounds", type=int, default=10, help="bcrypt cost for the run")
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds per pool size")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--queue-limit", type=int, default=64)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # database.py and utils.py read their settings at import time
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        os.environ["BCRYPT_ROUNDS"] = str(args.rounds)
+        asyncio.run(_run(args.sizes, args.duration, args.concurrency, args.queue_limit))
+
+
+if __name__ == "__main__":
+    main()
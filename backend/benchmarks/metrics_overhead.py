@@ -0,0 +1,58 @@
+# backend/benchmarks/metrics_overhead.py
+"""Per-request cost of the metrics middleware and stage timers.
+
+Drives a trivial ASGI endpoint directly (no sockets) with and without
+MetricsMiddleware, and times bare stage_timer blocks, so the numbers are
+the instrumentation overhead alone.
+
+    python -m backend.benchmarks.metrics_overhead --requests 20000
+"""
+import argparse
+import asyncio
+import time
+
+
+async def _drive(app, requests: int) -> float:
+    scope = {"type": "http", "method": "GET", "path": "/ping", "headers": [], "query_string": b""}
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    start = time.perf_counter()
+    for _ in range(requests):
+        await app(dict(scope), receive, send)
+    return (time.perf_counter() - start) / requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args()
+
+    from backend.metrics import MetricsMiddleware, render_metrics, stage_timer
+
+    async def endpoint(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    bare = asyncio.run(_drive(endpoint, args.requests))
+    wrapped = asyncio.run(_drive(MetricsMiddleware(endpoint), args.requests))
+    print(f"bare endpoint        {bare * 1e6:7.2f}us/request")
+    print(f"with middleware      {wrapped * 1e6:7.2f}us/request  (+{(wrapped - bare) * 1e6:.2f}us)")
+
+    start = time.perf_counter()
+    for _ in range(args.requests):
+        with stage_timer("bench", "noop"):
+            pass
+    print(f"stage_timer block    {(time.perf_counter() - start) / args.requests * 1e6:7.2f}us")
+
+    start = time.perf_counter()
+    body = render_metrics()
+    print(f"/metrics render      {(time.perf_counter() - start) * 1e3:7.2f}ms for {len(body)} bytes")
+
+
+if __name__ == "__main__":
+    main()
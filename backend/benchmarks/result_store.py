@@ -0,0 +1,136 @@
+# backend/benchmarks/result_store.py
+"""Storage and write cost of search history with and without the shared result store.
+
+Simulates --users users running --searches searches each, drawn from a pool
+of --queries queries with a long-tailed popularity (so many users repeat the
+same searches, as on the real site). Every query returns --results results
+from a shared pool of URLs. The searches are saved through
+``save_history_batch`` in batches of --batch into a throwaway SQLite
+database, once with results inline in each payload (SEARCH_RESULT_STORE=0)
+and once through the result store, and reports:
+
+- database file size, and the payload bytes in ``history``
+- rows written across history, search_results and history_results
+- write time, and read time per row with results put back in
+
+    python -m backend.benchmarks.result_store [--users 200] [--searches 50]
+"""
+import argparse
+import asyncio
+import os
+import random
+import string
+import tempfile
+import time
+
+
+def _pool(rng: random.Random, n: int, words: int) -> list:
+    return [" ".join("".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 9))) for _ in range(words)) for _ in range(n)]
+
+
+def _searches(args) -> list:
+    rng = random.Random(0)
+    titles, bodies = _pool(rng, args.urls, 6), _pool(rng, args.urls, 30)
+    results = [
+        {"title": titles[i], "body": bodies[i], "href": f"https://example.com/{i}/{titles[i].split()[0]}"}
+        for i in range(args.urls)
+    ]
+    url_weights = [1 / (i + 1) for i in range(args.urls)]
+    queries = [(f"query {q}", rng.choices(results, url_weights, k=args.results)) for q in range(args.queries)]
+    query_weights = [1 / (i + 1) for i in range(args.queries)]
+    return [rng.choices(queries, query_weights, k=args.searches) for _ in range(args.users)]
+
+
+async def _run(db_path: str, store: bool, per_user: list, batch: int) -> dict:
+    from sqlalchemy import func, select, text
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+    from backend import result_store
+    from backend.database import Base, to_async_url
+    from backend.history import save_history_batch
+    from backend.models import HistoryItem, HistoryResult, SearchResult, User
+    from backend.routers.dashboard import RAW_DATA, with_raw_payloads
+
+    result_store.SEARCH_RESULT_STORE = store
+    engine = create_async_engine(to_async_url(f"sqlite:///{db_path}"))
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    sessions = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async with sessions() as db:
+        users = [User(username=f"user{i}", email=f"user{i}@example.com", hashed_password="x") for i in range(len(per_user))]
+        db.add_all(users)
+        await db.commit()
+
+        start = time.perf_counter()
+        for user, searches in zip(users, per_user):
+            for i in range(0, len(searches), batch):
+                rows = [
+                    (q, {"results": results, "search_method": "mcp", "cache_hit": False,
+                         "query_metadata": {"max_results": len(results), "results_count": len(results)}})
+                    for q, results in searches[i:i + batch]
+                ]
+                saved = await save_history_batch(db, user.id, "search", rows)
+                assert all(s.id is not None for s in saved)
+        write = time.perf_counter() - start
+
+        start = time.perf_counter()
+        result = await db.execute(select(HistoryItem.id, *RAW_DATA).order_by(HistoryItem.id))
+        keys, rows = await with_raw_payloads(db, list(result.keys()), result.all())
+        read = time.perf_counter() - start
+
+        stats = {
+            "write": write,
+            "read": read,
+            "payload_bytes": await db.scalar(select(
+                func.coalesce(func.sum(func.length(text("data"))), 0) + func.coalesce(func.sum(func.length(text("data_z"))), 0)
+            ).select_from(HistoryItem)),
+            "rows": sum([
+                await db.scalar(select(func.count()).select_from(model))
+                for model in (HistoryItem, SearchResult, HistoryResult)
+            ]),
+            "results": await db.scalar(select(func.count()).select_from(SearchResult)),
+            "check": [row[-1] if isinstance(row[-1], bytes) else row[-1].encode() for row in rows],
+        }
+    await engine.dispose()
+    stats["file_bytes"] = os.path.getsize(db_path)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--searches", type=int, default=50, help="searches per user")
+    parser.add_argument("--queries", type=int, default=1000, help="distinct queries")
+    parser.add_argument("--urls", type=int, default=5000, help="distinct result URLs")
+    parser.add_argument("--results", type=int, default=10, help="results per search")
+    parser.add_argument("--batch", type=int, default=10, help="searches saved per transaction")
+    args = parser.parse_args()
+
+    import orjson
+
+    per_user = _searches(args)
+    total = args.users * args.searches
+    print(f"{total} searches by {args.users} users over {args.queries} queries, {args.results} results each")
+    runs = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, store in (("inline", False), ("result store", True)):
+            runs[label] = stats = asyncio.run(_run(os.path.join(tmp, f"{label}.db"), store, per_user, args.batch))
+            print(
+                f"  {label:13} file {stats['file_bytes'] / 1024 / 1024:7.1f} MiB"
+                f"  payloads {stats['payload_bytes'] / 1024 / 1024:7.1f} MiB"
+                f"  rows {stats['rows']:8}  distinct results {stats['results']:6}"
+                f"  write {total / stats['write']:5.0f} searches/s  read {stats['read'] / total * 1e6:4.0f}us/row"
+            )
+
+    # Both layouts must read back the same documents
+    assert [orjson.loads(p) for p in runs["inline"]["check"]] == [orjson.loads(p) for p in runs["result store"]["check"]]
+    inline, shared = runs["inline"], runs["result store"]
+    print(
+        f"  payloads x{inline['payload_bytes'] / shared['payload_bytes']:.1f} smaller, file x{inline['file_bytes'] / shared['file_bytes']:.2f}"
+        " (most of the rest is history.search_text and its full-text index)"
+    )
+
+
+if __name__ == "__main__":
+    main()
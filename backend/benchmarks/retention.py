@@ -0,0 +1,121 @@
+# backend/benchmarks/retention.py
+"""Retention purge cost on SQLite per batch size.
+
+Fills a throwaway SQLite database (incremental auto-vacuum on, full-text
+triggers as in production) with --rows history rows, --expired of them
+older than the retention policy, then runs one purge pass of
+``HistoryPurger`` per --batch-sizes entry, and reports:
+
+- purge throughput in deleted rows/s
+- the longest single DELETE, i.e. the longest other writers wait for the lock
+- database file size before the purge and after compaction
+
+Batch size 0 is the baseline: one ``DELETE ... WHERE created_at < cutoff``
+over the whole table, with no batching and no compaction.
+
+    python -m backend.benchmarks.retention [--rows 50000] [--batch-sizes 0 100 500 2000]
+"""
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+
+def _fill(db_path: str, rows: int, expired: float):
+    rng = random.Random(0)
+    words = [f"w{i}" for i in range(5000)]
+    now = datetime.utcnow()
+    conn = sqlite3.connect(db_path)
+    conn.execute("INSERT INTO users (id, username, email, hashed_password, role) VALUES (1, 'u', 'u@example.com', 'x', 'user')")
+    conn.execute("INSERT INTO retention_policies (max_age_days) VALUES (30)")
+    batch = []
+    for i in range(rows):
+        age = rng.uniform(31, 400) if rng.random() < expired else rng.uniform(0, 29)
+        text = " ".join(rng.choices(words, k=60))
+        batch.append(("search", f"query {i}", '{"results": []}', text, 1, (now - timedelta(days=age)).isoformat(" ")))
+    conn.executemany(
+        "INSERT INTO history (item_type, query, data, search_text, user_id, created_at) VALUES (?, ?, ?, ?, ?, ?)", batch
+    )
+    conn.commit()
+    conn.close()
+
+
+async def _run(db_path: str, rows: int, expired: float, batch_size: int) -> dict:
+    from sqlalchemy import event
+
+    import backend.fulltext  # noqa: F401  FTS5 table and triggers on create_all
+    from backend.database import Base, engine
+    from backend.retention import HistoryPurger
+
+    async with engine.connect() as conn:
+        # Has to be set before the first table exists
+        await conn.exec_driver_sql("PRAGMA auto_vacuum = INCREMENTAL")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    _fill(db_path, rows, expired)
+    size_before = os.path.getsize(db_path)
+
+    deletes = []
+
+    def before(conn, cursor, statement, parameters, context, executemany):
+        context._started = time.perf_counter()
+
+    def after(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("DELETE FROM history"):
+            deletes.append(time.perf_counter() - context._started)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", before)
+    event.listen(engine.sync_engine, "after_cursor_execute", after)
+    purger = HistoryPurger(batch_size=batch_size, pause=0)
+    start = time.perf_counter()
+    if batch_size:
+        deleted = (await purger.run_once())["deleted"]
+    else:
+        async with engine.begin() as conn:
+            cutoff = datetime.utcnow() - timedelta(days=30)
+            deleted = (await conn.exec_driver_sql("DELETE FROM history WHERE created_at < ?", (cutoff.isoformat(" "),))).rowcount
+    elapsed = time.perf_counter() - start
+    event.remove(engine.sync_engine, "before_cursor_execute", before)
+    event.remove(engine.sync_engine, "after_cursor_execute", after)
+    await engine.dispose()
+    return {
+        "deleted": deleted,
+        "elapsed": elapsed,
+        "longest_delete": max(deletes, default=0.0),
+        "size_before": size_before,
+        "size_after": os.path.getsize(db_path),
+        "pages": purger.compacted_pages,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--expired", type=float, default=0.5, help="fraction of rows past the policy age")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=None)
+    args = parser.parse_args()
+    batch_sizes = args.batch_sizes if args.batch_sizes is not None else [0, 100, 500, 2000]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "retention.db")
+        os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+        print(f"{args.rows} history rows, {args.expired:.0%} expired")
+        for batch_size in batch_sizes:
+            if os.path.exists(db_path):
+                os.remove(db_path)
+            stats = asyncio.run(_run(db_path, args.rows, args.expired, batch_size))
+            label = f"batch {batch_size}" if batch_size else "one DELETE"
+            print(
+                f"  {label:11}  {stats['deleted'] / stats['elapsed']:7.0f} rows/s"
+                f"  longest DELETE {stats['longest_delete'] * 1000:7.1f} ms"
+                f"  file {stats['size_before'] / 1024 / 1024:6.1f} -> {stats['size_after'] / 1024 / 1024:6.1f} MiB"
+                f"  ({stats['pages']} pages released)"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+# backend/benchmarks/search_hedging.py
+"""/search latency with and without hedging against a long-tailed MCP server.
+
+The stub MCP server answers in --latency seconds, except for a --tail-rate
+share of calls that take --tail-latency; the stub DuckDuckGo API answers in
+--fallback-latency. The same uncached workload runs twice, hedging off and
+on, and reports latency percentiles, which source won and the hedge counters.
+Each phase starts with a fresh circuit breaker, so failures in the first
+don't leave the second failing fast to the fallback.
+
+The hedge delay is MCP's SEARCH_HEDGE_PERCENTILE latency, capped at
+SEARCH_HEDGE_MAX_MULTIPLE x its median. Keep --tail-rate below
+1 - SEARCH_HEDGE_PERCENTILE, or raise the cap only knowingly: otherwise the
+percentile is the tail latency itself and the backup fires too late to help.
+
+    python -m backend.benchmarks.search_hedging --tail-rate 0.1 --tail-latency 2
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+
+def _percentile(values, pct):
+    values = sorted(values)
+    return values[max(0, int(round(len(values) * pct)) - 1)] if values else 0.0
+
+
+def _run(client, headers, label, requests, concurrency):
+    def one(_):
+        start = time.perf_counter()
+        r = client.get("/search", params={"q": f"{label} {uuid.uuid4().hex}"}, headers=headers)
+        return time.perf_counter() - start, r.json().get("search_method", f"http {r.status_code}")
+
+    with ThreadPoolExecutor(concurrency) as pool:
+        outcomes = list(pool.map(one, range(requests)))
+    ms = [t * 1000 for t, _ in outcomes]
+    print(
+        f"{label:12} p50={statistics.median(ms):7.1f}ms p95={_percentile(ms, 0.95):7.1f}ms "
+        f"p99={_percentile(ms, 0.99):7.1f}ms methods={dict(Counter(m for _, m in outcomes))}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--tail-rate", type=float, default=0.1)
+    parser.add_argument("--tail-latency", type=float, default=2.0)
+    parser.add_argument("--fallback-latency", type=float, default=0.15)
+    args = parser.parse_args()
+
+    from backend.benchmarks.stubs import Faults, StubServer, duckduckgo_app, mcp_app
+
+    faults = Faults(args.latency, tail_rate=args.tail_rate, tail_latency=args.tail_latency)
+    with tempfile.TemporaryDirectory() as tmp, \
+            StubServer(mcp_app(faults=faults)) as mcp_stub, \
+            StubServer(duckduckgo_app(args.fallback_latency)) as ddg_stub:
+        # Settings are read at import time, so configure them before importing the app
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        os.environ["DUCKDUCKGO_API_URL"] = ddg_stub.url
+        os.environ["BCRYPT_ROUNDS"] = "4"
+        # One user sends every request, so per-user rate limits would turn most of them into 429s
+        os.environ["RATE_LIMIT_ENABLED"] = "0"
+        os.environ["SEARCH_CACHE_ENABLED"] = "0"
+        os.environ.setdefault("MCP_POOL_SIZE", str(args.concurrency))
+        from backend.mcp_clients import CircuitBreaker, search_client
+        search_client.url = search_client.pool.url = mcp_stub.url + "mcp"
+        from backend.hedging import search_hedge
+        from backend.main import app
+        import httpx
+
+        with StubServer(app) as api, httpx.Client(base_url=api.url.rstrip("/"), timeout=60) as client:
+            client.post("/auth/register", json={"username": "bench", "email": "bench@example.com", "password": "benchpass"})
+            token = client.post("/auth/login", data={"username": "bench@example.com", "password": "benchpass"}).json()["access_token"]
+            headers = {"Authorization": f"Bearer {token}"}
+
+            search_hedge.enabled = False
+            _run(client, headers, "no hedging", args.requests, args.concurrency)
+            search_hedge.enabled = True
+            search_client.breaker = CircuitBreaker("search")
+            _run(client, headers, "hedging", args.requests, args.concurrency)
+            print(f"hedge stats: {client.get('/health').json()['search_hedge']}")
+
+
+if __name__ == "__main__":
+    main()
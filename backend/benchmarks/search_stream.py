@@ -0,0 +1,100 @@
+# backend/benchmarks/search_stream.py
+"""Time-to-first-result for GET /search vs the SSE GET /search/stream.
+
+Runs the app under uvicorn against SQLite, a stub MCP server and a stub
+DuckDuckGo API, then issues uncached searches through both endpoints and
+reports time to the first byte of a result and to the complete response.
+With --mcp-error-rate 1 every search exercises the MCP -> fallback switch,
+and the stream's `fallback` event shows up before any result.
+
+    python -m backend.benchmarks.search_stream --mcp-latency 0.5 --fallback-latency 0.2
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+import uuid
+
+
+def _percentile(values, pct):
+    values = sorted(values)
+    return values[max(0, int(round(len(values) * pct)) - 1)] if values else 0.0
+
+
+def _run(base_url: str, requests_per_endpoint: int):
+    import httpx
+
+    with httpx.Client(base_url=base_url, timeout=60) as client:
+        client.post("/auth/register", json={"username": "bench", "email": "bench@example.com", "password": "benchpass"})
+        token = client.post("/auth/login", data={"username": "bench@example.com", "password": "benchpass"}).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        plain_total = []
+        for _ in range(requests_per_endpoint):
+            start = time.perf_counter()
+            r = client.get("/search", params={"q": f"plain {uuid.uuid4().hex}"}, headers=headers)
+            r.raise_for_status()
+            plain_total.append(time.perf_counter() - start)
+
+        first_event, first_result, stream_total, events_seen = [], [], [], {}
+        for _ in range(requests_per_endpoint):
+            start = time.perf_counter()
+            got_event = got_result = None
+            with client.stream("GET", "/search/stream", params={"q": f"stream {uuid.uuid4().hex}"}, headers=headers) as r:
+                for line in r.iter_lines():
+                    if not line.startswith("event: "):
+                        continue
+                    name = line[len("event: "):]
+                    events_seen[name] = events_seen.get(name, 0) + 1
+                    now = time.perf_counter() - start
+                    got_event = got_event if got_event is not None else now
+                    if name == "result" and got_result is None:
+                        got_result = now
+            stream_total.append(time.perf_counter() - start)
+            first_event.append(got_event or 0.0)
+            if got_result is not None:
+                first_result.append(got_result)
+
+    def row(name, values):
+        ms = [v * 1000 for v in values]
+        if ms:
+            print(f"{name:34} p50={statistics.median(ms):8.1f}ms p95={_percentile(ms, 0.95):8.1f}ms")
+
+    row("/search complete response", plain_total)
+    row("/search/stream first event", first_event)
+    row("/search/stream first result", first_result)
+    row("/search/stream complete", stream_total)
+    print(f"events: {events_seen}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20, help="requests per endpoint")
+    parser.add_argument("--mcp-latency", type=float, default=0.5)
+    parser.add_argument("--mcp-error-rate", type=float, default=0.0)
+    parser.add_argument("--fallback-latency", type=float, default=0.2)
+    args = parser.parse_args()
+
+    from backend.benchmarks.stubs import StubServer, duckduckgo_app, mcp_app
+
+    with tempfile.TemporaryDirectory() as tmp, \
+            StubServer(mcp_app(args.mcp_latency, args.mcp_error_rate)) as mcp_stub, \
+            StubServer(duckduckgo_app(args.fallback_latency)) as ddg_stub:
+        # Settings are read at import time, so configure them before importing the app
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        os.environ["DUCKDUCKGO_API_URL"] = ddg_stub.url
+        os.environ["BCRYPT_ROUNDS"] = "4"
+        # One user sends every request, so per-user rate limits would turn most of them into 429s
+        os.environ["RATE_LIMIT_ENABLED"] = "0"
+        from backend.mcp_clients import search_client, image_client
+        search_client.url = search_client.pool.url = mcp_stub.url + "mcp"
+        image_client.url = image_client.pool.url = mcp_stub.url + "mcp"
+        from backend.main import app
+
+        with StubServer(app) as api:
+            _run(api.url.rstrip("/"), args.requests)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+# backend/benchmarks/serialization.py
+"""Response serialization throughput: FastAPI's default path vs the orjson paths.
+
+Builds --rows synthetic history rows shaped like what the dashboard query
+returns (the data column as stored JSON text) and times turning one page of
+them into response bytes:
+
+- default: json.loads of each data column (SQLAlchemy's JSON type), then
+  jsonable_encoder and JSONResponse, as /dashboard used to do
+- orjson: the same parsed rows rendered by FastJSONResponse
+- raw splice: render_rows with the stored JSON text spliced in unparsed,
+  which is what /dashboard does now
+
+plus a single /search response body through the default path and through
+FastJSONResponse.
+
+    python -m backend.benchmarks.serialization [--rows 200] [--results 10]
+"""
+import argparse
+import json
+import time
+from datetime import datetime, timedelta
+from typing import Callable
+
+
+def _data(i: int, results: int) -> dict:
+    return {
+        "results": [
+            {"title": f"Result {i}-{k}", "body": "lorem ipsum dolor sit amet " * 8, "href": f"https://example.com/{i}/{k}"}
+            for k in range(results)
+        ],
+        "search_method": "mcp",
+        "cache_hit": False,
+        "query_metadata": {"max_results": results, "results_count": results},
+    }
+
+
+def bench(fn: Callable[[], bytes], seconds: float) -> float:
+    """Calls per second of ``fn`` over roughly ``seconds``"""
+    fn()
+    calls, start = 0, time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        fn()
+        calls += 1
+    return calls / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200, help="rows per dashboard page")
+    parser.add_argument("--results", type=int, default=10, help="search results per row")
+    parser.add_argument("--seconds", type=float, default=2.0, help="time spent on each variant")
+    args = parser.parse_args()
+
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+
+    from backend.responses import FastJSONResponse, history_page_response
+
+    keys = ["id", "uid", "item_type", "query", "created_at", "user_id", "data"]
+    start = datetime(2024, 1, 1)
+    rows = [
+        (i, f"00000000-0000-0000-0000-{i:012d}", "search", f"query number {i}",
+         start + timedelta(seconds=i, microseconds=i), 1, json.dumps(_data(i, args.results)))
+        for i in range(args.rows)
+    ]
+
+    def parsed_items():
+        return [{**dict(zip(keys[:-1], row[:-1])), "data": json.loads(row[-1])} for row in rows]
+
+    def default_path():
+        content = {"items": parsed_items(), "next_cursor": "abc"}
+        return JSONResponse(jsonable_encoder(content)).body
+
+    def orjson_path():
+        return FastJSONResponse({"items": parsed_items(), "next_cursor": "abc"}).body
+
+    def raw_splice():
+        return history_page_response(keys, rows, "abc").body
+
+    # All three must describe the same document
+    assert json.loads(default_path()) == json.loads(orjson_path()) == json.loads(raw_splice())
+
+    search_body = {
+        "id": 1, "uid": "00000000-0000-0000-0000-000000000001", "query": "python asyncio",
+        **{k: v for k, v in _data(1, args.results).items() if k in ("results", "search_method", "cache_hit")},
+        "total_results": args.results,
+    }
+
+    page_bytes = len(raw_splice())
+    print(f"dashboard page: {args.rows} rows x {args.results} results ({page_bytes / 1024:.0f} KiB)")
+    baseline = None
+    for name, fn in (("default", default_path), ("orjson", orjson_path), ("raw splice", raw_splice)):
+        rate = bench(fn, args.seconds)
+        baseline = baseline or rate
+        print(f"  {name:12} {rate:9.1f} pages/s  {rate * page_bytes / 1024 / 1024:7.1f} MiB/s  x{rate / baseline:.1f}")
+
+    print(f"\nsearch response: {args.results} results")
+    baseline = None
+    for name, fn in (
+        ("default", lambda: JSONResponse(jsonable_encoder(search_body)).body),
+        ("orjson", lambda: FastJSONResponse(search_body).body),
+    ):
+        rate = bench(fn, args.seconds)
+        baseline = baseline or rate
+        print(f"  {name:12} {rate:9.0f} responses/s  x{rate / baseline:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+# backend/benchmarks/startup_time.py
+"""How long the API takes to import, to answer its first request and to be ready.
+
+Starts stub MCP servers whose every HTTP request is delayed by
+--mcp-handshake-delay (so a handshake costs a few of those), runs the app
+under uvicorn in a fresh subprocess and polls it every 10ms, recording:
+
+- import: ``import backend.main`` in a fresh interpreter, with the lazily
+  loaded libraries (mcp, passlib, jose) and with them imported up front
+- first request: spawn until /health answers (time-to-first-request)
+- ready: spawn until /ready returns 200 (database set up, MCP warm-up done)
+
+for the default background warm-up and for STARTUP_WARMUP_BLOCKING=1,
+which holds traffic until every warm-up step has finished.
+
+    python -m backend.benchmarks.startup_time [--runs 3] [--mcp-handshake-delay 0.5]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+from backend.benchmarks.harness import REPO_ROOT
+
+IMPORT_SNIPPET = "import time; t = time.perf_counter(); {pre}import backend.main; print(time.perf_counter() - t)"
+
+
+def time_import(eager: bool, env: Dict[str, str]) -> float:
+    pre = "import mcp.client.streamable_http, passlib.context, jose.jwt; " if eager else ""
+    out = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET.format(pre=pre)],
+        cwd=REPO_ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def time_startup(env: Dict[str, str], timeout: float = 60) -> Dict[str, float]:
+    import httpx
+
+    from backend.benchmarks.stubs import free_port
+
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=REPO_ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    first = ready = None
+    try:
+        with httpx.Client(timeout=1) as client:
+            while ready is None and time.perf_counter() - start < timeout:
+                try:
+                    if first is None and client.get(f"{url}/health").status_code == 200:
+                        first = time.perf_counter() - start
+                    if first is not None and client.get(f"{url}/ready").status_code == 200:
+                        ready = time.perf_counter() - start
+                except httpx.HTTPError:
+                    pass
+                if proc.poll() is not None:
+                    raise RuntimeError("API exited during startup")
+                time.sleep(0.01)
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+    if ready is None:
+        raise RuntimeError(f"API was not ready within {timeout}s")
+    return {"first_request": first, "ready": ready}
+
+
+def median_ms(values: List[float]) -> str:
+    return f"{statistics.median(values) * 1000:8.0f}ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--mcp-handshake-delay", type=float, default=0.5, help="seconds added to every MCP HTTP request")
+    parser.add_argument("--budget", type=float, default=20, help="STARTUP_WARMUP_BUDGET for the app")
+    args = parser.parse_args()
+
+    from backend.benchmarks.stubs import StubServer, mcp_app, slow_app
+
+    with tempfile.TemporaryDirectory() as tmp, \
+            StubServer(slow_app(mcp_app(), args.mcp_handshake_delay)) as mcp_stub:
+        base_env = {
+            **os.environ,
+            "BLOB_STORE_DIR": os.path.join(tmp, "blobs"),
+            "MCP_SEARCH_URL": mcp_stub.url + "mcp",
+            "MCP_IMAGE_URL": mcp_stub.url + "mcp",
+            "STARTUP_WARMUP_BUDGET": str(args.budget),
+        }
+
+        print(f"import backend.main (median of {args.runs}):")
+        for label, eager in (("lazy imports", False), ("eager imports", True)):
+            env = {**base_env, "DATABASE_URL": f"sqlite:///{os.path.join(tmp, 'import.db')}"}
+            print(f"  {label:14} {median_ms([time_import(eager, env) for _ in range(args.runs)])}")
+
+        print(f"\nstartup with a {args.mcp_handshake_delay}s delay per MCP request (median of {args.runs}):")
+        for label, blocking in (("background", "0"), ("blocking", "1")):
+            runs = []
+            for i in range(args.runs):
+                # A fresh database each run, so table creation is part of startup
+                env = {
+                    **base_env,
+                    "DATABASE_URL": f"sqlite:///{os.path.join(tmp, f'{label}{i}.db')}",
+                    "STARTUP_WARMUP_BLOCKING": blocking,
+                }
+                runs.append(time_startup(env))
+            print(
+                f"  {label:14} first request {median_ms([r['first_request'] for r in runs])}"
+                f"   ready {median_ms([r['ready'] for r in runs])}"
+            )
+
+
+if __name__ == "__main__":
+    main()
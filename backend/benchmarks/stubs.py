@@ -0,0 +1,168 @@
+# backend/benchmarks/stubs.py
+import asyncio
+import base64
+import json
+import random
+import socket
+import threading
+import time
+from typing import Optional
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+# 1x1 PNG used wherever a stub has to hand back image bytes
+TINY_PNG = base64.b64decode(
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mP8z8BQDwAEhQGAhKmMIQAAAABJRU5ErkJggg=="
+)
+
+
+def duckduckgo_app(latency: float = 0.0, error_rate: float = 0.0, faults: Optional["Faults"] = None) -> Starlette:
+    """Stand-in for the DuckDuckGo Instant Answer API; pass ``faults`` to change them while it runs"""
+    faults = faults or Faults(latency, error_rate)
+
+    async def answer(request: Request):
+        faults.calls += 1
+        delay = faults.delay()
+        if delay:
+            await asyncio.sleep(delay)
+        if faults.error_rate and random.random() < faults.error_rate:
+            return JSONResponse({"error": "injected failure"}, status_code=500)
+        q = request.query_params.get("q", "")
+        topics = [
+            {"Text": f"{q} result {i}", "FirstURL": f"https://example.com/{i}"}
+            for i in range(10)
+        ]
+        return JSONResponse({"RelatedTopics": topics})
+
+    return Starlette(routes=[Route("/", answer)])
+
+
+class Faults:
+    """Mutable fault settings a running stub reads on every call"""
+
+    def __init__(self, latency: float = 0.0, error_rate: float = 0.0, tail_rate: float = 0.0, tail_latency: float = 0.0):
+        self.latency = latency
+        self.error_rate = error_rate
+        # A ``tail_rate`` share of calls take ``tail_latency`` instead of ``latency``
+        self.tail_rate = tail_rate
+        self.tail_latency = tail_latency
+        self.calls = 0  # requests the stub has started serving
+
+    def delay(self) -> float:
+        if self.tail_rate and random.random() < self.tail_rate:
+            return self.tail_latency
+        return self.latency
+
+
+def mcp_app(
+    latency: float = 0.0,
+    error_rate: float = 0.0,
+    results: int = 10,
+    faults: Optional[Faults] = None,
+    inline_images: bool = False,
+):
+    """Stand-in for both smithery MCP servers (streamable HTTP at /mcp).
+
+    Tool calls sleep for ``latency`` seconds and fail with probability
+    ``error_rate``; a failed call comes back as an MCP tool error, which the
+    clients treat like any other upstream failure. Pass ``faults`` to change
+    both while the server is running. With ``inline_images`` the image tool
+    returns base64 bytes instead of a URL, exercising the blob store.
+    """
+    from mcp.server.fastmcp import FastMCP
+
+    server = FastMCP("stub", log_level="WARNING")
+    faults = faults or Faults(latency, error_rate)
+
+    async def _delay():
+        faults.calls += 1
+        delay = faults.delay()
+        if delay:
+            await asyncio.sleep(delay)
+        if faults.error_rate and random.random() < faults.error_rate:
+            raise RuntimeError("injected upstream failure")
+
+    @server.tool()
+    async def duckduckgo_search(query: str, max_results: int = 5) -> str:
+        await _delay()
+        return json.dumps({"results": [
+            {"title": f"{query} result {i}", "href": f"https://example.com/{i}", "body": f"About {query}"}
+            for i in range(min(max_results, results))
+        ]})
+
+    @server.tool()
+    async def flux_imagegen(prompt: str, width: int, height: int, steps: int, guidance: float) -> str:
+        await _delay()
+        if inline_images:
+            return json.dumps({
+                "image_data": base64.b64encode(TINY_PNG).decode(),
+                "generation_id": f"stub-{random.randrange(1 << 30)}",
+            })
+        return json.dumps({
+            "image_url": f"https://images.example.com/{abs(hash(prompt))}.png",
+            "generation_id": f"stub-{random.randrange(1 << 30)}",
+            "metadata": {"width": width, "height": height},
+        })
+
+    return server.streamable_http_app()
+
+
+def slow_app(app, delay: float):
+    """Wrap an ASGI app so every HTTP request waits ``delay`` seconds first (e.g. a slow MCP handshake)"""
+
+    async def wrapped(scope, receive, send):
+        if scope["type"] == "http" and delay:
+            await asyncio.sleep(delay)
+        await app(scope, receive, send)
+
+    return wrapped
+
+
+def pollinations_app(latency: float = 0.0, error_rate: float = 0.0) -> Starlette:
+    """Stand-in for image.pollinations.ai: returns a small PNG for any prompt"""
+
+    async def image(request: Request):
+        if latency:
+            await asyncio.sleep(latency)
+        if error_rate and random.random() < error_rate:
+            return Response(b"injected failure", status_code=500)
+        return Response(TINY_PNG, media_type="image/png")
+
+    return Starlette(routes=[Route("/prompt/{prompt:path}", image)])
+
+
+class StubServer:
+    """Run an ASGI app with uvicorn on its own thread and event loop.
+
+    Keeping the stub off the caller's loop means a blocked caller cannot stall
+    the stub, which is exactly the situation the benchmarks need to expose.
+    """
+
+    def __init__(self, app, port: Optional[int] = None):
+        self.port = port or free_port()
+        self.url = f"http://127.0.0.1:{self.port}/"
+        self._server = uvicorn.Server(
+            uvicorn.Config(app, host="127.0.0.1", port=self.port, log_level="warning")
+        )
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        while not self._server.started:
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc):
+        self._server.should_exit = True
+        self._thread.join(timeout=5)
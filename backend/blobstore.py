@@ -0,0 +1,139 @@
+# backend/blobstore.py
+"""Content-addressed blob store for generated images.
+
+Blobs are stored once per SHA-256 digest under a two-level shard layout
+(``<root>/ab/cd/abcd...``), so identical images are deduplicated and no
+directory grows too large. Writes go to a temp file first and are renamed
+into place, which keeps concurrent writers of the same blob safe.
+"""
+import asyncio
+import base64
+import binascii
+import hashlib
+import os
+import re
+import struct
+import tempfile
+from typing import Any, Dict, Optional, Tuple
+
+BLOB_STORE_DIR = os.getenv("BLOB_STORE_DIR", os.path.join(os.path.dirname(__file__), "blobs"))
+# Prefix for blob URLs handed to clients; the frontend runs on another origin
+BLOB_PUBLIC_URL = os.getenv("BLOB_PUBLIC_URL", "http://localhost:8000")
+
+_DIGEST_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+def is_digest(value: str) -> bool:
+    return bool(_DIGEST_RE.match(value))
+
+
+def sniff_image(data: bytes) -> Tuple[str, Optional[int], Optional[int]]:
+    """Media type and (width, height) read from the PNG/JPEG/GIF/WebP header"""
+    if data[:8] == b"\x89PNG\r\n\x1a\n" and len(data) >= 24:
+        w, h = struct.unpack(">II", data[16:24])
+        return "image/png", w, h
+    if data[:6] in (b"GIF87a", b"GIF89a") and len(data) >= 10:
+        w, h = struct.unpack("<HH", data[6:10])
+        return "image/gif", w, h
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP" and len(data) >= 30:
+        chunk = data[12:16]
+        if chunk == b"VP8 ":
+            w, h = struct.unpack("<HH", data[26:30])
+            return "image/webp", w & 0x3FFF, h & 0x3FFF
+        if chunk == b"VP8L":
+            bits = int.from_bytes(data[21:25], "little")
+            return "image/webp", (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+        if chunk == b"VP8X":
+            return "image/webp", int.from_bytes(data[24:27], "little") + 1, int.from_bytes(data[27:30], "little") + 1
+        return "image/webp", None, None
+    if data[:2] == b"\xff\xd8":
+        # Walk JPEG segments to the first start-of-frame marker
+        i = 2
+        while i + 9 < len(data):
+            if data[i] != 0xFF:
+                i += 1
+                continue
+            marker = data[i + 1]
+            if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+                i += 2
+                continue
+            length = struct.unpack(">H", data[i + 2:i + 4])[0]
+            if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+                h, w = struct.unpack(">HH", data[i + 5:i + 9])
+                return "image/jpeg", w, h
+            i += 2 + length
+        return "image/jpeg", None, None
+    return "application/octet-stream", None, None
+
+
+def decode_base64_image(value: str) -> Optional[bytes]:
+    """Decode plain or ``data:<type>;base64,`` image data; None if it isn't base64"""
+    if value.startswith("data:"):
+        value = value.split(",", 1)[-1]
+    try:
+        return base64.b64decode(value, validate=True)
+    except (binascii.Error, ValueError):
+        return None
+
+
+class BlobStore:
+    def __init__(self, root: str):
+        self.root = root
+
+    def path(self, digest: str) -> str:
+        return os.path.join(self.root, digest[:2], digest[2:4], digest)
+
+    def exists(self, digest: str) -> bool:
+        return os.path.exists(self.path(digest))
+
+    def media_type(self, digest: str) -> Optional[str]:
+        """Media type from the blob's magic bytes; None if it isn't stored"""
+        try:
+            with open(self.path(digest), "rb") as f:
+                return sniff_image(f.read(32))[0]
+        except FileNotFoundError:
+            return None
+
+    def put(self, data: bytes) -> Tuple[str, bool]:
+        """Store ``data``; returns (digest, created) where created is False for a duplicate"""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.path(digest)
+        if os.path.exists(path):
+            return digest, False
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+        return digest, True
+
+
+blob_store = BlobStore(BLOB_STORE_DIR)
+
+
+def blob_url(digest: str) -> str:
+    return f"{BLOB_PUBLIC_URL.rstrip('/')}/images/{digest}"
+
+
+def store_image_bytes(data: bytes) -> Dict[str, Any]:
+    """Write image bytes to the blob store and return the reference kept in history"""
+    digest, _ = blob_store.put(data)
+    media_type, width, height = sniff_image(data)
+    return {
+        "sha256": digest,
+        "url": blob_url(digest),
+        "media_type": media_type,
+        "size": len(data),
+        "width": width,
+        "height": height,
+    }
+
+
+async def store_image(data: bytes) -> Dict[str, Any]:
+    # Hashing and file IO stay off the event loop
+    return await asyncio.to_thread(store_image_bytes, data)
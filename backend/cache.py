@@ -0,0 +1,136 @@
+# backend/cache.py
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+SEARCH_CACHE_ENABLED = os.getenv("SEARCH_CACHE_ENABLED", "1") not in ("0", "false", "False")
+SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", "300"))
+SEARCH_CACHE_MAX_ENTRIES = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "2048"))
+SEARCH_CACHE_MAX_BYTES = int(os.getenv("SEARCH_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+IMAGE_CACHE_ENABLED = os.getenv("IMAGE_CACHE_ENABLED", "1") not in ("0", "false", "False")
+IMAGE_CACHE_TTL = float(os.getenv("IMAGE_CACHE_TTL", str(7 * 24 * 3600)))
+IMAGE_CACHE_MAX_ENTRIES = int(os.getenv("IMAGE_CACHE_MAX_ENTRIES", "10000"))
+IMAGE_CACHE_MAX_BYTES = int(os.getenv("IMAGE_CACHE_MAX_BYTES", str(1024 * 1024 * 1024)))
+
+
+def _estimate_size(value: Any) -> int:
+    try:
+        return len(json.dumps(value, default=str))
+    except (TypeError, ValueError):
+        return 1024
+
+
+class TTLCache:
+    """In-memory LRU cache with per-entry TTL and a total size budget.
+
+    Sizes are estimated from the JSON encoding of each value, which is close
+    enough to bound memory for the JSON-shaped payloads stored here.
+    """
+
+    def __init__(self, ttl: float, max_entries: int, max_bytes: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._data: "OrderedDict[Any, Tuple[float, int, Any]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Any) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, size, value = entry
+            if expires_at <= time.monotonic():
+                self._remove(key, size)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Any, value: Any, ttl: Optional[float] = None, size: Optional[int] = None):
+        """Store ``value``; ``size`` overrides the JSON estimate when the value stands for more data"""
+        size = _estimate_size(value) if size is None else size
+        if size > self.max_bytes:
+            return
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._data[key] = (expires_at, size, value)
+            self._bytes += size
+            while self._data and (len(self._data) > self.max_entries or self._bytes > self.max_bytes):
+                old_key, (_, old_size, _) = next(iter(self._data.items()))
+                self._remove(old_key, old_size)
+                self.evictions += 1
+
+    def delete(self, key: Any):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                self._remove(key, entry[1])
+
+    def _remove(self, key: Any, size: int):
+        del self._data[key]
+        self._bytes -= size
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._data),
+            "bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+def normalize_query(q: str) -> str:
+    """Case-fold and collapse whitespace so trivially different queries share a key"""
+    return " ".join(q.lower().split())
+
+
+def search_cache_key(q: str, max_results: int) -> Tuple[str, int]:
+    return (normalize_query(q), max_results)
+
+
+def image_cache_key(prompt: str, width: int, height: int, steps: int, guidance: float) -> Tuple:
+    return (normalize_query(prompt), width, height, steps, float(guidance))
+
+
+# Shared search-result cache: values are {"results": [...], "search_method": str}
+search_cache = TTLCache(
+    ttl=SEARCH_CACHE_TTL,
+    max_entries=SEARCH_CACHE_MAX_ENTRIES,
+    max_bytes=SEARCH_CACHE_MAX_BYTES,
+)
+
+# Generation cache: values are {"image_data": {...}, "generation_method": str}.
+# Inline images live in the blob store, so entries hold a reference and are
+# sized by the blob they point at; evicting an entry never deletes the blob,
+# which history rows may still reference.
+image_cache = TTLCache(
+    ttl=IMAGE_CACHE_TTL,
+    max_entries=IMAGE_CACHE_MAX_ENTRIES,
+    max_bytes=IMAGE_CACHE_MAX_BYTES,
+)
@@ -0,0 +1,203 @@
+# backend/compress_history.py
+"""Compress history payloads in place and report the space saved.
+
+Rows written before history compression keep their payload as plain JSON in
+``history.data``. This walks them in id order and moves each payload into
+``history.data_z`` (see backend/compression.py), one short transaction per
+batch, so it can run against a live database: every update is guarded on
+the row still being uncompressed, and reads handle both forms throughout.
+
+    python -m backend.compress_history --report
+    python -m backend.compress_history --train-dictionary [--samples 500]
+    python -m backend.compress_history [--batch-size 500] [--recompress] [--dry-run] [--vacuum]
+
+``--train-dictionary`` builds a dictionary from the most recent payloads and
+makes it the one this run (and the API, after a restart) compresses with.
+``--recompress`` also rewrites compressed rows that were written without the
+current dictionary. ``--vacuum`` hands the freed pages back afterwards.
+"""
+import argparse
+import asyncio
+import logging
+import os
+
+import orjson
+from sqlalchemy import LargeBinary, Text, select, text, type_coerce, update
+
+from backend.compression import (
+    HISTORY_COMPRESSION, blob_dictionary, compress_json, dictionaries, load_dictionaries,
+    payloads_as_json, train_dictionary,
+)
+from backend.database import SessionLocal, engine
+from backend.models import CompressionDictionary, HistoryItem
+
+logger = logging.getLogger(__name__)
+
+RAW_DATA = type_coerce(HistoryItem.data, Text)
+RAW_DATA_Z = type_coerce(HistoryItem.data_z, LargeBinary)
+
+
+def compact(payload) -> bytes:
+    """The payload as compact JSON, the form it is compressed in"""
+    return orjson.dumps(orjson.loads(payload), option=orjson.OPT_NON_STR_KEYS)
+
+
+async def train(samples: int) -> int:
+    async with SessionLocal() as db:
+        rows = (await db.execute(
+            select(RAW_DATA, RAW_DATA_Z).order_by(HistoryItem.id.desc()).limit(samples)
+        )).all()
+        if not rows:
+            raise SystemExit("No history rows to train a dictionary on")
+        payloads = await payloads_as_json(db, [tuple(row) for row in rows])
+        # Oldest first, so the newest payloads end up nearest zlib's window
+        zdict = train_dictionary([compact(p) for p in reversed(payloads)], HISTORY_COMPRESSION)
+        item = CompressionDictionary(codec=HISTORY_COMPRESSION, data=zdict, samples=len(rows))
+        db.add(item)
+        await db.commit()
+    dictionaries.add(item.id, item.codec, item.data)
+    logger.info(f"Trained {HISTORY_COMPRESSION} dictionary {item.id} ({len(zdict)} bytes) on {len(rows)} payloads")
+    return item.id
+
+
+async def compress(batch_size: int, recompress: bool, dry_run: bool) -> dict:
+    stats = {"scanned": 0, "compressed": 0, "bytes_before": 0, "bytes_after": 0}
+    active = dictionaries.active or 0
+    target = HistoryItem.data.isnot(None)
+    if recompress:
+        target = target | HistoryItem.data_z.isnot(None)
+    last_id = 0
+    while True:
+        async with SessionLocal() as db:
+            rows = (await db.execute(
+                select(HistoryItem.id, RAW_DATA, RAW_DATA_Z)
+                .where(target, HistoryItem.id > last_id)
+                .order_by(HistoryItem.id)
+                .limit(batch_size)
+            )).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+            stats["scanned"] += len(rows)
+
+            for row_id, legacy, blob in rows:
+                if blob is not None and blob_dictionary(bytes(blob)) == active:
+                    continue
+                stored = len(legacy.encode()) if blob is None else len(blob)
+                payload = legacy if blob is None else (await payloads_as_json(db, [(None, blob)]))[0]
+                new_blob = compress_json(compact(payload), HISTORY_COMPRESSION, active)
+                stats["compressed"] += 1
+                stats["bytes_before"] += stored
+                stats["bytes_after"] += len(new_blob)
+                if dry_run:
+                    continue
+                # Only touch the row if nothing rewrote it since it was read
+                guard = HistoryItem.data.isnot(None) if blob is None else RAW_DATA_Z == bytes(blob)
+                await db.execute(
+                    update(HistoryItem)
+                    .where(HistoryItem.id == row_id, guard)
+                    .values(data=None, data_z=type_coerce(new_blob, LargeBinary))
+                )
+            await db.commit()
+        logger.info(f"Scanned {stats['scanned']} rows, compressed {stats['compressed']}")
+    return stats
+
+
+async def report() -> dict:
+    """Stored vs uncompressed payload bytes, for plain and compressed rows"""
+    stats = {"plain_rows": 0, "plain_bytes": 0, "compressed_rows": 0, "compressed_bytes": 0, "original_bytes": 0}
+    last_id = 0
+    while True:
+        async with SessionLocal() as db:
+            rows = (await db.execute(
+                select(HistoryItem.id, RAW_DATA, RAW_DATA_Z)
+                .where(HistoryItem.id > last_id)
+                .order_by(HistoryItem.id)
+                .limit(1000)
+            )).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+            payloads = await payloads_as_json(db, [(legacy, blob) for _, legacy, blob in rows])
+        for (_, legacy, blob), payload in zip(rows, payloads):
+            if blob is None:
+                size = len(legacy.encode()) if legacy is not None else 0
+                stats["plain_rows"] += 1
+                stats["plain_bytes"] += size
+                stats["original_bytes"] += size
+            else:
+                stats["compressed_rows"] += 1
+                stats["compressed_bytes"] += len(blob)
+                stats["original_bytes"] += len(payload)
+    return stats
+
+
+async def storage_size() -> int:
+    """Bytes on disk: the whole SQLite file, or the history table on PostgreSQL"""
+    if engine.dialect.name == "sqlite":
+        return os.path.getsize(engine.url.database)
+    async with engine.connect() as conn:
+        return await conn.scalar(text("SELECT pg_total_relation_size('history')"))
+
+
+async def vacuum() -> None:
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.exec_driver_sql("VACUUM" if engine.dialect.name == "sqlite" else "VACUUM ANALYZE history")
+
+
+def mib(n: int) -> str:
+    return f"{n / 1024 / 1024:.2f} MiB" if n >= 1024 * 1024 else f"{n / 1024:.1f} KiB"
+
+
+def print_report(stats: dict) -> None:
+    stored = stats["plain_bytes"] + stats["compressed_bytes"]
+    original = stats["original_bytes"]
+    print(f"Plain rows:      {stats['plain_rows']:8}  {mib(stats['plain_bytes'])}")
+    print(f"Compressed rows: {stats['compressed_rows']:8}  {mib(stats['compressed_bytes'])} "
+          f"(from {mib(original - stats['plain_bytes'])} of JSON)")
+    if original:
+        print(f"Payloads: {mib(stored)} stored for {mib(original)} of JSON, "
+              f"ratio {original / max(stored, 1):.1f}x, {mib(original - stored)} saved")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Compress history payloads and report the space saved")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--report", action="store_true", help="only report current payload sizes")
+    parser.add_argument("--train-dictionary", action="store_true", help="train a new dictionary before compressing")
+    parser.add_argument("--samples", type=int, default=500, help="recent payloads to train the dictionary on")
+    parser.add_argument("--recompress", action="store_true", help="also rewrite rows compressed without the current dictionary")
+    parser.add_argument("--vacuum", action="store_true", help="reclaim the freed space afterwards")
+    parser.add_argument("--dry-run", action="store_true", help="report what would change without writing")
+    args = parser.parse_args()
+
+    if HISTORY_COMPRESSION == "none":
+        raise SystemExit("HISTORY_COMPRESSION is 'none'; set it to zlib or zstd first")
+    try:
+        async with SessionLocal() as db:
+            await load_dictionaries(db)
+        if args.report:
+            print_report(await report())
+            return
+        if args.train_dictionary and not args.dry_run:
+            await train(args.samples)
+
+        size_before = await storage_size()
+        stats = await compress(args.batch_size, args.recompress, args.dry_run)
+        verb = "Would compress" if args.dry_run else "Compressed"
+        print(
+            f"{verb} {stats['compressed']} of {stats['scanned']} rows with {HISTORY_COMPRESSION} "
+            f"(dictionary {dictionaries.active or 'none'}): "
+            f"{mib(stats['bytes_before'])} -> {mib(stats['bytes_after'])}"
+        )
+        if args.vacuum and not args.dry_run:
+            await vacuum()
+            print(f"Storage: {mib(size_before)} -> {mib(await storage_size())}")
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
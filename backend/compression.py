@@ -0,0 +1,189 @@
+# backend/compression.py
+"""Compressed storage for history payloads.
+
+``history.data_z`` holds the payload as compact JSON, compressed with zlib or
+zstd. Every blob starts with a 5-byte header, the codec id plus the id of the
+trained dictionary it was compressed with (0 for none), so rows written under
+different settings can sit side by side and all stay readable:
+
+    [codec: 1 byte][dictionary id: 4 bytes, big-endian][compressed JSON]
+
+Search and image payloads repeat the same keys and boilerplate on every row,
+which is exactly what a dictionary trained on sample rows captures; small
+rows compress several times better with one. Dictionaries are stored in the
+``compression_dictionaries`` table and loaded at startup, since any row may
+need the dictionary it was written with. ``python -m backend.compress_history``
+trains them, migrates old rows and reports the space saved.
+
+The legacy ``history.data`` JSON column is still read for rows that haven't
+been migrated; writes go to exactly one of the two columns.
+"""
+import os
+import struct
+import zlib
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import orjson
+from sqlalchemy import LargeBinary, select
+from sqlalchemy.types import TypeDecorator
+
+HISTORY_COMPRESSION = os.getenv("HISTORY_COMPRESSION", "zlib")  # zlib | zstd | none
+HISTORY_COMPRESSION_LEVEL = int(os.getenv("HISTORY_COMPRESSION_LEVEL", "6"))
+HISTORY_COMPRESSION_DICT = os.getenv("HISTORY_COMPRESSION_DICT", "1") not in ("0", "false", "False")
+
+CODEC_IDS = {"zlib": 1, "zstd": 2}
+CODEC_NAMES = {v: k for k, v in CODEC_IDS.items()}
+_HEADER = struct.Struct(">BI")
+ZLIB_MAX_DICT = 32 * 1024  # zlib only looks back this far
+
+
+def _zstd():
+    try:
+        import zstandard
+    except ImportError:
+        raise RuntimeError("zstd history compression needs the zstandard package (pip install zstandard)")
+    return zstandard
+
+
+class Dictionaries:
+    """Trained dictionaries by id, plus the one new rows are written with"""
+
+    def __init__(self):
+        self._data: Dict[int, Tuple[str, bytes]] = {}
+        self.active: Optional[int] = None
+        # zlib streams already primed with a dictionary; copying one skips
+        # re-reading the dictionary on every payload
+        self._zlib_primed: Dict[Tuple[int, bool], Any] = {}
+
+    def add(self, dict_id: int, codec: str, data: bytes):
+        self._data[dict_id] = (codec, data)
+        if HISTORY_COMPRESSION_DICT and codec == HISTORY_COMPRESSION and (self.active or 0) < dict_id:
+            self.active = dict_id
+
+    def get(self, dict_id: int) -> bytes:
+        try:
+            return self._data[dict_id][1]
+        except KeyError:
+            raise LookupError(f"Compression dictionary {dict_id} is not loaded")
+
+    def zlib_stream(self, dict_id: int, compress: bool):
+        key = (dict_id, compress)
+        primed = self._zlib_primed.get(key)
+        if primed is None:
+            zdict = self.get(dict_id)
+            if compress:
+                primed = zlib.compressobj(HISTORY_COMPRESSION_LEVEL, zdict=zdict)
+            else:
+                primed = zlib.decompressobj(zdict=zdict)
+            self._zlib_primed[key] = primed
+        return primed.copy()
+
+    def __contains__(self, dict_id: int) -> bool:
+        return dict_id in self._data
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+dictionaries = Dictionaries()
+
+
+async def load_dictionaries(db, ids: Optional[Iterable[int]] = None) -> int:
+    """Load trained dictionaries (all of them, or just ``ids``); returns how many are loaded"""
+    from backend.models import CompressionDictionary
+
+    stmt = select(CompressionDictionary.id, CompressionDictionary.codec, CompressionDictionary.data)
+    if ids is not None:
+        stmt = stmt.where(CompressionDictionary.id.in_(list(ids)))
+    for dict_id, codec, data in (await db.execute(stmt)).all():
+        dictionaries.add(dict_id, codec, data)
+    return len(dictionaries)
+
+
+def compress_json(raw: bytes, codec: str = HISTORY_COMPRESSION, dict_id: Optional[int] = None) -> bytes:
+    """Compress JSON bytes into a headered blob"""
+    if codec == "zstd":
+        zstandard = _zstd()
+        kwargs = {"dict_data": zstandard.ZstdCompressionDict(dictionaries.get(dict_id))} if dict_id else {}
+        body = zstandard.ZstdCompressor(level=HISTORY_COMPRESSION_LEVEL, **kwargs).compress(raw)
+    elif codec == "zlib":
+        c = dictionaries.zlib_stream(dict_id, True) if dict_id else zlib.compressobj(HISTORY_COMPRESSION_LEVEL)
+        body = c.compress(raw) + c.flush()
+    else:
+        raise ValueError(f"Unknown compression codec {codec!r}")
+    return _HEADER.pack(CODEC_IDS[codec], dict_id or 0) + body
+
+
+def decompress_json(blob: bytes) -> bytes:
+    """The JSON bytes inside a blob from compress_json"""
+    codec_id, dict_id = _HEADER.unpack_from(blob)
+    body = memoryview(blob)[_HEADER.size:]
+    codec = CODEC_NAMES.get(codec_id)
+    if codec == "zstd":
+        zstandard = _zstd()
+        kwargs = {"dict_data": zstandard.ZstdCompressionDict(dictionaries.get(dict_id))} if dict_id else {}
+        return zstandard.ZstdDecompressor(**kwargs).decompress(body)
+    if codec == "zlib":
+        d = dictionaries.zlib_stream(dict_id, False) if dict_id else zlib.decompressobj()
+        return d.decompress(body) + d.flush()
+    raise ValueError(f"Unknown compression codec id {codec_id}")
+
+
+def blob_dictionary(blob: bytes) -> int:
+    return _HEADER.unpack_from(blob)[1]
+
+
+def encode_payload(value: Any) -> bytes:
+    return compress_json(orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS), HISTORY_COMPRESSION, dictionaries.active)
+
+
+class CompressedJSON(TypeDecorator):
+    """JSON stored as a compressed blob; see the module docstring for the format"""
+
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return encode_payload(value)
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return orjson.loads(decompress_json(bytes(value)))
+
+
+def history_payload(value: Any) -> Dict[str, Any]:
+    """Column values for storing ``value`` as a history payload under the current settings"""
+    if HISTORY_COMPRESSION == "none":
+        return {"data": value, "data_z": None}
+    return {"data": None, "data_z": value}
+
+
+async def payloads_as_json(db, pairs: List[Tuple[Optional[str], Optional[bytes]]]) -> List[Any]:
+    """JSON text for each (legacy data text, compressed blob) pair, without parsing either.
+
+    Dictionaries that another process trained after this one started are
+    loaded on demand before anything is decompressed.
+    """
+    missing = {blob_dictionary(blob) for _, blob in pairs if blob} - {0}
+    missing = {dict_id for dict_id in missing if dict_id not in dictionaries}
+    if missing:
+        await load_dictionaries(db, missing)
+    return [decompress_json(bytes(blob)) if blob is not None else text for text, blob in pairs]
+
+
+def train_dictionary(samples: List[bytes], codec: str = HISTORY_COMPRESSION, size: int = 64 * 1024) -> bytes:
+    """Build a dictionary from sample JSON payloads.
+
+    zstd trains a real dictionary. zlib has no trainer, but a preset
+    dictionary of representative payloads works the same way for the shared
+    keys and boilerplate; the most recent samples go last, where zlib's
+    window favours them.
+    """
+    if codec == "zstd":
+        return _zstd().train_dictionary(size, samples).as_bytes()
+    if codec == "zlib":
+        return b"".join(samples)[-ZLIB_MAX_DICT:]
+    raise ValueError(f"Unknown compression codec {codec!r}")
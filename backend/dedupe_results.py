@@ -0,0 +1,117 @@
+# backend/dedupe_results.py
+"""Move inline search results out of history rows into the shared result store.
+
+Search rows written before the result store carry their results inside the
+payload. This walks search rows in id order, stores each distinct result
+once (see backend/result_store.py), links the row to them and rewrites the
+payload without them, the same shape new rows get. Each batch is one
+transaction with a single bulk upsert, and rows whose results are already
+linked are skipped, so it is safe to re-run and to run alongside the API.
+
+    python -m backend.dedupe_results [--batch-size 500] [--dry-run]
+    python -m backend.dedupe_results --prune   # drop results no history row links to any more
+"""
+import argparse
+import asyncio
+import logging
+
+import orjson
+from sqlalchemy import delete, exists, func, select, update
+
+from backend.compression import history_payload, load_dictionaries
+from backend.database import SessionLocal, engine
+from backend.models import HistoryItem, HistoryResult, SearchResult
+from backend.result_store import link_results, split_payload
+
+logger = logging.getLogger(__name__)
+
+
+async def dedupe(batch_size: int, dry_run: bool) -> dict:
+    stats = {"scanned": 0, "linked_rows": 0, "linked_results": 0, "bytes_removed": 0}
+    last_id = 0
+    async with SessionLocal() as db:
+        await load_dictionaries(db)
+    while True:
+        async with SessionLocal() as db:
+            rows = (await db.execute(
+                select(HistoryItem.id, HistoryItem.data, HistoryItem.data_z)
+                .where(
+                    HistoryItem.item_type == "search",
+                    HistoryItem.id > last_id,
+                    ~exists().where(HistoryResult.history_id == HistoryItem.id),
+                )
+                .order_by(HistoryItem.id)
+                .limit(batch_size)
+            )).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+            stats["scanned"] += len(rows)
+
+            links = []
+            for row_id, legacy, compressed in rows:
+                data = compressed if compressed is not None else legacy
+                stored, results = split_payload("search", data)
+                if not results:
+                    continue
+                links.append((row_id, results))
+                stats["linked_rows"] += 1
+                stats["linked_results"] += len(results)
+                stats["bytes_removed"] += len(orjson.dumps(data)) - len(orjson.dumps(stored))
+                if not dry_run:
+                    await db.execute(
+                        update(HistoryItem)
+                        .where(HistoryItem.id == row_id)
+                        .values(**history_payload(stored))
+                    )
+            if not dry_run:
+                await link_results(db, links)
+                await db.commit()
+        logger.info(f"Scanned {stats['scanned']} search rows, linked {stats['linked_rows']}")
+    return stats
+
+
+async def prune() -> int:
+    """Delete stored results that no history row links to"""
+    async with SessionLocal() as db:
+        result = await db.execute(
+            delete(SearchResult).where(~exists().where(HistoryResult.result_id == SearchResult.id))
+        )
+        await db.commit()
+        return result.rowcount
+
+
+async def store_size() -> dict:
+    async with SessionLocal() as db:
+        return {
+            "results": await db.scalar(select(func.count()).select_from(SearchResult)),
+            "links": await db.scalar(select(func.count()).select_from(HistoryResult)),
+        }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Move inline search results from history into the shared result store")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--dry-run", action="store_true", help="report what would move without writing")
+    parser.add_argument("--prune", action="store_true", help="only delete results no history row links to")
+    args = parser.parse_args()
+
+    try:
+        if args.prune:
+            print(f"Pruned {await prune()} unlinked results")
+            return
+        stats = await dedupe(args.batch_size, args.dry_run)
+        size = await store_size()
+    finally:
+        await engine.dispose()
+    verb = "Would link" if args.dry_run else "Linked"
+    print(
+        f"{verb} {stats['linked_rows']} of {stats['scanned']} search rows "
+        f"({stats['linked_results']} results, {stats['bytes_removed'] / 1024 / 1024:.1f} MiB of JSON out of the payloads); "
+        f"the store holds {size['results']} distinct results behind {size['links']} links"
+    )
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
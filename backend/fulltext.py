@@ -0,0 +1,114 @@
+# backend/fulltext.py
+"""Full-text search over history.
+
+``history.search_text`` holds the query plus result titles/bodies (filled by a
+column default on insert, see ``models.history_search_text``). The index on top
+of it is dialect specific:
+
+* PostgreSQL: a stored generated ``tsvector`` column with a GIN index, kept
+  current by the database on every insert/update.
+* SQLite: an external-content FTS5 table maintained by insert/update/delete
+  triggers.
+
+Both are created alongside the table by ``create_all`` and by Alembic
+revision 0004 for existing databases.
+"""
+import re
+from typing import List, Optional, Sequence, Tuple
+
+from sqlalchemy import DDL, LargeBinary, Text, event, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.models import HistoryItem
+
+POSTGRES_DDL = [
+    "ALTER TABLE history ADD COLUMN IF NOT EXISTS search_vector tsvector "
+    "GENERATED ALWAYS AS (to_tsvector('english', coalesce(search_text, ''))) STORED",
+    "CREATE INDEX IF NOT EXISTS ix_history_search_vector ON history USING GIN (search_vector)",
+]
+
+SQLITE_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS history_fts USING fts5("
+    "search_text, content='history', content_rowid='id', tokenize='porter unicode61')",
+    "CREATE TRIGGER IF NOT EXISTS history_fts_ai AFTER INSERT ON history BEGIN "
+    "INSERT INTO history_fts(rowid, search_text) VALUES (new.id, new.search_text); END",
+    "CREATE TRIGGER IF NOT EXISTS history_fts_ad AFTER DELETE ON history BEGIN "
+    "INSERT INTO history_fts(history_fts, rowid, search_text) VALUES ('delete', old.id, old.search_text); END",
+    "CREATE TRIGGER IF NOT EXISTS history_fts_au AFTER UPDATE OF search_text ON history BEGIN "
+    "INSERT INTO history_fts(history_fts, rowid, search_text) VALUES ('delete', old.id, old.search_text); "
+    "INSERT INTO history_fts(rowid, search_text) VALUES (new.id, new.search_text); END",
+]
+
+SQLITE_DROP_DDL = [
+    "DROP TRIGGER IF EXISTS history_fts_au",
+    "DROP TRIGGER IF EXISTS history_fts_ad",
+    "DROP TRIGGER IF EXISTS history_fts_ai",
+    "DROP TABLE IF EXISTS history_fts",
+]
+
+POSTGRES_DROP_DDL = [
+    "DROP INDEX IF EXISTS ix_history_search_vector",
+    "ALTER TABLE history DROP COLUMN IF EXISTS search_vector",
+]
+
+for _stmt in POSTGRES_DDL:
+    event.listen(HistoryItem.__table__, "after_create", DDL(_stmt).execute_if(dialect="postgresql"))
+for _stmt in SQLITE_DDL:
+    event.listen(HistoryItem.__table__, "after_create", DDL(_stmt).execute_if(dialect="sqlite"))
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+def fts5_query(q: str) -> Optional[str]:
+    """Turn free text into an FTS5 MATCH expression: every word required, quoted"""
+    tokens = _TOKEN_RE.findall(q)
+    if not tokens:
+        return None
+    return " ".join(f'"{t}"' for t in tokens)
+
+async def search_history(
+    db: AsyncSession,
+    user_id: int,
+    q: str,
+    item_type: Optional[str],
+    limit: int,
+    offset: int,
+    include_data: bool,
+) -> Tuple[List[str], Sequence]:
+    """Ranked full-text matches for one user, best first, as (column names, rows).
+
+    With ``include_data`` the last two columns are the stored payload, ``data``
+    (plain JSON text) and ``data_z`` (compressed), exactly as the dashboard's
+    own listing query returns them.
+    """
+    columns = "h.id, h.uid, h.item_type, h.query, h.created_at, h.user_id"
+    payload = ", h.data, h.data_z" if include_data else ""
+    type_filter = "AND h.item_type = :item_type" if item_type else ""
+    params = {"user_id": user_id, "item_type": item_type, "limit": limit, "offset": offset}
+
+    if db.bind.dialect.name == "postgresql":
+        params["q"] = q
+        sql = f"""
+            SELECT {columns}, ts_rank(h.search_vector, query) AS score{payload}
+            FROM history h, websearch_to_tsquery('english', :q) query
+            WHERE h.user_id = :user_id {type_filter} AND h.search_vector @@ query
+            ORDER BY score DESC, h.id DESC
+            LIMIT :limit OFFSET :offset
+        """
+    else:
+        match = fts5_query(q)
+        if match is None:
+            return [], []
+        params["q"] = match
+        # bm25() is lower-is-better; negate so score reads the same on both backends
+        sql = f"""
+            SELECT {columns}, -bm25(history_fts) AS score{payload}
+            FROM history_fts JOIN history h ON h.id = history_fts.rowid
+            WHERE history_fts MATCH :q AND h.user_id = :user_id {type_filter}
+            ORDER BY score DESC, h.id DESC
+            LIMIT :limit OFFSET :offset
+        """
+
+    table = HistoryItem.__table__
+    stmt = text(sql).columns(created_at=table.c.created_at.type, data=Text, data_z=LargeBinary)
+    result = await db.execute(stmt, params)
+    return list(result.keys()), result.all()
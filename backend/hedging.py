@@ -0,0 +1,126 @@
+# backend/hedging.py
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SEARCH_HEDGE_ENABLED = os.getenv("SEARCH_HEDGE_ENABLED", "0") in ("1", "true", "True")
+SEARCH_HEDGE_PERCENTILE = float(os.getenv("SEARCH_HEDGE_PERCENTILE", "0.95"))
+SEARCH_HEDGE_DELAY = float(os.getenv("SEARCH_HEDGE_DELAY", "1.0"))
+SEARCH_HEDGE_MIN_DELAY = float(os.getenv("SEARCH_HEDGE_MIN_DELAY", "0.1"))
+SEARCH_HEDGE_MAX_MULTIPLE = float(os.getenv("SEARCH_HEDGE_MAX_MULTIPLE", "3"))
+
+
+class Hedge:
+    """Race a backup call against a primary that is slower than usual.
+
+    The primary starts alone. If it has not finished after ``delay()``
+    seconds (the primary's recent latency at ``percentile``, or
+    ``default_delay`` until enough samples exist, and never more than
+    ``max_multiple`` x the median), the backup is started as well; the
+    first successful result wins and the other call is cancelled.
+    A primary that fails before the delay falls through to the backup like a
+    plain fallback, which is not counted as a hedge.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        latency_percentile: Callable[[float], Optional[float]],
+        on_abandon: Callable[[float], None],
+        percentile: float = SEARCH_HEDGE_PERCENTILE,
+        default_delay: float = SEARCH_HEDGE_DELAY,
+        min_delay: float = SEARCH_HEDGE_MIN_DELAY,
+        max_multiple: float = SEARCH_HEDGE_MAX_MULTIPLE,
+        enabled: bool = True,
+    ):
+        self.name = name
+        self.enabled = enabled
+        self._latency_percentile = latency_percentile
+        self._on_abandon = on_abandon
+        self.percentile = percentile
+        self.default_delay = default_delay
+        self.min_delay = min_delay
+        self.max_multiple = max_multiple
+        self.calls = 0
+        self.fired = 0
+        self.backup_won = 0
+        self.primary_won = 0
+
+    def delay(self) -> float:
+        observed = self._latency_percentile(self.percentile)
+        if observed is None:
+            return max(self.min_delay, self.default_delay)
+        # Over a short window the percentile can land on the slow calls themselves,
+        # and a backup fired that late can't help, so cap it relative to the median
+        median = self._latency_percentile(0.5)
+        if median and self.max_multiple > 0:
+            observed = min(observed, median * self.max_multiple)
+        return max(self.min_delay, observed)
+
+    async def race(
+        self,
+        primary: Callable[[], Awaitable[Any]],
+        backup: Callable[[], Awaitable[Any]],
+    ) -> Tuple[Any, bool]:
+        """Returns (result, used_backup)"""
+        self.calls += 1
+        started = time.monotonic()
+        first = asyncio.ensure_future(primary())
+        second: Optional[asyncio.Future] = None
+        try:
+            done, _ = await asyncio.wait({first}, timeout=self.delay())
+            if not done:
+                self.fired += 1
+                second = asyncio.ensure_future(backup())
+                pending = {first, second}
+                while pending:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in (first, second):
+                        if task in done and task.exception() is None:
+                            if task is second:
+                                self.backup_won += 1
+                                # Keep the primary's latency samples honest: it took at least this long
+                                self._on_abandon(time.monotonic() - started)
+                            else:
+                                self.primary_won += 1
+                            return task.result(), task is second
+                raise second.exception()
+        finally:
+            for task in (first, second):
+                if task is not None and not task.done():
+                    task.cancel()
+        if first.exception() is None:
+            return first.result(), False
+        logger.warning(f"{self.name} primary failed: {first.exception()}, falling back")
+        return await backup(), True
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "delay": round(self.delay(), 4),
+            "calls": self.calls,
+            "fired": self.fired,
+            "backup_won": self.backup_won,
+            "primary_won": self.primary_won,
+            "fire_ratio": round(self.fired / self.calls, 4) if self.calls else 0.0,
+            "backup_win_ratio": round(self.backup_won / self.fired, 4) if self.fired else 0.0,
+        }
+
+
+def _search_hedge() -> Hedge:
+    from backend.mcp_clients import search_client
+    # Looked up per call, so a breaker that is replaced (e.g. reset) stays wired up
+    return Hedge(
+        "search",
+        latency_percentile=lambda pct: search_client.breaker.latency_percentile(pct),
+        on_abandon=lambda latency: search_client.breaker.observe_latency(latency),
+        enabled=SEARCH_HEDGE_ENABLED,
+    )
+
+
+# MCP search hedged with the DuckDuckGo fallback (off unless SEARCH_HEDGE_ENABLED)
+search_hedge = _search_hedge()
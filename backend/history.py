@@ -0,0 +1,325 @@
+# backend/history.py
+import asyncio
+import logging
+import os
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, NamedTuple, Optional, Set, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.compression import history_payload
+from backend.database import SessionLocal
+from backend.metrics import gauge, stage_timer
+from backend.models import HistoryItem, history_search_text
+from backend.result_store import link_results, split_payload
+
+logger = logging.getLogger(__name__)
+
+HISTORY_WRITE_BEHIND = os.getenv("HISTORY_WRITE_BEHIND", "0") in ("1", "true", "True")
+HISTORY_QUEUE_MAX = int(os.getenv("HISTORY_QUEUE_MAX", "10000"))
+HISTORY_BATCH_SIZE = int(os.getenv("HISTORY_BATCH_SIZE", "200"))
+HISTORY_FLUSH_INTERVAL = float(os.getenv("HISTORY_FLUSH_INTERVAL", "0.5"))
+HISTORY_ENQUEUE_TIMEOUT = float(os.getenv("HISTORY_ENQUEUE_TIMEOUT", "2"))
+
+
+class SavedHistory(NamedTuple):
+    id: Optional[int]   # database id; None until a write-behind row is flushed
+    uid: str            # stable id, known before the row is written
+
+
+class HistoryWriter:
+    """Write-behind buffer that flushes HistoryItem rows in multi-row batches.
+
+    Rows go into a bounded queue; a background task drains it and inserts a
+    batch once HISTORY_BATCH_SIZE rows are waiting or HISTORY_FLUSH_INTERVAL
+    has passed since the first row of the batch arrived. When the queue is
+    full, callers wait up to HISTORY_ENQUEUE_TIMEOUT before being rejected.
+
+    A (user_id, uid) already waiting in the queue or already in the table
+    is a retried request, not a new row: the queued copy is dropped and
+    counted as replayed.
+    """
+
+    def __init__(
+        self,
+        max_size: int = HISTORY_QUEUE_MAX,
+        batch_size: int = HISTORY_BATCH_SIZE,
+        flush_interval: float = HISTORY_FLUSH_INTERVAL,
+    ):
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._batch: List[Dict[str, Any]] = []
+        self._flushing: Optional[asyncio.Future] = None
+        self._pending: Set[Tuple[int, str]] = set()  # (user_id, uid) queued or being written
+        self.enqueued = 0
+        self.written = 0
+        self.batches = 0
+        self.failed = 0
+        self.rejected = 0
+        self.replayed = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self):
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_size)
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"History write-behind started (batch={self.batch_size}, interval={self.flush_interval}s)")
+
+    async def stop(self):
+        """Stop the flusher and write whatever is still queued"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        if self._flushing is not None:
+            await self._flushing
+        rows, self._batch = self._batch, []
+        await self._flush(rows)
+        while not self._queue.empty():
+            await self._flush(self._drain(self.batch_size))
+        logger.info(f"History write-behind stopped, {self.written} rows written")
+
+    async def enqueue(self, row: Dict[str, Any], timeout: float = HISTORY_ENQUEUE_TIMEOUT):
+        key = (row["user_id"], row["uid"])
+        if key in self._pending:
+            self.replayed += 1
+            return
+        self._pending.add(key)
+        queued = False
+        try:
+            await asyncio.wait_for(self._queue.put(row), timeout)
+            queued = True
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=503,
+                detail="History queue is full, please retry",
+                headers={"Retry-After": "1"},
+            )
+        finally:
+            if not queued:
+                self._pending.discard(key)
+        self.enqueued += 1
+
+    def _drain(self, limit: int) -> List[Dict[str, Any]]:
+        rows = []
+        while len(rows) < limit and not self._queue.empty():
+            rows.append(self._queue.get_nowait())
+        return rows
+
+    async def _run(self):
+        while True:
+            # Rows live on self._batch until flushed so stop() can recover them
+            self._batch = [await self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(self._batch) < self.batch_size:
+                self._batch.extend(self._drain(self.batch_size - len(self._batch)))
+                remaining = deadline - time.monotonic()
+                if len(self._batch) >= self.batch_size or remaining <= 0:
+                    break
+                try:
+                    self._batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            rows, self._batch = self._batch, []
+            # Shield the insert so shutdown never abandons a half-written batch
+            self._flushing = asyncio.ensure_future(self._flush(rows))
+            await asyncio.shield(self._flushing)
+
+    async def _flush(self, rows: List[Dict[str, Any]]):
+        if not rows:
+            return
+        try:
+            await self._insert(rows)
+        finally:
+            for row in rows:
+                self._pending.discard((row["user_id"], row["uid"]))
+
+    async def _insert(self, rows: List[Dict[str, Any]]):
+        try:
+            async with SessionLocal() as db:
+                with stage_timer("history", "flush_batch"):
+                    values = [{k: v for k, v in row.items() if k != "results"} for row in rows]
+                    results = [row["results"] for row in rows]
+                    if any(results):
+                        stmt = insert(HistoryItem).returning(HistoryItem.id, sort_by_parameter_order=True)
+                        ids = (await db.execute(stmt, values)).scalars().all()
+                        await link_results(db, zip(ids, results))
+                    else:
+                        await db.execute(insert(HistoryItem), values)
+                    await db.commit()
+            self.written += len(rows)
+            self.batches += 1
+        except Exception as e:
+            if len(rows) == 1:
+                row = rows[0]
+                if isinstance(e, IntegrityError) and await self._already_saved(row):
+                    self.replayed += 1
+                    logger.info(f"History row {row['uid']} was already saved by an earlier attempt")
+                    return
+                self.failed += 1
+                logger.error(f"Failed to write history row {row.get('uid')}: {e}")
+                return
+            # One bad row (e.g. a retried request's uid) must not sink the batch
+            logger.warning(f"Batch insert of {len(rows)} history rows failed ({e}), retrying row by row")
+            for row in rows:
+                await self._insert([row])
+
+    async def _already_saved(self, row: Dict[str, Any]) -> bool:
+        try:
+            async with SessionLocal() as db:
+                return await find_history_id(db, row["user_id"], row["uid"]) is not None
+        except Exception:
+            return False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": HISTORY_WRITE_BEHIND,
+            "running": self.running,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "queue_max": self.max_size,
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "batches": self.batches,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "replayed": self.replayed,
+        }
+
+
+history_writer = HistoryWriter()
+
+
+@gauge("aigen_history_queue_depth", "Rows waiting in the write-behind history queue")
+def _history_queue_depth():
+    return {(): history_writer.stats()["queue_depth"]}
+
+
+def new_history_uid(client_uid: Optional[str] = None) -> str:
+    """Use the client's UUID when it sent a valid one, otherwise mint one.
+
+    uids are unique per user: the same client UUID from the same user is a
+    retry of one request and maps to one row.
+    """
+    if client_uid:
+        try:
+            return str(uuid.UUID(client_uid))
+        except ValueError:
+            pass
+    return str(uuid.uuid4())
+
+
+async def find_history_id(db: AsyncSession, user_id: int, uid: str) -> Optional[int]:
+    return await db.scalar(select(HistoryItem.id).where(HistoryItem.user_id == user_id, HistoryItem.uid == uid))
+
+
+def new_history_item(uid: str, user_id: int, item_type: str, query: str, data: Any) -> Tuple[HistoryItem, List[dict]]:
+    """A HistoryItem for ``data`` and the search results left out of it for result_store to link"""
+    stored, results = split_payload(item_type, data)
+    item = HistoryItem(
+        uid=uid, item_type=item_type, query=query, user_id=user_id,
+        search_text=history_search_text(query, data), **history_payload(stored),
+    )
+    return item, results
+
+
+async def save_history(
+    db: AsyncSession,
+    user_id: int,
+    item_type: str,
+    query: str,
+    data: Any,
+    uid: Optional[str] = None,
+) -> SavedHistory:
+    """Persist one history row, inline or through the write-behind queue.
+
+    Database errors are logged and swallowed so a failed save never fails the
+    request; only write-behind backpressure surfaces to the caller (503).
+    A uid the user already saved (a retry reusing its X-Request-ID) is not
+    written again; the earlier row's id comes back instead.
+    """
+    uid = uid or new_history_uid()
+    if HISTORY_WRITE_BEHIND and history_writer.running:
+        stored, results = split_payload(item_type, data)
+        with stage_timer("history", "enqueue"):
+            await history_writer.enqueue({
+                "uid": uid,
+                "item_type": item_type,
+                "query": query,
+                **history_payload(stored),
+                "search_text": history_search_text(query, data),
+                "user_id": user_id,
+                "created_at": datetime.utcnow(),
+                "results": results,
+            })
+        return SavedHistory(None, uid)
+
+    try:
+        item, results = new_history_item(uid, user_id, item_type, query, data)
+        db.add(item)
+        with stage_timer("history", "db_commit"):
+            if results:
+                await db.flush()
+                await link_results(db, [(item.id, results)])
+            await db.commit()
+        logger.info(f"Saved {item_type} history item {item.id}")
+        return SavedHistory(item.id, uid)
+    except Exception as db_error:
+        # Don't fail the request if we can't save to DB
+        await db.rollback()
+        if isinstance(db_error, IntegrityError):
+            try:
+                existing = await find_history_id(db, user_id, uid)
+            except Exception:
+                existing = None
+            if existing is not None:
+                logger.info(f"{item_type} history item {existing} was already saved by an earlier attempt")
+                return SavedHistory(existing, uid)
+        logger.error(f"Failed to save {item_type} history: {db_error}")
+        return SavedHistory(None, uid)
+
+
+async def save_history_batch(
+    db: AsyncSession,
+    user_id: int,
+    item_type: str,
+    rows: List[Tuple[str, Any]],
+) -> List[SavedHistory]:
+    """Persist (query, data) pairs in a single transaction, in order.
+
+    Like save_history, a database failure is logged and every row comes back
+    with id None rather than failing the request.
+    """
+    pending = [new_history_item(new_history_uid(), user_id, item_type, query, data) for query, data in rows]
+    items = [item for item, _ in pending]
+    if not items:
+        return []
+    try:
+        db.add_all(items)
+        with stage_timer("history", "db_commit_batch"):
+            if any(results for _, results in pending):
+                await db.flush()
+                await link_results(db, [(item.id, results) for item, results in pending])
+            await db.commit()
+        logger.info(f"Saved {len(items)} {item_type} history items in one transaction")
+        return [SavedHistory(item.id, item.uid) for item in items]
+    except Exception as db_error:
+        logger.error(f"Failed to save {item_type} history batch: {db_error}")
+        await db.rollback()
+        return [SavedHistory(None, item.uid) for item in items]
@@ -0,0 +1,242 @@
+# backend/jobs.py
+import asyncio
+import logging
+import os
+import time
+import uuid
+from collections import deque
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+from fastapi import HTTPException
+
+from backend.metrics import gauge, stage_seconds
+
+logger = logging.getLogger(__name__)
+
+IMAGE_JOB_WORKERS = int(os.getenv("IMAGE_JOB_WORKERS", "4"))
+IMAGE_JOB_QUEUE_MAX = int(os.getenv("IMAGE_JOB_QUEUE_MAX", "500"))
+IMAGE_JOB_RESULT_TTL = float(os.getenv("IMAGE_JOB_RESULT_TTL", "3600"))
+
+TERMINAL_STATUSES = ("succeeded", "failed")
+
+
+def _iso(ts: Optional[float]) -> Optional[str]:
+    return datetime.utcfromtimestamp(ts).isoformat() + "Z" if ts is not None else None
+
+
+def _timing_stats(samples: Deque[float]) -> Dict[str, float]:
+    if not samples:
+        return {"count": 0, "avg": 0.0, "p95": 0.0, "max": 0.0}
+    ordered = sorted(samples)
+    return {
+        "count": len(ordered),
+        "avg": round(sum(ordered) / len(ordered), 4),
+        "p95": round(ordered[max(0, int(round(len(ordered) * 0.95)) - 1)], 4),
+        "max": round(ordered[-1], 4),
+    }
+
+
+class Job:
+    """One queued unit of work and its observable state.
+
+    Every status change swaps in a fresh event after setting the old one, so
+    any number of watchers can wait for "the next change" without polling.
+    """
+
+    def __init__(self, job_id: str, owner_id: int, fn: Callable[[str], Awaitable[Any]]):
+        self.id = job_id
+        self.owner_id = owner_id
+        self.fn = fn
+        self.status = "queued"
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.status_code: Optional[int] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._changed = asyncio.Event()
+
+    @property
+    def done(self) -> bool:
+        return self.status in TERMINAL_STATUSES
+
+    def _transition(self, status: str, **fields):
+        self.status = status
+        for name, value in fields.items():
+            setattr(self, name, value)
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def wait_changed(self, timeout: float) -> bool:
+        """Wait for the next status change; False if ``timeout`` passed first"""
+        changed = self._changed
+        try:
+            await asyncio.wait_for(changed.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def snapshot(self) -> Dict[str, Any]:
+        now = time.time()
+        started = self.started_at or (None if self.done else now)
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "created_at": _iso(self.created_at),
+            "started_at": _iso(self.started_at),
+            "finished_at": _iso(self.finished_at),
+            "wait_time": round((started or now) - self.created_at, 3),
+            "run_time": round((self.finished_at or now) - self.started_at, 3) if self.started_at else None,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class JobQueue:
+    """Bounded in-process job queue drained by a fixed pool of worker tasks.
+
+    Jobs are tracked in memory by id so clients can poll or stream them;
+    finished jobs are forgotten ``result_ttl`` seconds after they complete.
+    A full queue rejects new jobs with 503 and Retry-After instead of
+    growing without bound.
+    """
+
+    def __init__(self, name: str, workers: int, max_size: int, result_ttl: float):
+        self.name = name
+        self.workers = workers
+        self.max_size = max_size
+        self.result_ttl = result_ttl
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._jobs: Dict[str, Job] = {}
+        self._last_prune = 0.0
+        self.busy = 0
+        self.submitted = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.rejected = 0
+        self.wait_times: Deque[float] = deque(maxlen=1000)
+        self.run_times: Deque[float] = deque(maxlen=1000)
+
+    @property
+    def running(self) -> bool:
+        return any(not t.done() for t in self._tasks)
+
+    async def start(self):
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_size)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        logger.info(f"{self.name} job queue started with {self.workers} workers")
+
+    async def stop(self):
+        """Cancel the workers; running and still-queued jobs are marked failed"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        while self._queue is not None and not self._queue.empty():
+            job = self._queue.get_nowait()
+            job._transition("failed", error="Server shutting down", status_code=503, finished_at=time.time())
+        logger.info(f"{self.name} job queue stopped")
+
+    def submit(self, job_id: str, owner_id: int, fn: Callable[[str], Awaitable[Any]]) -> Job:
+        """Queue ``fn(job_id)``; resubmitting an id the owner already used returns that job"""
+        if not self.running:
+            raise HTTPException(status_code=503, detail=f"{self.name} job workers are not running")
+        self._prune()
+        existing = self._jobs.get(job_id)
+        if existing is not None:
+            if existing.owner_id == owner_id:
+                return existing
+            job_id = str(uuid.uuid4())
+        job = Job(job_id, owner_id, fn)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=503,
+                detail=f"{self.name} job queue is full, please retry",
+                headers={"Retry-After": "5"},
+            )
+        self._jobs[job_id] = job
+        self.submitted += 1
+        return job
+
+    def get(self, job_id: str, owner_id: int) -> Optional[Job]:
+        job = self._jobs.get(job_id)
+        if job is None or job.owner_id != owner_id:
+            return None
+        return job
+
+    def _prune(self):
+        now = time.time()
+        if now - self._last_prune < 60:
+            return
+        self._last_prune = now
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.done and now - job.finished_at > self.result_ttl
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            self.busy += 1
+            job._transition("running", started_at=time.time())
+            self.wait_times.append(job.started_at - job.created_at)
+            stage_seconds.observe(job.started_at - job.created_at, "jobs", f"{self.name.lower()}_queue_wait")
+            try:
+                result = await job.fn(job.id)
+                job._transition("succeeded", result=result, finished_at=time.time())
+                self.succeeded += 1
+            except HTTPException as e:
+                job._transition("failed", error=e.detail, status_code=e.status_code, finished_at=time.time())
+                self.failed += 1
+            except asyncio.CancelledError:
+                job._transition("failed", error="Server shutting down", status_code=503, finished_at=time.time())
+                self.failed += 1
+                raise
+            except Exception as e:
+                logger.error(f"{self.name} job {job.id} failed: {e}")
+                job._transition("failed", error=f"{self.name} job failed", status_code=500, finished_at=time.time())
+                self.failed += 1
+            finally:
+                self.busy -= 1
+                if job.finished_at is not None:
+                    self.run_times.append(job.finished_at - job.started_at)
+                    stage_seconds.observe(job.finished_at - job.started_at, "jobs", f"{self.name.lower()}_run")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "workers": self.workers,
+            "busy": self.busy,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "queue_max": self.max_size,
+            "tracked": len(self._jobs),
+            "submitted": self.submitted,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "wait_time": _timing_stats(self.wait_times),
+            "run_time": _timing_stats(self.run_times),
+        }
+
+
+image_jobs = JobQueue(
+    "Image",
+    workers=IMAGE_JOB_WORKERS,
+    max_size=IMAGE_JOB_QUEUE_MAX,
+    result_ttl=IMAGE_JOB_RESULT_TTL,
+)
+
+
+@gauge("aigen_image_jobs", "Image jobs waiting in the queue and running on workers", ("state",))
+def _image_jobs_gauge():
+    stats = image_jobs.stats()
+    return {("queued",): stats["queue_depth"], ("running",): stats["busy"]}
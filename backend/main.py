@@ -1,11 +1,21 @@
 # backend/main.py
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+import asyncio
 import logging
-from backend.routers import image, dashboard, search, auth
-from backend.mcp_clients import init_mcp_clients, cleanup_mcp_clients
-from backend.database import engine, Base
+from backend.routers import image, dashboard, search, auth, blobs
+from backend.mcp_clients import (
+    connect_search_client, connect_image_client, cleanup_mcp_clients, init_http_client, close_http_client
+)
+from backend.database import init_db
+from backend.history import history_writer, HISTORY_WRITE_BEHIND
+from backend.jobs import image_jobs
+from backend.retention import history_purger
+from backend.metrics import MetricsMiddleware, render_metrics
+from backend.utils import warm_auth
+from backend.warmup import warmup, STARTUP_WARMUP_BLOCKING
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -17,22 +27,27 @@ async def lifespan(app: FastAPI):
     # Startup
     logger.info("Starting up AI-Gen application...")
     
-    # Create database tables
-    try:
-        Base.metadata.create_all(bind=engine)
-        logger.info("Database tables created/verified")
-    except Exception as e:
-        logger.error(f"Database setup failed: {e}")
+    # Optional write-behind batching for history rows
+    if HISTORY_WRITE_BEHIND:
+        await history_writer.start()
     
-    # Initialize MCP clients
-    try:
-        mcp_success = await init_mcp_clients()
-        if mcp_success:
-            logger.info("MCP clients initialized successfully")
-        else:
-            logger.warning("Some MCP clients failed to initialize, fallback methods will be used")
-    except Exception as e:
-        logger.error(f"MCP client initialization failed: {e}")
+    # Shared pooled HTTP client for the fallback APIs
+    await init_http_client()
+    
+    # Background workers for queued image jobs
+    await image_jobs.start()
+    
+    # Database setup, both MCP handshakes and the auth libraries warm up
+    # concurrently; only the database has to be ready before serving
+    warmup.add("database", init_db, required=True)
+    warmup.add("mcp_search", connect_search_client)
+    warmup.add("mcp_image", connect_image_client)
+    warmup.add("auth", lambda: asyncio.to_thread(warm_auth))
+    await warmup.start()
+    await warmup.wait(required_only=not STARTUP_WARMUP_BLOCKING)
+    
+    # Retention policies, purge and compaction, once the database is up
+    await history_purger.start()
     
     logger.info("Application startup complete")
     
@@ -40,12 +55,24 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     logger.info("Shutting down application...")
+    await warmup.stop()
+    await history_purger.stop()
+    await image_jobs.stop()
+    
     try:
         await cleanup_mcp_clients()
         logger.info("MCP clients cleaned up")
     except Exception as e:
         logger.error(f"MCP cleanup failed: {e}")
     
+    await close_http_client()
+    
+    # Flush queued history rows before the engine goes away
+    try:
+        await history_writer.stop()
+    except Exception as e:
+        logger.error(f"History flush failed: {e}")
+    
     logger.info("Application shutdown complete")
 
 # Create FastAPI app with lifespan management
@@ -63,6 +90,9 @@ origins = [
     "https://your-domain.com",  # Production domain
 ]
 
+# Per-route request histograms, exposed on /metrics
+app.add_middleware(MetricsMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
@@ -80,25 +110,69 @@ async def root():
         "status": "healthy"
     }
 
+@app.get("/ready", tags=["health"])
+async def readiness_check():
+    """Readiness probe: 503 until the database is set up and warm-up has finished or run out of time"""
+    return JSONResponse(warmup.stats(), status_code=200 if warmup.ready else 503)
+
 @app.get("/health", tags=["health"])
 async def health_check():
-    """Health check endpoint for monitoring"""
-    from backend.mcp_clients import search_client, image_client
+    """Liveness check with in-memory stats only; it never waits on the database or upstreams"""
+    from backend.mcp_clients import mcp_pool_stats, mcp_breaker_stats
+    from backend.cache import search_cache, image_cache
+    from backend.singleflight import search_flight, image_flight
+    from backend.hedging import search_hedge
+    from backend.database import db_pool_stats
+    from backend.utils import token_cache, user_cache, password_pool_stats
+    from backend.ratelimit import rate_limit_stats
+    
+    pools = mcp_pool_stats()
+    breakers = mcp_breaker_stats()
+    
+    def mcp_status(name):
+        if breakers[name]["state"] != "closed":
+            return "circuit_" + breakers[name]["state"]
+        return "connected" if pools[name]["open"] else "disconnected"
     
     return {
         "status": "healthy",
         "services": {
             "database": "connected",  # Could add actual DB health check
-            "mcp_search": "connected" if search_client.session else "disconnected",
-            "mcp_image": "connected" if image_client.session else "disconnected",
-        }
+            "mcp_search": mcp_status("search"),
+            "mcp_image": mcp_status("image"),
+        },
+        "db_pool": db_pool_stats(),
+        "history_writer": history_writer.stats(),
+        "mcp_pools": pools,
+        "mcp_breakers": breakers,
+        "search_cache": search_cache.stats(),
+        "image_cache": image_cache.stats(),
+        "search_hedge": search_hedge.stats(),
+        "password_pool": password_pool_stats(),
+        "auth_cache": {
+            "tokens": token_cache.stats(),
+            "users": user_cache.stats(),
+        },
+        "image_jobs": image_jobs.stats(),
+        "retention": history_purger.stats(),
+        "rate_limits": rate_limit_stats(),
+        "single_flight": {
+            "search": search_flight.stats(),
+            "image": image_flight.stats(),
+        },
     }
 
+@app.get("/metrics", tags=["health"], response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus text exposition of request, stage, pool and queue metrics"""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
 # Include routers
 app.include_router(auth.router, prefix="/auth", tags=["Authentication"])
 app.include_router(search.router, prefix="/search", tags=["Search"])
 app.include_router(image.router, prefix="/image", tags=["Image Generation"])
 app.include_router(dashboard.router, prefix="/dashboard", tags=["Dashboard"])
+app.include_router(blobs.router, prefix="/images", tags=["Image Generation"])
 
 if __name__ == "__main__":
     import uvicorn
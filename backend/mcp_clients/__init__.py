@@ -1,7 +1,11 @@
+import asyncio
 import logging
+from backend.metrics import gauge
+from .pool import MCPSessionPool
+from .breaker import CircuitBreaker, CircuitOpenError
 from .search_client import MCPSearchClient
 from .image_client import MCPImageClient
-from .fallbacks import fallback_search, fallback_image_generation
+from .fallbacks import fallback_search, fallback_image_generation, init_http_client, close_http_client
 
 logger = logging.getLogger(__name__)
 
@@ -9,23 +13,55 @@ logger = logging.getLogger(__name__)
 search_client: MCPSearchClient = MCPSearchClient()
 image_client: MCPImageClient = MCPImageClient()
 
-async def init_mcp_clients() -> bool:
-    ok = True
-    try:
-        await search_client.connect()
+async def connect_search_client() -> bool:
+    if await search_client.connect():
         logger.info("Search MCP client connected")
-    except Exception as e:
-        logger.error(f"Search MCP client failed: {e}")
-        ok = False
+        return True
+    logger.error("Search MCP client failed to connect")
+    return False
 
-    try:
-        await image_client.connect()
+async def connect_image_client() -> bool:
+    if await image_client.connect():
         logger.info("Image MCP client connected")
-    except Exception as e:
-        logger.error(f"Image MCP client failed: {e}")
-        ok = False
-    return ok
+        return True
+    logger.error("Image MCP client failed to connect")
+    return False
+
+async def init_mcp_clients() -> bool:
+    # The two servers are independent, so handshake with both at once
+    results = await asyncio.gather(connect_search_client(), connect_image_client())
+    return all(results)
 
 async def cleanup_mcp_clients():
-    # Nothing to disconnect, since sessions are per-request
-    return
+    # Close every pooled session so the transports shut down cleanly
+    for client in (search_client, image_client):
+        try:
+            await client.disconnect()
+        except Exception as e:
+            logger.error(f"Failed to close MCP session pool: {e}")
+
+def mcp_pool_stats():
+    return {
+        "search": search_client.pool.stats(),
+        "image": image_client.pool.stats(),
+    }
+
+def mcp_breaker_stats():
+    return {
+        "search": search_client.breaker.stats(),
+        "image": image_client.breaker.stats(),
+    }
+
+_BREAKER_STATES = {"closed": 0, "half_open": 1, "open": 2}
+
+@gauge("aigen_mcp_sessions", "Pooled MCP sessions by upstream and state", ("upstream", "state"))
+def _mcp_session_gauge():
+    values = {}
+    for upstream, stats in mcp_pool_stats().items():
+        for state in ("open", "idle", "in_use"):
+            values[(upstream, state)] = stats[state]
+    return values
+
+@gauge("aigen_mcp_breaker_state", "MCP circuit breaker state (0 closed, 1 half-open, 2 open)", ("upstream",))
+def _mcp_breaker_gauge():
+    return {(upstream,): _BREAKER_STATES[stats["state"]] for upstream, stats in mcp_breaker_stats().items()}
@@ -0,0 +1,183 @@
+# backend/mcp_clients/breaker.py
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Tuple
+
+from .pool import MCP_CALL_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+MCP_BREAKER_ENABLED = os.getenv("MCP_BREAKER_ENABLED", "1") not in ("0", "false", "False")
+MCP_BREAKER_WINDOW = int(os.getenv("MCP_BREAKER_WINDOW", "20"))
+MCP_BREAKER_MIN_CALLS = int(os.getenv("MCP_BREAKER_MIN_CALLS", "10"))
+MCP_BREAKER_FAILURE_RATE = float(os.getenv("MCP_BREAKER_FAILURE_RATE", "0.5"))
+MCP_BREAKER_CONSECUTIVE_FAILURES = int(os.getenv("MCP_BREAKER_CONSECUTIVE_FAILURES", "5"))
+MCP_BREAKER_OPEN_SECONDS = float(os.getenv("MCP_BREAKER_OPEN_SECONDS", "30"))
+MCP_BREAKER_HALF_OPEN_CALLS = int(os.getenv("MCP_BREAKER_HALF_OPEN_CALLS", "1"))
+MCP_TIMEOUT_MULTIPLIER = float(os.getenv("MCP_TIMEOUT_MULTIPLIER", "2"))
+MCP_TIMEOUT_MIN = float(os.getenv("MCP_TIMEOUT_MIN", "2"))
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose breaker is open"""
+
+
+def _percentile(ordered, pct: float) -> float:
+    return ordered[max(0, int(round(len(ordered) * pct)) - 1)] if ordered else 0.0
+
+
+class CircuitBreaker:
+    """Closed / open / half-open breaker with an adaptive call timeout.
+
+    The last ``window`` calls are kept as (ok, latency) samples. Once at
+    least ``min_calls`` are recorded and the failure rate reaches
+    ``failure_rate`` (or ``consecutive_failures`` calls in a row fail, so a
+    sudden outage trips it without waiting out a window of old successes),
+    the breaker opens and calls fail immediately with CircuitOpenError. After ``open_seconds`` it lets ``half_open_calls``
+    probes through: a successful probe closes it with a clean window, a
+    failed one opens it again.
+
+    Each call is bounded by ``multiplier`` x the p99 latency of recent
+    successes, clamped to [MCP_TIMEOUT_MIN, MCP_CALL_TIMEOUT], so a degraded
+    upstream is given up on long before the static timeout.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        window: int = MCP_BREAKER_WINDOW,
+        min_calls: int = MCP_BREAKER_MIN_CALLS,
+        failure_rate: float = MCP_BREAKER_FAILURE_RATE,
+        consecutive_failures: int = MCP_BREAKER_CONSECUTIVE_FAILURES,
+        open_seconds: float = MCP_BREAKER_OPEN_SECONDS,
+        half_open_calls: int = MCP_BREAKER_HALF_OPEN_CALLS,
+        enabled: bool = MCP_BREAKER_ENABLED,
+    ):
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_rate_threshold = failure_rate
+        self.consecutive_threshold = consecutive_failures
+        self.consecutive = 0
+        self.open_seconds = open_seconds
+        self.half_open_calls = max(1, half_open_calls)
+        self.enabled = enabled
+        self.state = CLOSED
+        self._samples: Deque[Tuple[bool, float]] = deque(maxlen=window)
+        self._latencies: Deque[float] = deque(maxlen=window)  # successful calls only
+        self._opened_at = 0.0
+        self._probes = 0
+        self.opened = 0
+        self.rejected = 0
+        self.timeouts = 0
+
+    def failure_rate(self) -> float:
+        if not self._samples:
+            return 0.0
+        return sum(1 for ok, _ in self._samples if not ok) / len(self._samples)
+
+    def timeout(self) -> float:
+        if not self.enabled or len(self._latencies) < self.min_calls:
+            return MCP_CALL_TIMEOUT
+        p99 = _percentile(sorted(self._latencies), 0.99)
+        return min(MCP_CALL_TIMEOUT, max(MCP_TIMEOUT_MIN, p99 * MCP_TIMEOUT_MULTIPLIER))
+
+    def latency_percentile(self, pct: float):
+        """Recent success latency at ``pct``, or None until min_calls samples exist"""
+        if len(self._latencies) < self.min_calls:
+            return None
+        return _percentile(sorted(self._latencies), pct)
+
+    def observe_latency(self, latency: float):
+        """Record a lower bound for a call abandoned by its caller (e.g. a lost hedge)"""
+        self._latencies.append(latency)
+
+    def allow(self) -> bool:
+        if not self.enabled or self.state == CLOSED:
+            return True
+        if self.state == OPEN:
+            if time.monotonic() - self._opened_at < self.open_seconds:
+                return False
+            self.state = HALF_OPEN
+            logger.info(f"MCP {self.name} breaker half-open, probing upstream")
+        return self._probes < self.half_open_calls
+
+    def _open(self):
+        self.state = OPEN
+        self.consecutive = 0
+        self._opened_at = time.monotonic()
+        self.opened += 1
+        logger.warning(
+            f"MCP {self.name} breaker opened (failure rate {self.failure_rate():.0%}), "
+            f"using fallbacks for {self.open_seconds:.0f}s"
+        )
+
+    def record(self, ok: bool, latency: float, probe: bool = False):
+        # Only probes decide half-open; stragglers from before the trip just add samples
+        if probe and self.state == HALF_OPEN:
+            if ok:
+                self.state = CLOSED
+                self._samples.clear()
+                logger.info(f"MCP {self.name} breaker closed, upstream recovered")
+            else:
+                self._open()
+                return
+        self._samples.append((ok, latency))
+        if ok:
+            self._latencies.append(latency)
+            self.consecutive = 0
+        else:
+            self.consecutive += 1
+        if self.enabled and self.state == CLOSED and (
+            self.consecutive >= self.consecutive_threshold
+            or (len(self._samples) >= self.min_calls and self.failure_rate() >= self.failure_rate_threshold)
+        ):
+            self._open()
+
+    async def call(self, fn: Callable[[], Awaitable[Any]]) -> Any:
+        if not self.allow():
+            self.rejected += 1
+            raise CircuitOpenError(f"MCP {self.name} circuit is open")
+        probing = self.state == HALF_OPEN
+        if probing:
+            self._probes += 1
+        timeout = self.timeout()
+        start = time.monotonic()
+        try:
+            result = await asyncio.wait_for(fn(), timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            self.record(False, time.monotonic() - start, probing)
+            raise Exception(f"MCP {self.name} call timed out after {timeout:.1f}s")
+        except Exception:
+            self.record(False, time.monotonic() - start, probing)
+            raise
+        finally:
+            if probing:
+                self._probes -= 1
+        self.record(True, time.monotonic() - start, probing)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        ordered = sorted(self._latencies)
+        return {
+            "enabled": self.enabled,
+            "state": self.state,
+            "calls_in_window": len(self._samples),
+            "failure_rate": round(self.failure_rate(), 4),
+            "latency_p50": round(_percentile(ordered, 0.50), 4),
+            "latency_p95": round(_percentile(ordered, 0.95), 4),
+            "latency_p99": round(_percentile(ordered, 0.99), 4),
+            "timeout": round(self.timeout(), 3),
+            "opened": self.opened,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+            "retry_in": (
+                round(max(0.0, self.open_seconds - (time.monotonic() - self._opened_at)), 1)
+                if self.state == OPEN else None
+            ),
+        }
@@ -1,10 +1,67 @@
 # backend/mcp_clients/fallbacks.py
-import requests
+import asyncio
+import logging
+import os
+from typing import Optional
+from urllib.parse import quote
 
-def fallback_search(query: str, max_results: int = 5):
-    # Call DuckDuckGo API (or fake results for dev)
-    url = f"https://api.duckduckgo.com/?q={query}&format=json"
-    r = requests.get(url)
+import httpx
+
+logger = logging.getLogger(__name__)
+
+DUCKDUCKGO_API_URL = os.getenv("DUCKDUCKGO_API_URL", "https://api.duckduckgo.com/")
+POLLINATIONS_API_URL = os.getenv("POLLINATIONS_API_URL", "https://image.pollinations.ai/")
+FALLBACK_TIMEOUT = float(os.getenv("FALLBACK_TIMEOUT", "10"))
+FALLBACK_CONNECT_TIMEOUT = float(os.getenv("FALLBACK_CONNECT_TIMEOUT", "3"))
+FALLBACK_MAX_CONNECTIONS = int(os.getenv("FALLBACK_MAX_CONNECTIONS", "20"))
+FALLBACK_MAX_KEEPALIVE = int(os.getenv("FALLBACK_MAX_KEEPALIVE", "10"))
+FALLBACK_MAX_CONCURRENCY = int(os.getenv("FALLBACK_MAX_CONCURRENCY", "20"))
+
+_http_client: Optional[httpx.AsyncClient] = None
+_concurrency = asyncio.Semaphore(FALLBACK_MAX_CONCURRENCY)
+
+
+def create_http_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        timeout=httpx.Timeout(FALLBACK_TIMEOUT, connect=FALLBACK_CONNECT_TIMEOUT),
+        limits=httpx.Limits(
+            max_connections=FALLBACK_MAX_CONNECTIONS,
+            max_keepalive_connections=FALLBACK_MAX_KEEPALIVE,
+        ),
+        follow_redirects=True,
+    )
+
+
+async def init_http_client() -> httpx.AsyncClient:
+    """Create the shared fallback HTTP client (called from the app lifespan)"""
+    global _http_client
+    if _http_client is None:
+        _http_client = create_http_client()
+    return _http_client
+
+
+async def close_http_client():
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    # Scripts and one-off callers may run without the lifespan; create lazily
+    global _http_client
+    if _http_client is None:
+        _http_client = create_http_client()
+    return _http_client
+
+
+async def fallback_search(query: str, max_results: int = 5):
+    # Call DuckDuckGo Instant Answer API through the shared pooled client
+    async with _concurrency:
+        r = await get_http_client().get(
+            DUCKDUCKGO_API_URL, params={"q": query, "format": "json"}
+        )
+    r.raise_for_status()
     data = r.json()
     results = []
     for topic in data.get("RelatedTopics", [])[:max_results]:
@@ -15,7 +72,8 @@ def fallback_search(query: str, max_results: int = 5):
         })
     return results
 
-def fallback_image_generation(prompt: str):
-    # Pollinations API (returns an image URL)
-    image_url = f"https://image.pollinations.ai/prompt/{prompt.replace(' ', '%20')}"
+
+async def fallback_image_generation(prompt: str):
+    # Pollinations renders on GET, so the fallback only needs to build the URL
+    image_url = f"{POLLINATIONS_API_URL.rstrip('/')}/prompt/{quote(prompt, safe='')}"
     return {"image_url": image_url, "metadata": {}}
@@ -1,9 +1,10 @@
 import json
 import logging
-from typing import Dict, Any, Optional
+import os
+from typing import Dict, Any
 
-from mcp import ClientSession
-from mcp.client.streamable_http import streamablehttp_client
+from .breaker import CircuitBreaker, CircuitOpenError
+from .pool import MCPSessionPool
 
 logger = logging.getLogger(__name__)
 
@@ -11,15 +12,16 @@ class MCPImageClient:
     """MCP client for Flux image generation"""
 
     def __init__(self):
-        self.url = "https://server.smithery.ai/@falahgs/flux-imagegen-mcp-server/mcp"
+        self.url = os.getenv("MCP_IMAGE_URL", "https://server.smithery.ai/@falahgs/flux-imagegen-mcp-server/mcp")
+        self.pool = MCPSessionPool(self.url, name="image")
+        self.breaker = CircuitBreaker("image")
 
     async def connect(self):
         try:
-            async with streamablehttp_client(self.url) as (read, write, _):
-                async with ClientSession(read, write) as session:
-                    await session.initialize()
-                    tools = await session.list_tools()
-                    logger.info(f"Image MCP connected, tools: {[t.name for t in tools.tools]}")
+            await self.pool.warm()
+            async with self.pool.session() as conn:
+                tools = await conn.session.list_tools()
+                logger.info(f"Image MCP connected, tools: {[t.name for t in tools.tools]}")
             return True
         except Exception as e:
             logger.error(f"Failed to connect MCP Image server: {e}")
@@ -33,28 +35,32 @@ class MCPImageClient:
         steps: int,
         guidance: float
     ) -> Dict[str, Any]:
-        try:
-            async with streamablehttp_client(self.url) as (read, write, _):
-                async with ClientSession(read, write) as session:
-                    await session.initialize()
-                    result = await session.call_tool(
-                        "flux_imagegen",
-                        arguments={
-                            "prompt": prompt,
-                            "width": width,
-                            "height": height,
-                            "steps": steps,
-                            "guidance": guidance
-                        }
-                    )
-                    if result.content and len(result.content) > 0:
-                        return json.loads(result.content[0].text)
+        async def call():
+            result = await self.pool.call_tool(
+                "flux_imagegen",
+                arguments={
+                    "prompt": prompt,
+                    "width": width,
+                    "height": height,
+                    "steps": steps,
+                    "guidance": guidance
+                }
+            )
+            if result.isError:
+                raise Exception(result.content[0].text if result.content else "tool error")
+            if result.content and len(result.content) > 0:
+                return json.loads(result.content[0].text)
             logger.error("MCP returned no content")
             return {}
+
+        try:
+            # The breaker fails fast while the upstream is down and bounds each call
+            return await self.breaker.call(call)
+        except CircuitOpenError:
+            raise
         except Exception as e:
             logger.error(f"MCP image generation failed: {e}")
             raise Exception(f"MCP image generation failed: {str(e)}")
 
     async def disconnect(self):
-        # no persistent session anymore
-        return
+        await self.pool.close()
@@ -0,0 +1,297 @@
+# backend/mcp_clients/pool.py
+import asyncio
+import importlib
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Set
+
+from backend.metrics import stage_timer
+
+if TYPE_CHECKING:
+    from mcp import ClientSession
+
+logger = logging.getLogger(__name__)
+
+MCP_POOL_SIZE = int(os.getenv("MCP_POOL_SIZE", "4"))
+MCP_POOL_MIN_IDLE = int(os.getenv("MCP_POOL_MIN_IDLE", "1"))
+MCP_CONNECT_TIMEOUT = float(os.getenv("MCP_CONNECT_TIMEOUT", "15"))
+MCP_PING_AFTER_IDLE = float(os.getenv("MCP_PING_AFTER_IDLE", "30"))
+MCP_PING_TIMEOUT = float(os.getenv("MCP_PING_TIMEOUT", "5"))
+MCP_CALL_TIMEOUT = float(os.getenv("MCP_CALL_TIMEOUT", "60"))
+
+
+class MCPConnectError(Exception):
+    """Raised when a new MCP session could not be opened"""
+
+
+class MCPStaleSessionError(Exception):
+    """Raised when a borrowed session was already dead, so the call never reached the tool"""
+
+
+def _never_sent(error: Optional[BaseException]) -> bool:
+    """True only for failures that prove the request did not reach the server's tool:
+    the transport was already closed, the connection was refused, or the server
+    no longer knew the session (HTTP 404). Read errors and timeouts are ambiguous."""
+    import anyio
+    import httpx
+    from mcp.shared.exceptions import McpError
+
+    if error is None:
+        return False
+    if isinstance(error, BaseExceptionGroup):
+        return all(_never_sent(e) for e in error.exceptions)
+    if isinstance(error, McpError):
+        return error.error.message == "Session terminated"
+    return isinstance(error, (anyio.BrokenResourceError, anyio.ClosedResourceError, httpx.ConnectError, httpx.ConnectTimeout))
+
+
+class PooledSession:
+    """One initialized MCP session, owned by its own background task.
+
+    The streamable-HTTP transport uses anyio task groups, which must be
+    entered and exited from the same task. Each pooled session therefore
+    lives inside a dedicated task that opens the transport, initializes the
+    session, and then parks until it is asked to close.
+    """
+
+    def __init__(self, url: str):
+        self.url = url
+        self.session: Optional["ClientSession"] = None
+        self.last_used = time.monotonic()
+        self._ready = asyncio.Event()
+        self._closing = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._error: Optional[BaseException] = None
+
+    async def open(self, timeout: float = MCP_CONNECT_TIMEOUT):
+        self._task = asyncio.create_task(self._run())
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            await self.close()
+            raise MCPConnectError(f"Timed out connecting to MCP server after {timeout}s")
+        except asyncio.CancelledError:
+            # Don't leave the transport task parked with nobody to close it
+            self._closing.set()
+            self._task.cancel()
+            raise
+        if self.session is None:
+            raise MCPConnectError(f"Failed to open MCP session: {self._error}")
+
+    async def _run(self):
+        # mcp takes a large share of app import time, so it loads with the first session
+        from mcp import ClientSession
+        from mcp.client.streamable_http import streamablehttp_client
+
+        try:
+            async with streamablehttp_client(self.url) as (read, write, _):
+                async with ClientSession(read, write) as session:
+                    await session.initialize()
+                    self.session = session
+                    self._ready.set()
+                    await self._closing.wait()
+        except Exception as e:
+            self._error = e
+            if self.session is not None:
+                logger.warning(f"MCP session to {self.url} dropped: {e}")
+        finally:
+            self.session = None
+            self._ready.set()
+
+    @property
+    def alive(self) -> bool:
+        return self.session is not None and self._task is not None and not self._task.done()
+
+    async def ping(self, timeout: float = MCP_PING_TIMEOUT) -> bool:
+        if not self.alive:
+            return False
+        try:
+            await asyncio.wait_for(self.session.send_ping(), timeout)
+            return True
+        except Exception as e:
+            logger.warning(f"MCP session health check failed: {e}")
+            return False
+
+    async def call_tool(self, name: str, arguments: Dict[str, Any], timeout: float = MCP_CALL_TIMEOUT):
+        """Call a tool, failing fast if the transport dies mid-call.
+
+        Raises MCPStaleSessionError when the call provably never reached the
+        server, which is the only case where trying again cannot repeat it.
+        """
+        if not self.alive:
+            raise MCPStaleSessionError("MCP session is not open")
+        call = asyncio.ensure_future(self.session.call_tool(name, arguments=arguments))
+        try:
+            done, _ = await asyncio.wait(
+                {call, self._task}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+            )
+            if call in done:
+                error = call.exception()
+                if error is None:
+                    return call.result()
+                if _never_sent(error):
+                    raise MCPStaleSessionError(f"MCP session was stale: {error!r}") from error
+                raise error
+            if self._task in done:
+                if _never_sent(self._error):
+                    raise MCPStaleSessionError(f"MCP session was stale: {self._error}")
+                raise Exception(f"MCP session closed during call: {self._error}")
+            raise Exception(f"MCP call '{name}' timed out after {timeout}s")
+        finally:
+            if not call.done():
+                call.cancel()
+
+    async def close(self, timeout: float = 5.0):
+        self._closing.set()
+        if self._task is None or self._task.done():
+            return
+        try:
+            await asyncio.wait_for(asyncio.shield(self._task), timeout)
+        except (asyncio.TimeoutError, Exception):
+            self._task.cancel()
+
+
+class MCPSessionPool:
+    """Bounded pool of warm, initialized MCP sessions for one server URL"""
+
+    def __init__(self, url: str, name: str, size: int = MCP_POOL_SIZE, min_idle: int = MCP_POOL_MIN_IDLE):
+        self.url = url
+        self.name = name
+        self.size = max(1, size)
+        self.min_idle = max(0, min(min_idle, self.size))
+        self._idle: List[PooledSession] = []
+        self._in_use = 0
+        self._slots = asyncio.Semaphore(self.size)
+        self._closed = False
+        # Background closes of broken sessions, kept referenced until they finish
+        self._discards: Set[asyncio.Task] = set()
+        self.connects = 0
+        self.connect_failures = 0
+        self.discarded = 0
+        self.stale_retries = 0
+        self.last_error: Optional[str] = None
+
+    async def _open_session(self) -> PooledSession:
+        conn = PooledSession(self.url)
+        try:
+            with stage_timer(f"mcp_{self.name}", "handshake"):
+                await conn.open()
+        except Exception as e:
+            self.connect_failures += 1
+            self.last_error = str(e)
+            raise
+        self.connects += 1
+        self.last_error = None
+        logger.info(f"Opened MCP session for {self.name} ({self.open_count + 1}/{self.size})")
+        return conn
+
+    async def _discard(self, conn: PooledSession):
+        self.discarded += 1
+        await conn.close()
+
+    def _discard_later(self, conn: PooledSession):
+        task = asyncio.create_task(self._discard(conn))
+        self._discards.add(task)
+        task.add_done_callback(self._discard_done)
+
+    def _discard_done(self, task: asyncio.Task):
+        self._discards.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"Closing a broken MCP {self.name} session failed: {task.exception()}")
+
+    async def _acquire(self) -> PooledSession:
+        while self._idle:
+            conn = self._idle.pop()
+            idle_for = time.monotonic() - conn.last_used
+            if conn.alive and (idle_for < MCP_PING_AFTER_IDLE or await conn.ping()):
+                return conn
+            await self._discard(conn)
+        return await self._open_session()
+
+    def _release(self, conn: PooledSession, healthy: bool):
+        conn.last_used = time.monotonic()
+        if healthy and conn.alive and not self._closed:
+            self._idle.append(conn)
+        else:
+            self._discard_later(conn)
+
+    @asynccontextmanager
+    async def session(self):
+        """Borrow a pooled session; broken sessions are dropped instead of returned"""
+        if self._closed:
+            raise Exception(f"MCP session pool '{self.name}' is closed")
+        async with self._slots:
+            with stage_timer(f"mcp_{self.name}", "acquire"):
+                conn = await self._acquire()
+            self._in_use += 1
+            healthy = False
+            try:
+                yield conn
+                healthy = True
+            finally:
+                self._in_use -= 1
+                self._release(conn, healthy)
+
+    async def call_tool(self, name: str, arguments: Dict[str, Any]):
+        """Call a tool, reconnecting once if the borrowed session had gone stale.
+
+        Only a call that never reached the server is retried; timeouts, read
+        errors and tool errors are raised as they are, since the tool may
+        already have run (image generations are neither free nor idempotent).
+        """
+        try:
+            async with self.session() as conn:
+                with stage_timer(f"mcp_{self.name}", "tool_call"):
+                    return await conn.call_tool(name, arguments)
+        except MCPStaleSessionError as e:
+            if self._closed:
+                raise
+            self.stale_retries += 1
+            logger.warning(f"MCP {self.name} session was stale ({e}), retrying on a fresh session")
+        async with self.session() as conn:
+            with stage_timer(f"mcp_{self.name}", "tool_call_retry"):
+                return await conn.call_tool(name, arguments)
+
+    async def _warm_one(self):
+        # Warm-up runs alongside traffic, so it holds a slot like any borrower and
+        # never takes the pool past size. With no slot free, the borrowers' own
+        # sessions go back to the idle list when they are done.
+        if self._slots.locked():
+            return
+        async with self._slots:
+            conn = await self._open_session()
+            self._release(conn, healthy=True)
+
+    async def warm(self) -> int:
+        """Open sessions until min_idle are ready (as far as free slots allow); returns the number idle"""
+        # Import mcp on a worker thread rather than stalling the event loop on it
+        await asyncio.to_thread(importlib.import_module, "mcp.client.streamable_http")
+        missing = self.min_idle - len(self._idle)
+        if missing > 0:
+            await asyncio.gather(*(self._warm_one() for _ in range(missing)), return_exceptions=True)
+        return len(self._idle)
+
+    async def close(self):
+        self._closed = True
+        idle, self._idle = self._idle, []
+        await asyncio.gather(*(conn.close() for conn in idle), *self._discards, return_exceptions=True)
+
+    @property
+    def open_count(self) -> int:
+        return len(self._idle) + self._in_use
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": self.size,
+            "open": self.open_count,
+            "idle": len(self._idle),
+            "in_use": self._in_use,
+            "connects": self.connects,
+            "connect_failures": self.connect_failures,
+            "discarded": self.discarded,
+            "stale_retries": self.stale_retries,
+            "closed": self._closed,
+            "last_error": self.last_error,
+        }
@@ -1,9 +1,10 @@
 import json
 import logging
-from typing import List, Dict, Any, Optional
+import os
+from typing import List, Dict, Any
 
-from mcp import ClientSession
-from mcp.client.streamable_http import streamablehttp_client
+from .breaker import CircuitBreaker, CircuitOpenError
+from .pool import MCPSessionPool
 
 logger = logging.getLogger(__name__)
 
@@ -11,37 +12,42 @@ class MCPSearchClient:
     """MCP client for DuckDuckGo search over HTTP"""
 
     def __init__(self):
-        self.url = "https://server.smithery.ai/@nickclyde/duckduckgo-mcp-server/mcp"
+        self.url = os.getenv("MCP_SEARCH_URL", "https://server.smithery.ai/@nickclyde/duckduckgo-mcp-server/mcp")
+        self.pool = MCPSessionPool(self.url, name="search")
+        self.breaker = CircuitBreaker("search")
 
     async def connect(self):
         try:
-            async with streamablehttp_client(self.url) as (read, write, _):
-                async with ClientSession(read, write) as session:
-                    await session.initialize()
-                    tools = await session.list_tools()
-                    logger.info(f"Search MCP connected, tools: {[t.name for t in tools.tools]}")
+            await self.pool.warm()
+            async with self.pool.session() as conn:
+                tools = await conn.session.list_tools()
+                logger.info(f"Search MCP connected, tools: {[t.name for t in tools.tools]}")
             return True
         except Exception as e:
             logger.error(f"Failed to connect MCP HTTP server: {e}")
             return False
 
     async def search(self, query: str, max_results: int = 5) -> List[Dict[str, Any]]:
-        try:
-            async with streamablehttp_client(self.url) as (read, write, _):
-                async with ClientSession(read, write) as session:
-                    await session.initialize()
-                    result = await session.call_tool(
-                        "duckduckgo_search",
-                        arguments={"query": query, "max_results": max_results}
-                    )
-                    if result.content and len(result.content) > 0:
-                        search_data = json.loads(result.content[0].text)
-                        return search_data.get("results", [])
+        async def call():
+            result = await self.pool.call_tool(
+                "duckduckgo_search",
+                arguments={"query": query, "max_results": max_results}
+            )
+            if result.isError:
+                raise Exception(result.content[0].text if result.content else "tool error")
+            if result.content and len(result.content) > 0:
+                search_data = json.loads(result.content[0].text)
+                return search_data.get("results", [])
             return []
+
+        try:
+            # The breaker fails fast while the upstream is down and bounds each call
+            return await self.breaker.call(call)
+        except CircuitOpenError:
+            raise
         except Exception as e:
             logger.error(f"MCP search failed: {e}")
             raise Exception(f"MCP search failed: {str(e)}")
 
     async def disconnect(self):
-        # no persistent session anymore
-        return
+        await self.pool.close()
@@ -0,0 +1,100 @@
+# backend/migrate_blobs.py
+"""Move inline base64 images out of history rows into the blob store.
+
+Older image rows carry the whole image as ``data["image_data"]``. This walks
+image rows in id order, writes each inline image to the content-addressed
+store and rewrites the row to hold only the reference and dimensions, the
+same shape new rows get. It is safe to re-run: migrated rows have no
+``image_data`` left and identical blobs are stored once.
+
+    python -m backend.migrate_blobs [--batch-size 200] [--dry-run]
+"""
+import argparse
+import asyncio
+import logging
+
+from sqlalchemy import select, update
+
+from backend.blobstore import decode_base64_image, store_image
+from backend.compression import history_payload, load_dictionaries
+from backend.database import SessionLocal, engine
+from backend.models import HistoryItem
+
+logger = logging.getLogger(__name__)
+
+
+def migrate_payload(data: dict, image_ref: dict) -> dict:
+    data = {k: v for k, v in data.items() if k != "image_data"}
+    data["image"] = image_ref
+    data["image_url"] = data.get("image_url") or image_ref["url"]
+    requested = (data.get("metadata") or {}).get("requested_params") or {}
+    data["width"] = image_ref["width"] or requested.get("width")
+    data["height"] = image_ref["height"] or requested.get("height")
+    return data
+
+
+async def migrate(batch_size: int, dry_run: bool) -> dict:
+    stats = {"scanned": 0, "migrated": 0, "bytes_moved": 0, "undecodable": 0}
+    last_id = 0
+    async with SessionLocal() as db:
+        await load_dictionaries(db)
+    while True:
+        async with SessionLocal() as db:
+            rows = (await db.execute(
+                select(HistoryItem.id, HistoryItem.data, HistoryItem.data_z)
+                .where(HistoryItem.item_type == "image", HistoryItem.id > last_id)
+                .order_by(HistoryItem.id)
+                .limit(batch_size)
+            )).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+            stats["scanned"] += len(rows)
+
+            for row_id, legacy, compressed in rows:
+                data = compressed if compressed is not None else legacy
+                inline = data.get("image_data") if isinstance(data, dict) else None
+                if not inline:
+                    continue
+                raw = decode_base64_image(inline) if isinstance(inline, str) else None
+                if raw is None:
+                    stats["undecodable"] += 1
+                    logger.warning(f"History row {row_id}: image_data is not valid base64, left in place")
+                    continue
+                stats["migrated"] += 1
+                stats["bytes_moved"] += len(inline)
+                if dry_run:
+                    continue
+                image_ref = await store_image(raw)
+                await db.execute(
+                    update(HistoryItem)
+                    .where(HistoryItem.id == row_id)
+                    .values(**history_payload(migrate_payload(data, image_ref)))
+                )
+            # The blob is on disk before its row stops pointing at the inline copy
+            await db.commit()
+        logger.info(f"Scanned {stats['scanned']} image rows, migrated {stats['migrated']}")
+    return stats
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Move inline base64 images from history into the blob store")
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--dry-run", action="store_true", help="report what would move without writing")
+    args = parser.parse_args()
+
+    try:
+        stats = await migrate(args.batch_size, args.dry_run)
+    finally:
+        await engine.dispose()
+    verb = "Would move" if args.dry_run else "Moved"
+    print(
+        f"{verb} {stats['migrated']} of {stats['scanned']} image rows "
+        f"({stats['bytes_moved'] / 1024 / 1024:.1f} MiB of base64); "
+        f"{stats['undecodable']} left in place"
+    )
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
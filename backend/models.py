@@ -1,8 +1,31 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, JSON, ForeignKey
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, DateTime, Text, JSON, ForeignKey, Index, LargeBinary
+from sqlalchemy.orm import relationship, deferred
 from datetime import datetime
+import uuid
+from backend.compression import CompressedJSON
 from backend.database import Base
 
+SEARCH_TEXT_MAX_CHARS = 8000
+
+def history_search_text(query, data) -> str:
+    """Flatten the query and result titles/bodies into one string for full-text indexing"""
+    parts = [query or ""]
+    if isinstance(data, dict):
+        for r in data.get("results") or []:
+            if isinstance(r, dict):
+                parts.append(r.get("title") or "")
+                parts.append(r.get("body") or "")
+        if data.get("prompt"):
+            parts.append(data["prompt"])
+    return " ".join(" ".join(parts).split())[:SEARCH_TEXT_MAX_CHARS]
+
+def _search_text_default(context):
+    params = context.get_current_parameters()
+    data = params.get("data")
+    if data is None:
+        data = params.get("data_z")
+    return history_search_text(params.get("query"), data)
+
 class User(Base):
     __tablename__ = "users"
     id = Column(Integer, primary_key=True, index=True)
@@ -16,11 +39,57 @@ class User(Base):
 
 class HistoryItem(Base):
     __tablename__ = "history"
+    __table_args__ = (
+        # Dashboard filters by type and pages newest-first within one user
+        Index("ix_history_user_type_created", "user_id", "item_type", "created_at"),
+        Index("ix_history_user_created_id", "user_id", "created_at", "id"),
+        # uid may be a client's X-Request-ID, so it is only unique within one user
+        Index("uq_history_user_uid", "user_id", "uid", unique=True),
+    )
     id = Column(Integer, primary_key=True, index=True)
+    uid = Column(String(36), default=lambda: str(uuid.uuid4()))  # stable public id
     item_type = Column(String(20), nullable=False)  # "search" | "image"
     query = Column(Text, nullable=False)
-    data = Column(JSON, nullable=False)             # normalized payload
+    # Normalized payload: compressed in data_z (backend/compression.py), or plain
+    # JSON in data for rows written before compression. Both load only on access.
+    data = deferred(Column(JSON(none_as_null=True), nullable=True))
+    data_z = deferred(Column(CompressedJSON, nullable=True))
+    search_text = Column(Text, default=_search_text_default)  # full-text source, see backend/fulltext.py
     created_at = Column(DateTime, default=datetime.utcnow)
 
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     owner = relationship("User", back_populates="items")
+
+class CompressionDictionary(Base):
+    __tablename__ = "compression_dictionaries"
+    id = Column(Integer, primary_key=True)
+    codec = Column(String(10), nullable=False)       # "zlib" | "zstd"
+    data = Column(LargeBinary, nullable=False)
+    samples = Column(Integer, nullable=False)        # payloads it was trained on
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class SearchResult(Base):
+    __tablename__ = "search_results"
+    id = Column(Integer, primary_key=True)
+    digest = Column(String(64), unique=True, nullable=False)  # sha256, see result_store.result_key
+    title = Column(Text)
+    body = Column(Text)
+    href = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class HistoryResult(Base):
+    __tablename__ = "history_results"
+    # history.id; a trigger removes a row's links when it is deleted, see backend/result_store.py
+    history_id = Column(Integer, primary_key=True)
+    position = Column(Integer, primary_key=True)
+    result_id = Column(Integer, ForeignKey("search_results.id"), nullable=False, index=True)
+
+class RetentionPolicy(Base):
+    """How long history is kept; see backend/retention.py for which policy applies"""
+    __tablename__ = "retention_policies"
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=True, index=True)
+    role = Column(String(20), nullable=True)         # every user with this role, when user_id is null
+    item_type = Column(String(20), nullable=True)    # "search" | "image" | null for both
+    max_age_days = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
@@ -0,0 +1,271 @@
+# backend/partitions.py
+"""Monthly range partitions for ``history`` on PostgreSQL.
+
+``history`` is partitioned by ``created_at`` into one table per month
+(``history_p202610`` holds October 2026) plus ``history_default`` for rows
+outside every month range, so expiring a month of history is a
+``DROP TABLE`` instead of a large DELETE. Startup (``init_db``) and the
+retention job (backend/retention.py) keep HISTORY_PARTITION_MONTHS_AHEAD
+months created ahead of time; the job also drops months older than
+HISTORY_MAX_AGE_DAYS. If rows for a month reached ``history_default``
+before its partition existed, creating the partition moves them across.
+
+PostgreSQL requires the partition key in every unique constraint, so the
+primary key is ``(id, created_at)``; ids still come from one sequence and
+stay unique. ``(user_id, uid)`` can't be a unique index on the partitioned
+table, so triggers claim each pair in the plain ``history_uids`` table in
+the inserting transaction, and a second claim fails with a unique violation
+exactly like the index on SQLite does.
+SQLite keeps a plain table; everything here is a no-op there.
+
+The table is converted by Alembic revision 0007, and right after
+``create_all`` for new databases.
+"""
+import logging
+import os
+import re
+from datetime import date, datetime
+from typing import List, Tuple
+
+from sqlalchemy import event, text
+
+# fulltext's listeners add search_vector to the plain table first
+import backend.fulltext  # noqa: F401
+from backend.models import HistoryItem
+from backend.result_store import POSTGRES_LINK_DDL
+
+logger = logging.getLogger(__name__)
+
+HISTORY_PARTITION_MONTHS_AHEAD = int(os.getenv("HISTORY_PARTITION_MONTHS_AHEAD", "3"))
+
+COLUMNS = "id, uid, item_type, query, data, data_z, search_text, created_at, user_id"
+
+PARTITIONED_DDL = """
+    CREATE TABLE history (
+        id INTEGER NOT NULL DEFAULT nextval('history_id_seq'),
+        uid VARCHAR(36),
+        item_type VARCHAR(20) NOT NULL,
+        query TEXT NOT NULL,
+        data JSON,
+        data_z BYTEA,
+        search_text TEXT,
+        search_vector tsvector GENERATED ALWAYS AS (to_tsvector('english', coalesce(search_text, ''))) STORED,
+        created_at TIMESTAMP WITHOUT TIME ZONE,
+        user_id INTEGER NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+        PRIMARY KEY (id, created_at)
+    ) PARTITION BY RANGE (created_at)
+"""
+
+PLAIN_DDL = """
+    CREATE TABLE history (
+        id INTEGER NOT NULL DEFAULT nextval('history_id_seq') PRIMARY KEY,
+        uid VARCHAR(36),
+        item_type VARCHAR(20) NOT NULL,
+        query TEXT NOT NULL,
+        data JSON,
+        data_z BYTEA,
+        search_text TEXT,
+        search_vector tsvector GENERATED ALWAYS AS (to_tsvector('english', coalesce(search_text, ''))) STORED,
+        created_at TIMESTAMP WITHOUT TIME ZONE,
+        user_id INTEGER NOT NULL REFERENCES users (id) ON DELETE CASCADE
+    )
+"""
+
+INDEX_DDL = [
+    "CREATE INDEX IF NOT EXISTS ix_history_id ON history (id)",
+    "CREATE INDEX IF NOT EXISTS ix_history_user_type_created ON history (user_id, item_type, created_at)",
+    "CREATE INDEX IF NOT EXISTS ix_history_user_created_id ON history (user_id, created_at, id)",
+    "CREATE INDEX IF NOT EXISTS ix_history_search_vector ON history USING GIN (search_vector)",
+]
+INDEX_NAMES = ["ix_history_uid", "uq_history_user_uid", "ix_history_user_uid", "ix_history_id", "ix_history_user_type_created", "ix_history_user_created_id", "ix_history_search_vector"]
+
+# Moving a row between partitions deletes and re-inserts it with the same id,
+# so a claim already held by that id is not a duplicate
+UID_TABLE_DDL = (
+    "CREATE TABLE IF NOT EXISTS history_uids ("
+    "user_id INTEGER NOT NULL REFERENCES users (id) ON DELETE CASCADE, "
+    "uid VARCHAR(36) NOT NULL, history_id INTEGER NOT NULL, PRIMARY KEY (user_id, uid))"
+)
+UID_TRIGGER_DDL = [
+    "CREATE OR REPLACE FUNCTION history_uids_claim() RETURNS trigger LANGUAGE plpgsql AS $$ "
+    "BEGIN IF NEW.uid IS NULL THEN RETURN NULL; END IF; "
+    "INSERT INTO history_uids (user_id, uid, history_id) VALUES (NEW.user_id, NEW.uid, NEW.id) "
+    "ON CONFLICT (user_id, uid) DO UPDATE SET history_id = EXCLUDED.history_id "
+    "WHERE history_uids.history_id = EXCLUDED.history_id; "
+    "IF NOT FOUND THEN RAISE unique_violation USING MESSAGE = "
+    "'duplicate history uid ' || NEW.uid || ' for user ' || NEW.user_id, CONSTRAINT = 'history_uids_pkey'; END IF; "
+    "RETURN NULL; END $$",
+    "CREATE OR REPLACE FUNCTION history_uids_release() RETURNS trigger LANGUAGE plpgsql AS $$ "
+    "BEGIN DELETE FROM history_uids WHERE user_id = OLD.user_id AND uid = OLD.uid AND history_id = OLD.id; "
+    "RETURN NULL; END $$",
+    "DROP TRIGGER IF EXISTS history_uids_ai ON history",
+    "CREATE TRIGGER history_uids_ai AFTER INSERT ON history FOR EACH ROW EXECUTE FUNCTION history_uids_claim()",
+    "DROP TRIGGER IF EXISTS history_uids_ad ON history",
+    "CREATE TRIGGER history_uids_ad AFTER DELETE ON history FOR EACH ROW EXECUTE FUNCTION history_uids_release()",
+]
+
+_PARTITION_RE = re.compile(r"^history_p(\d{4})(\d{2})$")
+
+
+def _month(day: date, offset: int = 0) -> date:
+    months = day.year * 12 + day.month - 1 + offset
+    return date(months // 12, months % 12 + 1, 1)
+
+
+def is_partitioned(conn) -> bool:
+    return bool(conn.execute(text(
+        "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid WHERE c.relname = 'history'"
+    )).scalar())
+
+
+def month_partitions(conn) -> List[Tuple[str, date]]:
+    """(name, first day) of every monthly partition, oldest first"""
+    names = conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "JOIN pg_class p ON p.oid = i.inhparent WHERE p.relname = 'history'"
+    )).scalars().all()
+    months = []
+    for name in names:
+        match = _PARTITION_RE.match(name)
+        if match:
+            months.append((name, date(int(match.group(1)), int(match.group(2)), 1)))
+    return sorted(months, key=lambda m: m[1])
+
+
+def _default_holds(conn, start: date, end: date) -> bool:
+    if conn.execute(text("SELECT to_regclass('history_default')")).scalar() is None:
+        return False
+    return conn.execute(
+        text("SELECT 1 FROM history_default WHERE created_at >= :start AND created_at < :end LIMIT 1"),
+        {"start": start, "end": end},
+    ).scalar() is not None
+
+
+def ensure_partitions(conn, start: date, end: date) -> int:
+    """Create the monthly partitions from start's month through end's month; returns how many were new"""
+    existing = {name for name, _ in month_partitions(conn)}
+    created = 0
+    month = _month(start)
+    while month <= end:
+        name = f"history_p{month:%Y%m}"
+        if name not in existing:
+            following = _month(month, 1)
+            # A range can't be added while the default partition holds rows in it
+            # (the app was down, or nothing kept months ahead), so move them over
+            stray = _default_holds(conn, month, following)
+            if stray:
+                conn.execute(text("ALTER TABLE history DETACH PARTITION history_default"))
+            conn.execute(text(
+                f"CREATE TABLE {name} PARTITION OF history "
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{following.isoformat()}')"
+            ))
+            if stray:
+                moved = conn.execute(text(
+                    f"WITH moved AS (DELETE FROM history_default WHERE created_at >= :start AND created_at < :end "
+                    f"RETURNING {COLUMNS}) INSERT INTO history ({COLUMNS}) SELECT {COLUMNS} FROM moved"
+                ), {"start": month, "end": following}).rowcount
+                conn.execute(text("ALTER TABLE history ATTACH PARTITION history_default DEFAULT"))
+                logger.info(f"Moved {moved} history rows from history_default into {name}")
+            created += 1
+        month = _month(month, 1)
+    return created
+
+
+def ensure_months_ahead(conn, months_ahead: int = HISTORY_PARTITION_MONTHS_AHEAD) -> int:
+    if conn.dialect.name != "postgresql" or not is_partitioned(conn):
+        return 0
+    today = datetime.utcnow().date()
+    return ensure_partitions(conn, today, _month(today, months_ahead))
+
+
+def drop_partitions_before(conn, cutoff: datetime) -> List[str]:
+    """Drop every month that ends on or before ``cutoff``, with its result links"""
+    dropped = []
+    for name, month in month_partitions(conn):
+        if datetime.combine(_month(month, 1), datetime.min.time()) > cutoff:
+            break
+        conn.execute(text(f"ALTER TABLE history DETACH PARTITION {name}"))
+        # Dropping a table fires no row triggers, so unlink its rows and free their uids here
+        conn.execute(text(f"DELETE FROM history_results WHERE history_id IN (SELECT id FROM {name})"))
+        conn.execute(text(f"DELETE FROM history_uids WHERE history_id IN (SELECT id FROM {name})"))
+        conn.execute(text(f"DROP TABLE {name}"))
+        dropped.append(name)
+    return dropped
+
+
+def _set_aside(conn):
+    """Rename history out of the way, freeing its index and constraint names"""
+    for name in INDEX_NAMES:
+        conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+    conn.execute(text("ALTER TABLE history RENAME TO history_old"))
+    conn.execute(text("ALTER TABLE history_old RENAME CONSTRAINT history_pkey TO history_old_pkey"))
+
+
+def claim_uids(conn):
+    """Create history_uids with its triggers and claim the uids already in history"""
+    conn.exec_driver_sql(UID_TABLE_DDL)
+    # Before per-user uniqueness a partitioned table only had (uid, created_at)
+    # unique, so the oldest row keeps a uid that somehow occurs twice
+    conn.execute(text(
+        "INSERT INTO history_uids (user_id, uid, history_id) "
+        "SELECT user_id, uid, min(id) FROM history WHERE uid IS NOT NULL GROUP BY user_id, uid "
+        "ON CONFLICT DO NOTHING"
+    ))
+    for stmt in UID_TRIGGER_DDL:
+        conn.exec_driver_sql(stmt)
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_history_user_uid ON history (user_id, uid)"))
+
+
+def release_uids(conn):
+    conn.exec_driver_sql("DROP TRIGGER IF EXISTS history_uids_ai ON history")
+    conn.exec_driver_sql("DROP TRIGGER IF EXISTS history_uids_ad ON history")
+    conn.exec_driver_sql("DROP FUNCTION IF EXISTS history_uids_claim()")
+    conn.exec_driver_sql("DROP FUNCTION IF EXISTS history_uids_release()")
+    conn.exec_driver_sql("DROP TABLE IF EXISTS history_uids")
+    conn.exec_driver_sql("DROP INDEX IF EXISTS ix_history_user_uid")
+
+
+def _take_over(conn, partitioned: bool):
+    """Copy history_old into the new history, hand it the id sequence and index it"""
+    conn.execute(text(f"INSERT INTO history ({COLUMNS}) SELECT {COLUMNS} FROM history_old"))
+    conn.execute(text("ALTER SEQUENCE history_id_seq OWNED BY history.id"))
+    conn.execute(text("DROP TABLE history_old"))
+    for stmt in INDEX_DDL:
+        conn.execute(text(stmt))
+    # Triggers go with the old table
+    for stmt in POSTGRES_LINK_DDL:
+        conn.exec_driver_sql(stmt)
+    if partitioned:
+        claim_uids(conn)
+    else:
+        release_uids(conn)
+        conn.execute(text("CREATE UNIQUE INDEX uq_history_user_uid ON history (user_id, uid)"))
+
+
+def partition_history(conn, months_ahead: int = HISTORY_PARTITION_MONTHS_AHEAD):
+    """Turn a plain ``history`` table into the partitioned layout, keeping its rows"""
+    if conn.dialect.name != "postgresql" or is_partitioned(conn):
+        return
+    oldest = conn.execute(text("SELECT min(created_at) FROM history")).scalar()
+    # The primary key gains created_at, so history_results can no longer reference it
+    conn.execute(text("ALTER TABLE IF EXISTS history_results DROP CONSTRAINT IF EXISTS history_results_history_id_fkey"))
+    _set_aside(conn)
+    conn.execute(text(PARTITIONED_DDL))
+    conn.execute(text("CREATE TABLE history_default PARTITION OF history DEFAULT"))
+    ensure_partitions(conn, (oldest or datetime.utcnow()).date(), _month(datetime.utcnow().date(), months_ahead))
+    _take_over(conn, partitioned=True)
+    logger.info("history is now partitioned by month on created_at")
+
+
+def unpartition_history(conn):
+    """Back to a single plain ``history`` table, keeping its rows"""
+    if conn.dialect.name != "postgresql" or not is_partitioned(conn):
+        return
+    _set_aside(conn)
+    conn.execute(text(PLAIN_DDL))
+    _take_over(conn, partitioned=False)
+
+
+@event.listens_for(HistoryItem.__table__, "after_create")
+def _partition_new_table(target, connection, **kw):
+    partition_history(connection)
@@ -0,0 +1,304 @@
+# backend/ratelimit.py
+"""Per-user token buckets and a global cap on concurrent upstream calls.
+
+Each limited route group (``search``, ``image``) has its own bucket per user,
+keyed on the JWT subject, refilling at ``per_minute`` tokens a minute up to
+``burst``. A request that finds the bucket empty gets 429 with Retry-After
+set to when the next token arrives.
+
+Buckets live in process memory by default. With several API processes, set
+RATE_LIMIT_BACKEND=redis so they share one set of buckets; any object with
+the same ``take`` coroutine can be swapped in with ``set_rate_limit_backend``
+(e.g. a local stand-in in tests or benchmarks).
+
+Separately, ``upstream_slots`` bounds how many MCP/fallback calls run at once
+across all users. A request that can't get a slot within a short wait is
+turned away with 429 rather than queueing until it times out.
+"""
+import asyncio
+import logging
+import math
+import os
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+from fastapi import Depends, HTTPException, status
+
+from backend.metrics import Counter, gauge, registry
+from backend.utils import get_current_user_id
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "1") not in ("0", "false", "False")
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")
+RATE_LIMIT_REDIS_URL = os.getenv("RATE_LIMIT_REDIS_URL", "redis://localhost:6379/0")
+SEARCH_RATE_LIMIT = float(os.getenv("SEARCH_RATE_LIMIT", "60"))
+SEARCH_RATE_BURST = int(os.getenv("SEARCH_RATE_BURST", "20"))
+IMAGE_RATE_LIMIT = float(os.getenv("IMAGE_RATE_LIMIT", "10"))
+IMAGE_RATE_BURST = int(os.getenv("IMAGE_RATE_BURST", "5"))
+UPSTREAM_MAX_CONCURRENCY = int(os.getenv("UPSTREAM_MAX_CONCURRENCY", "64"))
+UPSTREAM_QUEUE_TIMEOUT = float(os.getenv("UPSTREAM_QUEUE_TIMEOUT", "0.5"))
+
+rate_limited = registry.register(Counter(
+    "aigen_rate_limited_total", "Requests rejected by per-user rate limits and upstream quotas", ("limit",)
+))
+
+
+class MemoryRateLimitBackend:
+    """Token buckets in a dict; only correct when a single process serves traffic"""
+
+    def __init__(self):
+        self._buckets: Dict[str, list] = {}  # key -> [tokens, updated_at, seconds to refill]
+        self._last_prune = 0.0
+
+    async def take(self, key: str, rate: float, burst: int, cost: float = 1) -> float:
+        """Take ``cost`` tokens; returns 0 on success, else seconds until they'd be available"""
+        now = time.monotonic()
+        self._prune(now)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [float(burst), now, burst / rate]
+        tokens = min(burst, bucket[0] + (now - bucket[1]) * rate)
+        bucket[1] = now
+        if tokens >= cost:
+            bucket[0] = tokens - cost
+            return 0.0
+        bucket[0] = tokens
+        return (cost - tokens) / rate
+
+    def _prune(self, now: float):
+        # Buckets that have refilled completely hold no state worth keeping
+        if now - self._last_prune < 60:
+            return
+        self._last_prune = now
+        for key in [k for k, (_, updated, refill) in self._buckets.items() if now - updated > refill]:
+            del self._buckets[key]
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": "memory", "buckets": len(self._buckets)}
+
+
+# Refill and take in one round trip; Redis' own clock keeps API hosts consistent
+_TAKE_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local wait = 0
+if tokens >= cost then
+  tokens = tokens - cost
+else
+  wait = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000) + 1000)
+return tostring(wait)
+"""
+
+
+class RedisRateLimitBackend:
+    """Token buckets shared by every API process through Redis.
+
+    If Redis is unreachable the limiter degrades to per-process buckets
+    rather than failing requests or letting them through unlimited.
+    """
+
+    def __init__(self, client=None, url: str = RATE_LIMIT_REDIS_URL, prefix: str = "aigen:ratelimit:"):
+        if client is None:
+            try:
+                import redis.asyncio as redis
+            except ImportError:
+                raise RuntimeError("RATE_LIMIT_BACKEND=redis needs the redis package (pip install redis)")
+            client = redis.from_url(url)
+        self.client = client
+        self.prefix = prefix
+        self._script = client.register_script(_TAKE_SCRIPT)
+        self._local = MemoryRateLimitBackend()
+        self._degraded = False
+        self.errors = 0
+
+    async def take(self, key: str, rate: float, burst: int, cost: float = 1) -> float:
+        try:
+            wait = float(await self._script(keys=[self.prefix + key], args=[rate, burst, cost]))
+        except Exception as e:
+            self.errors += 1
+            if not self._degraded:
+                self._degraded = True
+                logger.warning(f"Rate limit backend unavailable ({e}), using per-process buckets")
+            return await self._local.take(key, rate, burst, cost)
+        if self._degraded:
+            self._degraded = False
+            logger.info("Rate limit backend recovered")
+        return wait
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": "redis", "degraded": self._degraded, "errors": self.errors, "local_buckets": self._local.stats()["buckets"]}
+
+
+def _make_backend():
+    if RATE_LIMIT_BACKEND == "redis":
+        return RedisRateLimitBackend()
+    return MemoryRateLimitBackend()
+
+
+_backend = _make_backend()
+
+
+def set_rate_limit_backend(backend):
+    """Swap the bucket store, e.g. for a shared stand-in in tests or benchmarks"""
+    global _backend
+    _backend = backend
+
+
+def _retry_after(seconds: float) -> str:
+    return str(max(1, math.ceil(seconds)))
+
+
+class RateLimiter:
+    """Per-user token bucket for one route group, usable as a FastAPI dependency:
+
+        @router.get("", dependencies=[Depends(search_limiter)])
+
+    It only needs the token's subject, so over-limit requests are rejected
+    before any database work.
+    """
+
+    def __init__(self, name: str, per_minute: float, burst: int, enabled: bool = RATE_LIMIT_ENABLED):
+        self.name = name
+        self.rate = per_minute / 60.0
+        self.burst = max(1, burst)
+        self.enabled = enabled and per_minute > 0
+        self.allowed = 0
+        self.rejected = 0
+
+    async def take(self, user_id, cost: float = 1) -> float:
+        """0 if the user may proceed, else seconds until ``cost`` tokens are available"""
+        if not self.enabled:
+            return 0.0
+        wait = await _backend.take(f"{self.name}:{user_id}", self.rate, self.burst, cost)
+        if wait > 0:
+            self.rejected += 1
+            rate_limited.inc(self.name)
+        else:
+            self.allowed += 1
+        return wait
+
+    async def check(self, user_id, cost: float = 1):
+        wait = await self.take(user_id, cost)
+        if wait > 0:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail=f"Rate limit exceeded for {self.name}, please retry later",
+                headers={"Retry-After": _retry_after(wait)},
+            )
+
+    async def __call__(self, user_id: int = Depends(get_current_user_id)):
+        await self.check(user_id)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "per_minute": round(self.rate * 60, 2),
+            "burst": self.burst,
+            "allowed": self.allowed,
+            "rejected": self.rejected,
+        }
+
+
+class UpstreamSlots:
+    """Global cap on concurrent upstream calls with a short, bounded queue.
+
+    ``async with upstream_slots.slot(): ...`` waits at most ``queue_timeout``
+    seconds for a free slot, then raises 429 with a Retry-After estimated
+    from how long recent calls held their slot.
+    """
+
+    def __init__(self, limit: int, queue_timeout: float):
+        self.limit = limit
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(limit)
+        self.in_use = 0
+        self.waiting = 0
+        self.rejected = 0
+        self._hold_times: Deque[float] = deque(maxlen=200)
+
+    def slot(self, timeout: Optional[float] = None) -> "_Slot":
+        """``timeout`` overrides the queue wait (None = the configured UPSTREAM_QUEUE_TIMEOUT)"""
+        return _Slot(self, self.queue_timeout if timeout is None else timeout)
+
+    async def _acquire(self, timeout: float):
+        if not self._semaphore.locked():
+            await self._semaphore.acquire()
+            self.in_use += 1
+            return
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            rate_limited.inc("upstream")
+            hold = sum(self._hold_times) / len(self._hold_times) if self._hold_times else 1.0
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Upstream services are at capacity, please retry",
+                headers={"Retry-After": _retry_after(hold)},
+            )
+        finally:
+            self.waiting -= 1
+        self.in_use += 1
+
+    def _release(self, held: float):
+        self.in_use -= 1
+        self._hold_times.append(held)
+        self._semaphore.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "limit": self.limit,
+            "in_use": self.in_use,
+            "waiting": self.waiting,
+            "rejected": self.rejected,
+            "queue_timeout": self.queue_timeout,
+        }
+
+
+class _Slot:
+    __slots__ = ("slots", "timeout", "start")
+
+    def __init__(self, slots: UpstreamSlots, timeout: float):
+        self.slots = slots
+        self.timeout = timeout
+
+    async def __aenter__(self):
+        await self.slots._acquire(self.timeout)
+        self.start = time.monotonic()
+        return self
+
+    async def __aexit__(self, *exc):
+        self.slots._release(time.monotonic() - self.start)
+        return False
+
+
+search_limiter = RateLimiter("search", SEARCH_RATE_LIMIT, SEARCH_RATE_BURST)
+image_limiter = RateLimiter("image", IMAGE_RATE_LIMIT, IMAGE_RATE_BURST)
+upstream_slots = UpstreamSlots(UPSTREAM_MAX_CONCURRENCY, UPSTREAM_QUEUE_TIMEOUT)
+
+
+def rate_limit_stats() -> Dict[str, Any]:
+    return {
+        **_backend.stats(),
+        "search": search_limiter.stats(),
+        "image": image_limiter.stats(),
+        "upstream": upstream_slots.stats(),
+    }
+
+
+@gauge("aigen_upstream_slots", "Concurrent upstream calls in progress and waiting for a slot", ("state",))
+def _upstream_slots_gauge():
+    return {("in_use",): upstream_slots.in_use, ("waiting",): upstream_slots.waiting}
@@ -0,0 +1,47 @@
+# backend/responses.py
+"""orjson-backed JSON responses for the payload-heavy endpoints.
+
+FastAPI runs every value a route returns through ``jsonable_encoder`` (a
+recursive walk that rebuilds each dict and list) before ``json.dumps``.
+Returning a ``FastJSONResponse`` skips that pass and serializes with orjson,
+which handles datetimes, UUIDs and nested dicts natively.
+
+History rows go one step further: their ``data`` column is already JSON text
+in the database, so ``render_rows`` splices it into the output verbatim
+instead of parsing it into dicts only to serialize it again.
+"""
+from typing import Any, Sequence
+
+import orjson
+from fastapi.responses import JSONResponse, Response
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+def render_rows(keys: Sequence[str], rows: Sequence[Sequence[Any]], raw: str = "data") -> bytes:
+    """A JSON array with one object per row; the ``raw`` column holds JSON text and is emitted as-is"""
+    if raw not in keys:
+        return orjson.dumps([dict(zip(keys, row)) for row in rows])
+    raw_index = keys.index(raw)
+    fields = [(i, key) for i, key in enumerate(keys) if i != raw_index]
+    raw_prefix = b',"' + raw.encode() + b'":'
+    parts = []
+    for row in rows:
+        head = orjson.dumps({key: row[i] for i, key in fields})
+        value = row[raw_index]
+        if value is None:
+            value = b"null"
+        elif isinstance(value, str):
+            value = value.encode()
+        # head always has at least one field, so dropping its "}" leaves "{...,"-ready JSON
+        parts.append(head[:-1] + raw_prefix + value + b"}")
+    return b"[" + b",".join(parts) + b"]"
+
+
+def history_page_response(keys: Sequence[str], rows: Sequence[Sequence[Any]], next_cursor) -> Response:
+    """``{"items": [...], "next_cursor": ...}`` for dashboard pages, without a jsonable_encoder pass"""
+    body = b'{"items":' + render_rows(keys, rows) + b',"next_cursor":' + orjson.dumps(next_cursor) + b"}"
+    return Response(body, media_type="application/json")
@@ -0,0 +1,156 @@
+# backend/result_store.py
+"""Deduplicated storage for search results.
+
+The same results (URL, title, snippet) come back for many users and many
+searches. Instead of copying them into every history payload, each distinct
+result is stored once in ``search_results``, keyed by a SHA-256 of its URL,
+title and snippet, and ``history_results`` lists a history row's results by
+position. The payload in ``history.data``/``data_z`` keeps everything else.
+
+The title and snippet are part of the key so every row reads back exactly
+what its search returned; DuckDuckGo gives a URL the same title and snippet
+across searches nearly all the time, so they cost little sharing.
+
+A stored search payload has its ``results`` either inline or linked, never
+both: rows from before this change, searches with no results and writes
+with SEARCH_RESULT_STORE=0 keep them inline, and reads splice linked
+results back in as the payload's first key, where they were written.
+"""
+import hashlib
+import os
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Sequence, Tuple, Union
+
+import orjson
+from sqlalchemy import DDL, event, insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.metrics import Counter, registry
+from backend.models import HistoryResult, SearchResult
+
+SEARCH_RESULT_STORE = os.getenv("SEARCH_RESULT_STORE", "1") not in ("0", "false", "False")
+
+RESULT_FIELDS = ("title", "body", "href")
+# Keeps each IN (...) lookup under SQLite's bound-parameter limit
+LOOKUP_CHUNK = 500
+
+# history_results has no foreign key to history (a partitioned table on
+# PostgreSQL, see backend/partitions.py), so a trigger unlinks deleted rows
+SQLITE_LINK_DDL = [
+    "CREATE TRIGGER IF NOT EXISTS history_results_ad AFTER DELETE ON history BEGIN "
+    "DELETE FROM history_results WHERE history_id = old.id; END",
+]
+POSTGRES_LINK_DDL = [
+    "CREATE OR REPLACE FUNCTION history_results_unlink() RETURNS trigger LANGUAGE plpgsql AS $$ "
+    "BEGIN DELETE FROM history_results WHERE history_id = OLD.id; RETURN NULL; END $$",
+    "DROP TRIGGER IF EXISTS history_results_ad ON history",
+    "CREATE TRIGGER history_results_ad AFTER DELETE ON history FOR EACH ROW EXECUTE FUNCTION history_results_unlink()",
+]
+
+for _stmt in SQLITE_LINK_DDL:
+    event.listen(HistoryResult.__table__, "after_create", DDL(_stmt).execute_if(dialect="sqlite"))
+for _stmt in POSTGRES_LINK_DDL:
+    event.listen(HistoryResult.__table__, "after_create", DDL(_stmt).execute_if(dialect="postgresql"))
+
+result_writes = registry.register(Counter(
+    "aigen_search_results_total", "Search results linked from history, by whether they were already stored", ("outcome",)
+))
+
+
+def result_key(result: Dict[str, Any]) -> str:
+    return hashlib.sha256(orjson.dumps([result.get(f) for f in RESULT_FIELDS])).hexdigest()
+
+
+def split_payload(item_type: str, data: Any) -> Tuple[Any, List[Dict[str, Any]]]:
+    """(payload to store, results to link) for one history payload"""
+    if not SEARCH_RESULT_STORE or item_type != "search" or not isinstance(data, dict):
+        return data, []
+    results = data.get("results")
+    # Only results that hydrate back exactly are moved out of the payload
+    if not results or not isinstance(results, list) or not all(
+        isinstance(r, dict) and r.keys() == set(RESULT_FIELDS) for r in results
+    ):
+        return data, []
+    return {k: v for k, v in data.items() if k != "results"}, results
+
+
+def _insert_missing(db: AsyncSession):
+    # Another writer may store the same result between lookup and insert
+    dialect = db.bind.dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert(SearchResult).on_conflict_do_nothing(index_elements=["digest"])
+    if dialect == "sqlite":
+        return sqlite.insert(SearchResult).on_conflict_do_nothing(index_elements=["digest"])
+    return insert(SearchResult)
+
+
+async def _lookup(db: AsyncSession, keys: Iterable[str]) -> Dict[str, int]:
+    keys = list(keys)
+    ids = {}
+    for i in range(0, len(keys), LOOKUP_CHUNK):
+        stmt = select(SearchResult.digest, SearchResult.id).where(SearchResult.digest.in_(keys[i:i + LOOKUP_CHUNK]))
+        ids.update((await db.execute(stmt)).all())
+    return ids
+
+
+async def upsert_results(db: AsyncSession, results: Sequence[Dict[str, Any]]) -> List[int]:
+    """search_results ids for ``results``, in order, storing the ones not seen before.
+
+    One lookup for everything, then one multi-row insert and one lookup for
+    just the new results; results that are already stored cost no writes.
+    """
+    keys = [result_key(r) for r in results]
+    ids = await _lookup(db, set(keys))
+    missing = {}
+    for key, r in zip(keys, results):
+        if key not in ids and key not in missing:
+            missing[key] = {"digest": key, **{f: r.get(f) for f in RESULT_FIELDS}}
+    if missing:
+        await db.execute(_insert_missing(db), list(missing.values()))
+        ids.update(await _lookup(db, missing))
+    result_writes.inc("new", amount=len(missing))
+    result_writes.inc("shared", amount=len(keys) - len(missing))
+    return [ids[key] for key in keys]
+
+
+async def link_results(db: AsyncSession, links: Iterable[Tuple[int, Sequence[Dict[str, Any]]]]):
+    """Link inserted history rows to their results: one upsert and one multi-row insert for any number of rows"""
+    links = [(history_id, results) for history_id, results in links if results]
+    if not links:
+        return
+    ids = iter(await upsert_results(db, [r for _, results in links for r in results]))
+    await db.execute(insert(HistoryResult), [
+        {"history_id": history_id, "position": i, "result_id": next(ids)}
+        for history_id, results in links
+        for i in range(len(results))
+    ])
+
+
+def _splice(payload: Union[str, bytes], results: bytes) -> bytes:
+    if isinstance(payload, str):
+        payload = payload.encode()
+    rest = payload.strip()[1:].lstrip()
+    return b'{"results":' + results + (b"" if rest.startswith(b"}") else b",") + rest
+
+
+async def hydrate_payloads(
+    db: AsyncSession, history_ids: Sequence[int], payloads: Sequence[Union[str, bytes, None]]
+) -> List[Union[str, bytes, None]]:
+    """Put linked results back into each row's JSON payload text, with one query for all rows"""
+    if not history_ids:
+        return list(payloads)
+    stmt = (
+        select(HistoryResult.history_id, SearchResult.title, SearchResult.body, SearchResult.href)
+        .join(SearchResult, SearchResult.id == HistoryResult.result_id)
+        .where(HistoryResult.history_id.in_(list(history_ids)))
+        .order_by(HistoryResult.history_id, HistoryResult.position)
+    )
+    linked = defaultdict(list)
+    for history_id, *values in (await db.execute(stmt)).all():
+        linked[history_id].append(dict(zip(RESULT_FIELDS, values)))
+    return [
+        _splice(payload, orjson.dumps(linked[history_id])) if history_id in linked and payload is not None else payload
+        for history_id, payload in zip(history_ids, payloads)
+    ]
+
@@ -0,0 +1,387 @@
+# backend/retention.py
+"""History retention: policies, the background purge job and compaction.
+
+A retention policy keeps history for ``max_age_days``. It can apply to one
+user, to every user with a role, or to everyone, and to one ``item_type``
+or to both. For each row the most specific policy wins, in this order:
+user beats role beats everyone, then a policy for the row's type beats
+one for both types. Rows no policy covers are kept. HISTORY_MAX_AGE_DAYS
+is a hard cap on top of every policy.
+
+The purge job walks history in id order and deletes expired rows in
+batches of HISTORY_PURGE_BATCH, one set-based DELETE per batch, pausing
+between batches so the writer lock is never held for long. Triggers remove
+the rows' full-text entries and result links. After a pass:
+
+* SQLite: the full-text index merges a little, and free pages go back to
+  the filesystem in chunks when the database uses incremental auto-vacuum
+  (``python -m backend.retention --enable-incremental-vacuum`` switches an
+  existing database over).
+* PostgreSQL: future monthly partitions are created and months wholly
+  older than HISTORY_MAX_AGE_DAYS are dropped (see backend/partitions.py).
+
+Progress is reported under ``retention`` in /health and on /metrics.
+Policies are managed from the command line:
+
+    python -m backend.retention --list
+    python -m backend.retention --set 90 [--user alice | --role free] [--item-type image]
+    python -m backend.retention --clear 3
+    python -m backend.retention --run [--dry-run]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.database import SessionLocal, engine
+from backend.metrics import Counter, gauge, registry
+from backend.models import HistoryItem, RetentionPolicy, User
+
+logger = logging.getLogger(__name__)
+
+HISTORY_MAX_AGE_DAYS = int(os.getenv("HISTORY_MAX_AGE_DAYS", "0"))  # 0 = no cap
+HISTORY_PURGE_INTERVAL = float(os.getenv("HISTORY_PURGE_INTERVAL", "3600"))  # 0 = never run in the background
+HISTORY_PURGE_BATCH = int(os.getenv("HISTORY_PURGE_BATCH", "500"))
+HISTORY_PURGE_PAUSE = float(os.getenv("HISTORY_PURGE_PAUSE", "0.05"))
+HISTORY_COMPACT_PAGES = int(os.getenv("HISTORY_COMPACT_PAGES", "1000"))
+
+ITEM_TYPES = ("search", "image")
+
+purged = registry.register(Counter(
+    "aigen_history_purged_total", "History rows deleted by retention policies", ("item_type",)
+))
+
+
+class Policies:
+    """Retention policies resolved for one row at a time"""
+
+    def __init__(self, policies: Sequence[RetentionPolicy], max_age_days: int = HISTORY_MAX_AGE_DAYS):
+        # Most specific first: user, then role, then everyone; typed before untyped
+        self._policies = sorted(
+            policies,
+            key=lambda p: (p.user_id is None, p.role is None, p.item_type is None),
+        )
+        self.max_age_days = max_age_days or None
+
+    @classmethod
+    async def load(cls, db: AsyncSession) -> "Policies":
+        return cls((await db.scalars(select(RetentionPolicy))).all())
+
+    def max_age(self, user_id: int, role: Optional[str], item_type: str) -> Optional[int]:
+        """Days a row is kept, or None to keep it forever"""
+        days = None
+        for p in self._policies:
+            if p.user_id is not None and p.user_id != user_id:
+                continue
+            if p.user_id is None and p.role is not None and p.role != role:
+                continue
+            if p.item_type is not None and p.item_type != item_type:
+                continue
+            days = p.max_age_days
+            break
+        if self.max_age_days is not None:
+            days = min(days, self.max_age_days) if days is not None else self.max_age_days
+        return days
+
+    @property
+    def shortest(self) -> Optional[int]:
+        ages = [p.max_age_days for p in self._policies] + ([self.max_age_days] if self.max_age_days else [])
+        return min(ages) if ages else None
+
+
+class HistoryPurger:
+    """Background job applying retention policies; one pass every HISTORY_PURGE_INTERVAL"""
+
+    def __init__(
+        self,
+        interval: float = HISTORY_PURGE_INTERVAL,
+        batch_size: int = HISTORY_PURGE_BATCH,
+        pause: float = HISTORY_PURGE_PAUSE,
+    ):
+        self.interval = interval
+        self.batch_size = batch_size
+        self.pause = pause
+        self._task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+        self.passes = 0
+        self.failed = 0
+        self.deleted = 0
+        self.compacted_pages = 0
+        self.partitions_dropped = 0
+        self.partition_errors = 0
+        # The pass in progress, or the last one
+        self.pass_scanned = 0
+        self.pass_deleted = 0
+        self.pass_progress = 0.0
+        self.last_started: Optional[float] = None
+        self.last_duration: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self):
+        if self.running or self.interval <= 0:
+            return
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"History retention job started (every {self.interval:.0f}s, batch={self.batch_size})")
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                self.failed += 1
+                self.last_error = str(e)
+                logger.error(f"History retention pass failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def run_once(self, dry_run: bool = False) -> Dict[str, Any]:
+        """One full pass: purge expired rows, then compact"""
+        async with self._lock:
+            self.last_started = time.time()
+            start = time.perf_counter()
+            self.pass_scanned = self.pass_deleted = 0
+            self.pass_progress = 0.0
+            async with SessionLocal() as db:
+                policies = await Policies.load(db)
+            if engine.dialect.name == "postgresql" and not dry_run:
+                await self._maintain_partitions()
+            if policies.shortest is not None:
+                await self._purge(policies, dry_run)
+            if not dry_run and engine.dialect.name == "sqlite":
+                await self._compact_sqlite()
+            self.pass_progress = 1.0
+            self.passes += 1
+            self.last_duration = time.perf_counter() - start
+            if self.pass_deleted:
+                logger.info(f"Retention pass deleted {self.pass_deleted} of {self.pass_scanned} candidate history rows")
+            return {"scanned": self.pass_scanned, "deleted": self.pass_deleted}
+
+    async def _purge(self, policies: Policies, dry_run: bool):
+        now = datetime.utcnow()
+        oldest_kept = now - timedelta(days=policies.shortest)
+        last_id = 0
+        async with SessionLocal() as db:
+            max_id = await db.scalar(select(HistoryItem.id).order_by(HistoryItem.id.desc()).limit(1)) or 0
+        while True:
+            async with SessionLocal() as db:
+                rows = (await db.execute(
+                    select(HistoryItem.id, HistoryItem.user_id, HistoryItem.item_type, HistoryItem.created_at, User.role)
+                    .join(User, User.id == HistoryItem.user_id)
+                    .where(HistoryItem.id > last_id, HistoryItem.created_at < oldest_kept)
+                    .order_by(HistoryItem.id)
+                    .limit(self.batch_size)
+                )).all()
+                if not rows:
+                    break
+                last_id = rows[-1].id
+                expired: List[int] = []
+                by_type: Dict[str, int] = {}
+                for row_id, user_id, item_type, created_at, role in rows:
+                    days = policies.max_age(user_id, role, item_type)
+                    if days is not None and created_at < now - timedelta(days=days):
+                        expired.append(row_id)
+                        by_type[item_type] = by_type.get(item_type, 0) + 1
+                if expired and not dry_run:
+                    await db.execute(
+                        delete(HistoryItem).where(HistoryItem.id.in_(expired)).execution_options(synchronize_session=False)
+                    )
+                    await db.commit()
+                    for item_type, count in by_type.items():
+                        purged.inc(item_type, amount=count)
+                    self.deleted += len(expired)
+            self.pass_scanned += len(rows)
+            self.pass_deleted += len(expired)
+            self.pass_progress = min(1.0, last_id / max_id) if max_id else 1.0
+            await asyncio.sleep(self.pause)
+
+    async def _compact_sqlite(self):
+        async with engine.connect() as conn:
+            if self.pass_deleted:
+                # A bounded amount of FTS5 segment merging, not a full optimize
+                await conn.exec_driver_sql("INSERT INTO history_fts(history_fts, rank) VALUES ('merge', 500)")
+                await conn.commit()
+            if (await conn.exec_driver_sql("PRAGMA auto_vacuum")).scalar() != 2:
+                return
+            free = (await conn.exec_driver_sql("PRAGMA freelist_count")).scalar()
+            raw = (await conn.get_raw_connection()).driver_connection
+            while free:
+                # The pragma frees one page per step; a plain execute only steps once
+                await raw.executescript(f"PRAGMA incremental_vacuum({HISTORY_COMPACT_PAGES})")
+                left = (await conn.exec_driver_sql("PRAGMA freelist_count")).scalar()
+                if left >= free:
+                    break
+                self.compacted_pages += free - left
+                free = left
+                await asyncio.sleep(self.pause)
+
+    async def _maintain_partitions(self):
+        """Create months ahead and drop expired ones; a failure is recorded but never stops the purge"""
+        from backend import partitions
+
+        try:
+            async with engine.begin() as conn:
+                if not await conn.run_sync(partitions.is_partitioned):
+                    return
+                await conn.run_sync(partitions.ensure_months_ahead)
+                if HISTORY_MAX_AGE_DAYS:
+                    cutoff = datetime.utcnow() - timedelta(days=HISTORY_MAX_AGE_DAYS)
+                    dropped = await conn.run_sync(partitions.drop_partitions_before, cutoff)
+                    if dropped:
+                        logger.info(f"Dropped expired history partitions: {', '.join(dropped)}")
+                    self.partitions_dropped += len(dropped)
+        except Exception as e:
+            self.partition_errors += 1
+            self.last_error = f"partition maintenance: {e}"
+            logger.error(f"History partition maintenance failed, purging row by row only: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "interval": self.interval,
+            "passes": self.passes,
+            "failed": self.failed,
+            "deleted": self.deleted,
+            "compacted_pages": self.compacted_pages,
+            "partitions_dropped": self.partitions_dropped,
+            "partition_errors": self.partition_errors,
+            "current_pass": {
+                "scanned": self.pass_scanned,
+                "deleted": self.pass_deleted,
+                "progress": round(self.pass_progress, 4),
+            },
+            "last_started": datetime.utcfromtimestamp(self.last_started).isoformat() + "Z" if self.last_started else None,
+            "last_duration": round(self.last_duration, 3) if self.last_duration is not None else None,
+            "last_error": self.last_error,
+        }
+
+
+history_purger = HistoryPurger()
+
+
+@gauge("aigen_history_purge_progress", "Retention pass progress: rows scanned and deleted, fraction of ids walked", ("stat",))
+def _purge_progress_gauge():
+    return {
+        ("scanned",): history_purger.pass_scanned,
+        ("deleted",): history_purger.pass_deleted,
+        ("progress",): history_purger.pass_progress,
+    }
+
+
+async def effective_retention(db: AsyncSession, user_id: int, role: Optional[str]) -> Dict[str, Optional[int]]:
+    """Days each item type is kept for one user (None = forever)"""
+    policies = await Policies.load(db)
+    return {item_type: policies.max_age(user_id, role, item_type) for item_type in ITEM_TYPES}
+
+
+async def _policies_table() -> List[str]:
+    async with SessionLocal() as db:
+        rows = (await db.execute(
+            select(RetentionPolicy, User.username)
+            .outerjoin(User, User.id == RetentionPolicy.user_id)
+            .order_by(RetentionPolicy.id)
+        )).all()
+    lines = []
+    for policy, username in rows:
+        who = f"user {username}" if policy.user_id is not None else f"role {policy.role}" if policy.role else "everyone"
+        lines.append(f"  #{policy.id}: {who}, {policy.item_type or 'all items'}: {policy.max_age_days} days")
+    return lines
+
+
+async def _set_policy(days: int, username: Optional[str], role: Optional[str], item_type: Optional[str]) -> RetentionPolicy:
+    """Create or replace the policy for one (user | role | everyone, item_type) scope"""
+    async with SessionLocal() as db:
+        user_id = None
+        if username:
+            user_id = await db.scalar(select(User.id).where(User.username == username))
+            if user_id is None:
+                raise SystemExit(f"No such user: {username}")
+            role = None
+        await db.execute(delete(RetentionPolicy).where(
+            RetentionPolicy.user_id.is_(None) if user_id is None else RetentionPolicy.user_id == user_id,
+            RetentionPolicy.role.is_(None) if role is None else RetentionPolicy.role == role,
+            RetentionPolicy.item_type.is_(None) if item_type is None else RetentionPolicy.item_type == item_type,
+        ))
+        policy = RetentionPolicy(user_id=user_id, role=role, item_type=item_type, max_age_days=days)
+        db.add(policy)
+        await db.commit()
+        return policy
+
+
+async def _clear_policy(policy_id: int) -> bool:
+    async with SessionLocal() as db:
+        result = await db.execute(delete(RetentionPolicy).where(RetentionPolicy.id == policy_id))
+        await db.commit()
+        return bool(result.rowcount)
+
+
+async def _enable_incremental_vacuum():
+    """Switch an existing SQLite database to incremental auto-vacuum (rewrites the file once)"""
+    if engine.dialect.name != "sqlite":
+        raise SystemExit("Incremental vacuum only applies to SQLite")
+    async with engine.connect() as conn:
+        await conn.exec_driver_sql("PRAGMA auto_vacuum = INCREMENTAL")
+        await conn.exec_driver_sql("VACUUM")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Manage history retention policies and run the purge job")
+    parser.add_argument("--list", action="store_true", help="show the policies")
+    parser.add_argument("--set", type=int, metavar="DAYS", help="keep history for DAYS days")
+    parser.add_argument("--user", help="--set for one user (by username)")
+    parser.add_argument("--role", help="--set for every user with this role")
+    parser.add_argument("--item-type", choices=ITEM_TYPES, help="--set for one item type only")
+    parser.add_argument("--clear", type=int, metavar="ID", help="delete the policy with this id")
+    parser.add_argument("--run", action="store_true", help="run one purge and compaction pass now")
+    parser.add_argument("--dry-run", action="store_true", help="with --run: count expired rows without deleting")
+    parser.add_argument("--enable-incremental-vacuum", action="store_true",
+                        help="SQLite: let compaction hand free pages back to the filesystem")
+    args = parser.parse_args()
+
+    try:
+        if args.set is not None:
+            if args.set < 1:
+                raise SystemExit("--set needs at least 1 day")
+            policy = await _set_policy(args.set, args.user, args.role, args.item_type)
+            print(f"Set policy #{policy.id}")
+        if args.clear is not None:
+            print(f"Cleared policy #{args.clear}" if await _clear_policy(args.clear) else f"No policy #{args.clear}")
+        if args.enable_incremental_vacuum:
+            await _enable_incremental_vacuum()
+            print("Incremental auto-vacuum enabled")
+        if args.run:
+            purger = HistoryPurger(pause=0)
+            result = await purger.run_once(dry_run=args.dry_run)
+            verb = "Would delete" if args.dry_run else "Deleted"
+            print(f"{verb} {result['deleted']} expired history rows ({result['scanned']} old enough to check)"
+                  + (f"; released {purger.compacted_pages} pages" if purger.compacted_pages else ""))
+        if args.list or not any((args.set is not None, args.clear is not None, args.run, args.enable_incremental_vacuum)):
+            lines = await _policies_table()
+            print("\n".join(["Retention policies:", *lines]) if lines else "No retention policies; history is kept forever")
+            if HISTORY_MAX_AGE_DAYS:
+                print(f"HISTORY_MAX_AGE_DAYS caps every policy at {HISTORY_MAX_AGE_DAYS} days")
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
@@ -1,10 +1,11 @@
 # backend/routers/auth.py
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from backend.database import get_db
 from backend.models import User
-from backend.utils import create_access_token, hash_password, verify_password
+from backend.utils import create_access_token, hash_password_async, verify_password_async
 from pydantic import BaseModel, EmailStr, Field
 
 router = APIRouter()
@@ -15,39 +16,50 @@ class RegisterRequest(BaseModel):
     password: str = Field(..., min_length=6)
 
 @router.post("/register", summary="Register a new user")
-def register(req: RegisterRequest, db: Session = Depends(get_db)):
+async def register(req: RegisterRequest, db: AsyncSession = Depends(get_db)):
     # Check if email already exists
-    if db.query(User).filter(User.email == req.email).first():
+    if await db.scalar(select(User.id).where(User.email == req.email)):
         raise HTTPException(status_code=400, detail="Email already registered")
     
     # Check if username already exists
-    if db.query(User).filter(User.username == req.username).first():
+    if await db.scalar(select(User.id).where(User.username == req.username)):
         raise HTTPException(status_code=400, detail="Username already taken")
     
-    # Create new user - FIXED: using correct function name
+    # Create new user; hashing runs on the bounded password pool
     user = User(
         username=req.username, 
         email=req.email, 
-        hashed_password=hash_password(req.password)  # Fixed: was get_hash_password
+        hashed_password=await hash_password_async(req.password)
     )
     
     try:
         db.add(user)
-        db.commit()
-        db.refresh(user)
+        await db.commit()
         return {"message": "User registered successfully", "user_id": user.id}
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail="Registration failed")
 
 @router.post("/login", summary="Login user")
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)):
     # Find user by email (form_data.username contains email)
-    user = db.query(User).filter(User.email == form_data.username).first()
+    user = await db.scalar(select(User).where(User.email == form_data.username))
     
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    if not user:
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
+    ok, new_hash = await verify_password_async(form_data.password, user.hashed_password)
+    if not ok:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+    
+    # Re-hash at the current bcrypt cost while we have the plaintext
+    if new_hash:
+        try:
+            user.hashed_password = new_hash
+            await db.commit()
+        except Exception:
+            await db.rollback()
+    
     access_token = create_access_token(str(user.id))
     return {
         "access_token": access_token, 
@@ -0,0 +1,28 @@
+# backend/routers/blobs.py
+import asyncio
+from fastapi import APIRouter, HTTPException, Header
+from fastapi.responses import FileResponse, Response
+from backend.blobstore import blob_store, is_digest
+from typing import Optional
+
+router = APIRouter()
+
+@router.get("/{digest}", summary="Serve a stored image by its SHA-256 digest")
+async def get_blob(digest: str, if_none_match: Optional[str] = Header(None)):
+    """
+    Blobs are immutable, so responses are cacheable forever and the digest is
+    the ETag. `Range` requests are answered with `206 Partial Content`.
+    """
+    if not is_digest(digest):
+        raise HTTPException(status_code=404, detail="Image not found")
+    # One small read tells both whether the blob exists and its media type; keep it off the loop
+    media_type = await asyncio.to_thread(blob_store.media_type, digest)
+    if media_type is None:
+        raise HTTPException(status_code=404, detail="Image not found")
+    headers = {
+        "ETag": f'"{digest}"',
+        "Cache-Control": "public, max-age=31536000, immutable",
+    }
+    if if_none_match and digest in if_none_match:
+        return Response(status_code=304, headers=headers)
+    return FileResponse(blob_store.path(digest), media_type=media_type, headers=headers)
@@ -1,33 +1,158 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from sqlalchemy import select, delete, and_, or_, type_coerce, Text, LargeBinary
+from sqlalchemy.ext.asyncio import AsyncSession
+from pydantic import BaseModel, Field
 from backend.database import get_db
-from backend.models import HistoryItem
-from backend.utils import decode_token, oauth2_scheme
+from backend.models import HistoryItem, User
+from backend.utils import get_current_user_id
+from backend.compression import payloads_as_json
+from backend.fulltext import search_history
+from backend.result_store import hydrate_payloads
+from backend.retention import effective_retention
+from backend.responses import FastJSONResponse, history_page_response
 from typing import Optional, List
+from datetime import datetime, timedelta
+import base64
 
 router = APIRouter()
 
-@router.get("", summary="List saved items (search + image)")
-def list_items(
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+MAX_BULK_DELETE_IDS = 1000
+
+class BulkDeleteRequest(BaseModel):
+    ids: Optional[List[int]] = Field(None, max_length=MAX_BULK_DELETE_IDS, description="only these items")
+    item_type: Optional[str] = Field(None, description="search|image")
+    before: Optional[datetime] = Field(None, description="only items created before this time (UTC)")
+
+# Columns returned by the light projection (everything except the JSON payload)
+LIGHT_COLUMNS = (
+    HistoryItem.id,
+    HistoryItem.uid,
+    HistoryItem.item_type,
+    HistoryItem.query,
+    HistoryItem.created_at,
+    HistoryItem.user_id,
+)
+# The payload as stored (plain JSON text or a compressed blob); it is only
+# decompressed, never parsed, before being spliced into the response
+RAW_DATA = (
+    type_coerce(HistoryItem.data, Text).label("data"),
+    type_coerce(HistoryItem.data_z, LargeBinary).label("data_z"),
+)
+
+async def with_raw_payloads(db: AsyncSession, keys, rows):
+    """Collapse the trailing (data, data_z) columns into one "data" column of JSON text,
+    with shared search results put back in"""
+    if keys[-2:] != ["data", "data_z"]:
+        return keys, rows
+    payloads = await payloads_as_json(db, [(row[-2], row[-1]) for row in rows])
+    payloads = await hydrate_payloads(db, [row[keys.index("id")] for row in rows], payloads)
+    return keys[:-1], [(*row[:-2], payload) for row, payload in zip(rows, payloads)]
+
+def encode_cursor(created_at: datetime, item_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{item_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, item_id = base64.urlsafe_b64decode(padded).decode().split("|")
+        return datetime.fromisoformat(created_at), int(item_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+# Ranked keyword results have no stable sort key, so their cursor is an offset
+def encode_offset_cursor(offset: int) -> str:
+    return base64.urlsafe_b64encode(f"offset|{offset}".encode()).decode().rstrip("=")
+
+def decode_offset_cursor(cursor: str) -> int:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        tag, offset = base64.urlsafe_b64decode(padded).decode().split("|")
+        if tag != "offset":
+            raise ValueError(tag)
+        return max(0, int(offset))
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+@router.get("", summary="List saved items (search + image)", response_class=FastJSONResponse)
+async def list_items(
     item_type: Optional[str] = Query(None, description="search|image"),
-    q: Optional[str] = Query(None, description="filter by keyword"),
-    db: Session = Depends(get_db),
-    token: str = Depends(oauth2_scheme),
+    q: Optional[str] = Query(None, description="full-text search over queries and results"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="page size"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    include_data: bool = Query(True, description="false returns a light projection without the data payload"),
+    db: AsyncSession = Depends(get_db),
+    user_id: int = Depends(get_current_user_id),
 ):
-    user_id = int(decode_token(token))
-    qry = db.query(HistoryItem).filter(HistoryItem.user_id == user_id)
+    """
+    Newest-first keyset pagination on (created_at, id), or best-first ranked
+    full-text matches when q is given. Pass the returned next_cursor to fetch
+    the following page; it is null on the last page.
+    """
+    if q and q.strip():
+        offset = decode_offset_cursor(cursor) if cursor else 0
+        keys, rows = await search_history(db, user_id, q, item_type, limit + 1, offset, include_data)
+        next_cursor = encode_offset_cursor(offset + limit) if len(rows) > limit else None
+        keys, rows = await with_raw_payloads(db, keys, rows[:limit])
+        return history_page_response(keys, rows, next_cursor)
+
+    columns = LIGHT_COLUMNS + (RAW_DATA if include_data else ())
+    qry = select(*columns).where(HistoryItem.user_id == user_id)
     if item_type:
-        qry = qry.filter(HistoryItem.item_type == item_type)
-    if q:
-        qry = qry.filter(HistoryItem.query.ilike(f"%{q}%"))
-    items = qry.order_by(HistoryItem.created_at.desc()).all()
-    return {"items": items}
+        qry = qry.where(HistoryItem.item_type == item_type)
+    if cursor:
+        after_created, after_id = decode_cursor(cursor)
+        qry = qry.where(or_(
+            HistoryItem.created_at < after_created,
+            and_(HistoryItem.created_at == after_created, HistoryItem.id < after_id),
+        ))
+    qry = qry.order_by(HistoryItem.created_at.desc(), HistoryItem.id.desc()).limit(limit + 1)
+    result = await db.execute(qry)
+    rows = result.all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        next_cursor = encode_cursor(last.created_at, last.id)
+    keys, rows = await with_raw_payloads(db, list(result.keys()), rows[:limit])
+    return history_page_response(keys, rows, next_cursor)
+
+@router.get("/retention", summary="How long your history is kept")
+async def retention(db: AsyncSession = Depends(get_db), user_id: int = Depends(get_current_user_id)):
+    """Days each item type is kept under the retention policies; null means forever"""
+    role = await db.scalar(select(User.role).where(User.id == user_id))
+    return {"max_age_days": await effective_retention(db, user_id, role)}
+
+@router.post("/delete", summary="Delete many items at once")
+async def delete_items(req: BulkDeleteRequest, db: AsyncSession = Depends(get_db), user_id: int = Depends(get_current_user_id)):
+    """
+    Deletes every item of yours matching all the given filters (ids,
+    item_type, before) in one statement. At least one filter is required.
+    """
+    if req.ids is None and req.item_type is None and req.before is None:
+        raise HTTPException(status_code=400, detail="Give ids, item_type or before")
+    stmt = delete(HistoryItem).where(HistoryItem.user_id == user_id)
+    if req.ids is not None:
+        stmt = stmt.where(HistoryItem.id.in_(req.ids))
+    if req.item_type is not None:
+        stmt = stmt.where(HistoryItem.item_type == req.item_type)
+    if req.before is not None:
+        before = req.before.replace(tzinfo=None) - (req.before.utcoffset() or timedelta())
+        stmt = stmt.where(HistoryItem.created_at < before)
+    result = await db.execute(stmt.execution_options(synchronize_session=False))
+    await db.commit()
+    return {"deleted": result.rowcount}
 
 @router.delete("/{item_id}", summary="Delete an item")
-def delete_item(item_id: int, db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)):
-    user_id = int(decode_token(token))
-    item = db.query(HistoryItem).filter(HistoryItem.id == item_id, HistoryItem.user_id == user_id).first()
-    if not item:
+async def delete_item(item_id: int, db: AsyncSession = Depends(get_db), user_id: int = Depends(get_current_user_id)):
+    result = await db.execute(
+        delete(HistoryItem)
+        .where(HistoryItem.id == item_id, HistoryItem.user_id == user_id)
+        .execution_options(synchronize_session=False)
+    )
+    if not result.rowcount:
         raise HTTPException(status_code=404, detail="Item not found")
-    db.delete(item); db.commit()
+    await db.commit()
     return {"ok": True}
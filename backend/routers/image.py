@@ -1,38 +1,46 @@
 # backend/routers/image.py
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from backend.database import get_db
-from backend.models import HistoryItem
-from backend.utils import decode_token, oauth2_scheme
+from fastapi import APIRouter, Depends, HTTPException, Header
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.blobstore import blob_store, decode_base64_image, store_image
+from backend.database import get_db, SessionLocal
+from backend.history import save_history, new_history_uid
+from backend.jobs import image_jobs
+from backend.models import User
+from backend.utils import get_current_user, get_current_user_id, sse_event
 from backend.mcp_clients import image_client, fallback_image_generation
+from backend.cache import image_cache, image_cache_key, IMAGE_CACHE_ENABLED
+from backend.singleflight import image_flight
+from backend.metrics import stage_timer
+from backend.ratelimit import image_limiter, upstream_slots
+from backend.responses import FastJSONResponse
 from pydantic import BaseModel, Field
 from typing import Optional
 import logging
+import os
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+JOB_STREAM_HEARTBEAT = float(os.getenv("IMAGE_JOB_STREAM_HEARTBEAT", "15"))
+# Queued jobs have no client waiting on the socket, so they wait for an upstream slot instead of failing fast
+JOB_UPSTREAM_WAIT = float(os.getenv("IMAGE_JOB_UPSTREAM_WAIT", "120"))
+
 class ImageRequest(BaseModel):
     prompt: str = Field(..., min_length=3, max_length=500, description="Text prompt for image generation")
     width: Optional[int] = Field(1024, ge=256, le=2048, description="Image width")
     height: Optional[int] = Field(1024, ge=256, le=2048, description="Image height") 
     steps: Optional[int] = Field(20, ge=10, le=50, description="Generation steps")
     guidance: Optional[float] = Field(7.5, ge=1.0, le=20.0, description="Guidance scale")
+    use_cache: bool = Field(True, description="Serve an earlier identical generation when available")
 
-@router.post("", summary="Generate image using MCP Flux server")
-async def generate_image(
-    req: ImageRequest, 
-    db: Session = Depends(get_db), 
-    token: str = Depends(oauth2_scheme)
-):
-    """
-    Generate image using MCP Flux ImageGen server with fallback
-    """
-    user_id = int(decode_token(token))
-    
-    if not req.prompt.strip():
-        raise HTTPException(status_code=400, detail="Image prompt cannot be empty")
-    
+async def run_generation(req: ImageRequest, upstream_wait: Optional[float] = None):
+    """Generate holding one of the global upstream slots, waiting at most `upstream_wait` for it"""
+    async with upstream_slots.slot(upstream_wait):
+        return await generate_upstream(req)
+
+async def generate_upstream(req: ImageRequest):
+    """Generate via MCP, then Pollinations; returns (image_data, generation_method)"""
     image_data = {}
     generation_method = "unknown"
     
@@ -40,13 +48,14 @@ async def generate_image(
         # Try MCP image generation first
         logger.info(f"Attempting MCP image generation for: {req.prompt[:50]}...")
         
-        image_data = await image_client.generate_image(
-            prompt=req.prompt,
-            width=req.width,
-            height=req.height,
-            steps=req.steps,
-            guidance=req.guidance
-        )
+        with stage_timer("image", "mcp_call"):
+            image_data = await image_client.generate_image(
+                prompt=req.prompt,
+                width=req.width,
+                height=req.height,
+                steps=req.steps,
+                guidance=req.guidance
+            )
         generation_method = "mcp"
         logger.info(f"MCP image generation successful")
         
@@ -55,7 +64,8 @@ async def generate_image(
         
         try:
             # Fallback to Pollinations API
-            image_data = fallback_image_generation(req.prompt)
+            with stage_timer("image", "fallback_call"):
+                image_data = await fallback_image_generation(req.prompt)
             generation_method = "fallback"
             logger.info(f"Fallback image generation successful")
             
@@ -66,12 +76,55 @@ async def generate_image(
                 detail="Image generation service temporarily unavailable"
             )
     
+    # Inline base64 goes to the blob store; history and responses keep a reference
+    image_data = dict(image_data)
+    inline = image_data.pop("image_data", None)
+    raw = decode_base64_image(inline) if isinstance(inline, str) else None
+    if raw:
+        with stage_timer("image", "blob_store"):
+            image_data["image"] = await store_image(raw)
+    
+    return image_data, generation_method
+
+async def cached_generation(req: ImageRequest, upstream_wait: Optional[float] = None):
+    """Serve an identical earlier generation or run one coalesced upstream call.
+
+    Returns (image_data, generation_method, cache_hit). With `use_cache` off the
+    lookup is skipped, but the fresh result still replaces the cached one.
+    """
+    cache_key = image_cache_key(req.prompt, req.width, req.height, req.steps, req.guidance)
+    if IMAGE_CACHE_ENABLED and req.use_cache:
+        cached = image_cache.get(cache_key)
+        blob = cached and cached["image_data"].get("image")
+        if blob and not blob_store.exists(blob["sha256"]):
+            # The store was cleared under us; regenerate rather than hand out a dead link
+            image_cache.delete(cache_key)
+            cached = None
+        if cached is not None:
+            logger.info(f"Image cache hit for: {req.prompt[:50]}")
+            return cached["image_data"], cached["generation_method"], True
+    
+    # Identical concurrent requests share one upstream generation
+    image_data, generation_method = await image_flight.do(cache_key, lambda: run_generation(req, upstream_wait))
+    if IMAGE_CACHE_ENABLED and (image_data.get("image_url") or image_data.get("image")):
+        image_cache.set(
+            cache_key,
+            {"image_data": image_data, "generation_method": generation_method},
+            size=(image_data.get("image") or {}).get("size", 0) + 1024,
+        )
+    return image_data, generation_method, False
+
+def build_image_payload(req: ImageRequest, image_data: dict, generation_method: str, cache_hit: bool) -> dict:
     # Normalize response format
-    normalized_data = {
+    image_ref = image_data.get("image")  # blob store reference, when the image came inline
+    return {
         "prompt": req.prompt,
-        "image_url": image_data.get("image_url"),
-        "image_data": image_data.get("image_data"),  # base64 if available
+        "image_url": image_data.get("image_url") or (image_ref or {}).get("url"),
+        "image": image_ref,
+        "width": (image_ref or {}).get("width") or req.width,
+        "height": (image_ref or {}).get("height") or req.height,
         "generation_method": generation_method,
+        "cache_hit": cache_hit,
         "metadata": {
             **image_data.get("metadata", {}),
             "generation_id": image_data.get("generation_id"),
@@ -83,6 +136,14 @@ async def generate_image(
             }
         }
     }
+
+async def generate_and_save(
+    db: AsyncSession, user_id: int, req: ImageRequest, uid: str, upstream_wait: Optional[float] = None
+) -> dict:
+    """Run one generation, record it in history and return the API response"""
+    image_data, generation_method, cache_hit = await cached_generation(req, upstream_wait)
+    
+    normalized_data = build_image_payload(req, image_data, generation_method, cache_hit)
     
     # Validate that we got an image URL
     if not normalized_data["image_url"]:
@@ -92,28 +153,94 @@ async def generate_image(
         )
     
     # Save to database
-    try:
-        item = HistoryItem(
-            item_type="image", 
-            query=req.prompt, 
-            data=normalized_data, 
-            user_id=user_id
-        )
-        db.add(item)
-        db.commit()
-        db.refresh(item)
-        
-        logger.info(f"Saved image history item {item.id}")
-        
-    except Exception as db_error:
-        logger.error(f"Failed to save image history: {db_error}")
-        # Don't fail the request if we can't save to DB
-        db.rollback()
+    saved = await save_history(db, user_id, "image", req.prompt, normalized_data, uid=uid)
     
     return {
-        "id": item.id if 'item' in locals() else None,
+        "id": saved.id,
+        "uid": saved.uid,
         "prompt": req.prompt,
         "image_url": normalized_data["image_url"],
+        "image": normalized_data["image"],
+        "width": normalized_data["width"],
+        "height": normalized_data["height"],
         "generation_method": generation_method,
+        "cache_hit": cache_hit,
         "metadata": normalized_data["metadata"]
-    }
\ No newline at end of file
+    }
+
+@router.post(
+    "",
+    summary="Generate image using MCP Flux server",
+    response_class=FastJSONResponse,
+    dependencies=[Depends(image_limiter)],
+)
+async def generate_image(
+    req: ImageRequest, 
+    db: AsyncSession = Depends(get_db), 
+    user: User = Depends(get_current_user),
+    x_request_id: Optional[str] = Header(None, description="Client-generated UUID used as the history uid")
+):
+    """
+    Generate image using MCP Flux ImageGen server with fallback
+    """
+    if not req.prompt.strip():
+        raise HTTPException(status_code=400, detail="Image prompt cannot be empty")
+    
+    return FastJSONResponse(await generate_and_save(db, user.id, req, new_history_uid(x_request_id)))
+
+@router.post("/jobs", status_code=202, summary="Queue an image generation job", dependencies=[Depends(image_limiter)])
+async def create_image_job(
+    req: ImageRequest,
+    user: User = Depends(get_current_user),
+    x_request_id: Optional[str] = Header(None, description="Client-generated UUID used as the job id and history uid")
+):
+    """
+    Queue the generation and return immediately. Poll `GET /image/jobs/{job_id}`
+    or stream `GET /image/jobs/{job_id}/stream`; the finished job's `result` is
+    the same body `POST /image` returns. Resubmitting with the same
+    `X-Request-ID` returns the existing job.
+    """
+    if not req.prompt.strip():
+        raise HTTPException(status_code=400, detail="Image prompt cannot be empty")
+    user_id = user.id
+    
+    async def run(job_id: str):
+        # Jobs outlive the request, so they open their own session
+        async with SessionLocal() as db:
+            return await generate_and_save(db, user_id, req, job_id, JOB_UPSTREAM_WAIT)
+    
+    job = image_jobs.submit(new_history_uid(x_request_id), user_id, run)
+    return job.snapshot()
+
+def get_job_or_404(job_id: str, user_id: int):
+    job = image_jobs.get(job_id, user_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@router.get("/jobs/{job_id}", summary="Get image generation job status")
+async def get_image_job(job_id: str, user_id: int = Depends(get_current_user_id)):
+    return get_job_or_404(job_id, user_id).snapshot()
+
+@router.get("/jobs/{job_id}/stream", summary="Stream image generation job status as Server-Sent Events")
+async def stream_image_job(job_id: str, user_id: int = Depends(get_current_user_id)):
+    """
+    Emits a `status` event with the job snapshot now and on every change, and
+    closes after the `succeeded` or `failed` snapshot.
+    """
+    job = get_job_or_404(job_id, user_id)
+    
+    async def events():
+        while True:
+            yield sse_event("status", job.snapshot())
+            if job.done:
+                return
+            # Comment frames keep idle proxies from closing a long wait
+            while not await job.wait_changed(JOB_STREAM_HEARTBEAT):
+                yield ": keep-alive\n\n"
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
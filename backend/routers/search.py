@@ -1,29 +1,66 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
-from sqlalchemy.orm import Session
-from backend.database import get_db
-from backend.models import HistoryItem
-from backend.utils import decode_token, oauth2_scheme
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Header
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.database import get_db, SessionLocal
+from backend.history import save_history, save_history_batch, new_history_uid
+from backend.models import User
+from backend.utils import get_current_user, sse_event
 from backend.mcp_clients import search_client, fallback_search
+from backend.cache import search_cache, search_cache_key, SEARCH_CACHE_ENABLED
+from backend.singleflight import search_flight
+from backend.hedging import search_hedge
+from backend.metrics import stage_timer
+from backend.ratelimit import search_limiter, upstream_slots
+from backend.responses import FastJSONResponse
+from pydantic import BaseModel, Field
+from typing import Optional, List
 import asyncio
 import logging
+import math
+import os
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
-@router.get("", summary="Search the web using MCP DuckDuckGo server")
-async def search(
-    q: str, 
-    max_results: int = 5,
-    db: Session = Depends(get_db), 
-    token: str = Depends(oauth2_scheme)
-):
-    """
-    Perform web search using MCP DuckDuckGo server with fallback
-    """
-    user_id = int(decode_token(token))
-    
-    if not q.strip():
-        raise HTTPException(status_code=400, detail="Search query cannot be empty")
+BATCH_MAX_QUERIES = int(os.getenv("SEARCH_BATCH_MAX_QUERIES", "500"))
+BATCH_DEFAULT_CONCURRENCY = int(os.getenv("SEARCH_BATCH_CONCURRENCY", "8"))
+BATCH_MAX_CONCURRENCY = int(os.getenv("SEARCH_BATCH_MAX_CONCURRENCY", "32"))
+BATCH_DEFAULT_TIMEOUT = float(os.getenv("SEARCH_BATCH_TIMEOUT", "10"))
+
+def normalize_result(r):
+    return {
+        "title": r.get("title", "No title"),
+        "body": r.get("body", r.get("snippet", "No description")),
+        "href": r.get("href", r.get("url", "#"))
+    }
+
+def normalize_results(results):
+    return [normalize_result(r) for r in results]
+
+async def fetch_results(q: str, max_results: int, mcp_timeout: Optional[float] = None):
+    """Run the upstream search holding one of the global upstream slots"""
+    # Cache hits and coalesced waiters never get here, so only real upstream calls hold a slot
+    async with upstream_slots.slot():
+        return await fetch_upstream(q, max_results, mcp_timeout)
+
+async def fetch_upstream(q: str, max_results: int, mcp_timeout: Optional[float] = None):
+    """Run the upstream search (MCP, then fallback) and return (normalized_results, search_method)"""
+    if search_hedge.enabled:
+        # Fire the fallback too if MCP is slower than usual; first answer wins
+        try:
+            with stage_timer("search", "hedged_call"):
+                results, used_fallback = await search_hedge.race(
+                    lambda: asyncio.wait_for(search_client.search(q, max_results), mcp_timeout),
+                    lambda: fallback_search(q, max_results),
+                )
+        except Exception as e:
+            logger.error(f"Both MCP and fallback search failed: {e}")
+            raise HTTPException(
+                status_code=500, 
+                detail="Search service temporarily unavailable"
+            )
+        with stage_timer("search", "normalize"):
+            return normalize_results(results), "fallback" if used_fallback else "mcp"
     
     results = []
     search_method = "unknown"
@@ -31,7 +68,8 @@ async def search(
     try:
         # Try MCP search first
         logger.info(f"Attempting MCP search for: {q}")
-        results = await search_client.search(q, max_results)
+        with stage_timer("search", "mcp_call"):
+            results = await asyncio.wait_for(search_client.search(q, max_results), mcp_timeout)
         search_method = "mcp"
         logger.info(f"MCP search successful, got {len(results)} results")
         
@@ -40,7 +78,8 @@ async def search(
         
         try:
             # Fallback to direct DuckDuckGo search
-            results = fallback_search(q, max_results)
+            with stage_timer("search", "fallback_call"):
+                results = await fallback_search(q, max_results)
             search_method = "fallback"
             logger.info(f"Fallback search successful, got {len(results)} results")
             
@@ -51,47 +90,240 @@ async def search(
                 detail="Search service temporarily unavailable"
             )
     
-    # Normalize results format
-    normalized_results = []
-    for r in results:
-        normalized_results.append({
-            "title": r.get("title", "No title"),
-            "body": r.get("body", r.get("snippet", "No description")),
-            "href": r.get("href", r.get("url", "#"))
-        })
+    with stage_timer("search", "normalize"):
+        return normalize_results(results), search_method
+
+async def cached_search(q: str, max_results: int, mcp_timeout: Optional[float] = None):
+    """Serve from the result cache or run one coalesced upstream search.
+
+    Returns (normalized_results, search_method, cache_hit).
+    """
+    with stage_timer("search", "cache_lookup"):
+        cache_key = search_cache_key(q, max_results)
+        cached = search_cache.get(cache_key) if SEARCH_CACHE_ENABLED else None
+    if cached is not None:
+        logger.info(f"Search cache hit for: {q}")
+        return cached["results"], cached["search_method"], True
+    
+    # Identical concurrent searches share one upstream call
+    normalized_results, search_method = await search_flight.do(
+        cache_key, lambda: fetch_results(q, max_results, mcp_timeout)
+    )
+    # Empty result sets are usually transient upstream hiccups, so don't pin them
+    if SEARCH_CACHE_ENABLED and normalized_results:
+        search_cache.set(cache_key, {"results": normalized_results, "search_method": search_method})
+    return normalized_results, search_method, False
+
+def build_payload(normalized_results, search_method: str, cache_hit: bool, max_results: int):
+    return {
+        "results": normalized_results,
+        "search_method": search_method,
+        "cache_hit": cache_hit,
+        "query_metadata": {
+            "max_results": max_results,
+            "results_count": len(normalized_results)
+        }
+    }
+
+@router.get(
+    "",
+    summary="Search the web using MCP DuckDuckGo server",
+    response_class=FastJSONResponse,
+    dependencies=[Depends(search_limiter)],
+)
+async def search(
+    q: str, 
+    max_results: int = 5,
+    db: AsyncSession = Depends(get_db), 
+    user: User = Depends(get_current_user),
+    x_request_id: Optional[str] = Header(None, description="Client-generated UUID used as the history uid")
+):
+    """
+    Perform web search using MCP DuckDuckGo server with fallback
+    """
+    user_id = user.id
+    
+    if not q.strip():
+        raise HTTPException(status_code=400, detail="Search query cannot be empty")
+    
+    normalized_results, search_method, cache_hit = await cached_search(q, max_results)
     
     # Save to database
-    try:
-        payload = {
+    payload = build_payload(normalized_results, search_method, cache_hit, max_results)
+    saved = await save_history(db, user_id, "search", q, payload, uid=new_history_uid(x_request_id))
+    
+    return FastJSONResponse({
+        "id": saved.id,
+        "uid": saved.uid,
+        "query": q,
+        "results": normalized_results,
+        "search_method": search_method,
+        "cache_hit": cache_hit,
+        "total_results": len(normalized_results)
+    })
+
+class SearchBatchRequest(BaseModel):
+    queries: List[str] = Field(..., min_length=1, max_length=BATCH_MAX_QUERIES, description="Queries to run")
+    max_results: int = Field(5, ge=1, le=50, description="Results per query")
+    concurrency: int = Field(BATCH_DEFAULT_CONCURRENCY, ge=1, le=BATCH_MAX_CONCURRENCY, description="Queries in flight at once")
+    timeout: float = Field(BATCH_DEFAULT_TIMEOUT, gt=0, le=120, description="Per-query MCP timeout (seconds) before falling back")
+
+@router.post("/batch", summary="Run many searches concurrently", response_class=FastJSONResponse)
+async def search_batch(
+    req: SearchBatchRequest,
+    db: AsyncSession = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    """
+    Fan queries out concurrently (bounded by `concurrency`), falling back per
+    query when MCP fails or exceeds `timeout`. All history rows are written in
+    one transaction; results come back in request order, each with a status.
+    Every query takes a token from the caller's search rate limit; queries
+    past the limit fail individually with `retry_after`.
+    """
+    limit = asyncio.Semaphore(req.concurrency)
+    
+    async def run_one(q: str):
+        if not q.strip():
+            return {"status": "error", "error": "Search query cannot be empty"}
+        wait = await search_limiter.take(user.id)
+        if wait > 0:
+            return {"status": "error", "error": "Rate limit exceeded", "retry_after": math.ceil(wait)}
+        async with limit:
+            try:
+                normalized_results, search_method, cache_hit = await cached_search(q, req.max_results, req.timeout)
+            except HTTPException as e:
+                return {"status": "error", "error": e.detail}
+            except Exception as e:
+                logger.error(f"Batch search failed for {q!r}: {e}")
+                return {"status": "error", "error": "Search failed"}
+        return {
+            "status": "ok",
             "results": normalized_results,
             "search_method": search_method,
-            "query_metadata": {
-                "max_results": max_results,
-                "results_count": len(normalized_results)
-            }
+            "cache_hit": cache_hit,
+            "total_results": len(normalized_results),
         }
+    
+    outcomes = await asyncio.gather(*(run_one(q) for q in req.queries))
+    
+    # One transaction for every successful query's history row
+    rows = [
+        (q, build_payload(o["results"], o["search_method"], o["cache_hit"], req.max_results))
+        for q, o in zip(req.queries, outcomes) if o["status"] == "ok"
+    ]
+    saved = iter(await save_history_batch(db, user.id, "search", rows))
+    
+    items = []
+    for q, o in zip(req.queries, outcomes):
+        item = {"query": q, **o}
+        if o["status"] == "ok":
+            record = next(saved)
+            item["id"], item["uid"] = record.id, record.uid
+        items.append(item)
+    
+    return FastJSONResponse({
+        "items": items,
+        "succeeded": sum(1 for o in outcomes if o["status"] == "ok"),
+        "failed": sum(1 for o in outcomes if o["status"] != "ok"),
+    })
+
+@router.get("/stream", summary="Stream search progress and results as Server-Sent Events", dependencies=[Depends(search_limiter)])
+async def search_stream(
+    q: str,
+    max_results: int = 5,
+    user: User = Depends(get_current_user),
+    x_request_id: Optional[str] = Header(None, description="Client-generated UUID used as the history uid")
+):
+    """
+    Same search as `GET /search`, streamed as `text/event-stream`:
+
+    - `method` when a source is tried (`cache`, `mcp`, `fallback`)
+    - `fallback` with the reason when MCP fails and the fallback takes over
+    - `result` for each result, once the source has answered
+    - `summary` with the history id/uid once the row is saved (both null if it could not be)
+    - `error` if every source fails, or with `retry_after` when the upstreams are at capacity
+
+    Neither the MCP tool nor the fallback API returns partial results, so the
+    `result` events arrive together after the source answers. The gain is in
+    seeing which source is being tried and when it falls back, not in an
+    earlier first result.
+    """
+    if not q.strip():
+        raise HTTPException(status_code=400, detail="Search query cannot be empty")
+    uid = new_history_uid(x_request_id)
+    
+    def busy_event(e: HTTPException) -> str:
+        # Every upstream slot is busy; the client should back off and retry
+        return sse_event("error", {"detail": e.detail, "retry_after": int(e.headers["Retry-After"])})
+    
+    async def events():
+        cache_key = search_cache_key(q, max_results)
+        cached = search_cache.get(cache_key) if SEARCH_CACHE_ENABLED else None
+        cache_hit = cached is not None
+        normalized_results = []
         
-        item = HistoryItem(
-            item_type="search", 
-            query=q, 
-            data=payload, 
-            user_id=user_id
-        )
-        db.add(item)
-        db.commit()
-        db.refresh(item)
-        
-        logger.info(f"Saved search history item {item.id}")
+        if cache_hit:
+            search_method = cached["search_method"]
+            yield sse_event("method", {"search_method": "cache"})
+            for i, r in enumerate(cached["results"]):
+                normalized_results.append(r)
+                yield sse_event("result", {"index": i, **r})
+        else:
+            # A slot is held only while an upstream call is in flight, never
+            # while frames are written, so a slow reader can't pin one
+            search_method = "mcp"
+            yield sse_event("method", {"search_method": "mcp"})
+            mcp_error = None
+            try:
+                async with upstream_slots.slot():
+                    results = await search_client.search(q, max_results)
+            except HTTPException as e:
+                yield busy_event(e)
+                return
+            except Exception as e:
+                mcp_error = e
+            if mcp_error is not None:
+                logger.warning(f"MCP search failed: {mcp_error}, falling back to direct search")
+                search_method = "fallback"
+                yield sse_event("fallback", {"search_method": "fallback", "reason": str(mcp_error) or type(mcp_error).__name__})
+                try:
+                    async with upstream_slots.slot():
+                        results = await fallback_search(q, max_results)
+                except HTTPException as e:
+                    yield busy_event(e)
+                    return
+                except Exception as fallback_error:
+                    logger.error(f"Both MCP and fallback search failed: {fallback_error}")
+                    yield sse_event("error", {"detail": "Search service temporarily unavailable"})
+                    return
+            for i, r in enumerate(results):
+                result = normalize_result(r)
+                normalized_results.append(result)
+                yield sse_event("result", {"index": i, **result})
+            if SEARCH_CACHE_ENABLED and normalized_results:
+                search_cache.set(cache_key, {"results": normalized_results, "search_method": search_method})
         
-    except Exception as db_error:
-        logger.error(f"Failed to save search history: {db_error}")
-        # Don't fail the request if we can't save to DB
-        db.rollback()
+        # The request's DB session is gone once streaming starts, so use our own
+        payload = build_payload(normalized_results, search_method, cache_hit, max_results)
+        # The 200 and the results are already sent, so a failed save can only be reported in the summary
+        saved_id = saved_uid = None
+        try:
+            async with SessionLocal() as db:
+                saved_id, saved_uid = await save_history(db, user.id, "search", q, payload, uid=uid)
+        except HTTPException as e:
+            logger.warning(f"Streamed search for {q!r} was not saved: {e.detail}")
+        yield sse_event("summary", {
+            "id": saved_id,
+            "uid": saved_uid,
+            "query": q,
+            "search_method": search_method,
+            "cache_hit": cache_hit,
+            "total_results": len(normalized_results),
+        })
     
-    return {
-        "id": item.id if 'item' in locals() else None,
-        "query": q,
-        "results": normalized_results,
-        "search_method": search_method,
-        "total_results": len(normalized_results)
-    }
\ No newline at end of file
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
\ No newline at end of file
@@ -0,0 +1,111 @@
+# backend/tests/conftest.py
+"""Shared fixtures: the app on a throwaway SQLite database, against local stub upstreams.
+
+Settings are read from the environment when each module is imported, so they
+are set here, before any test module imports the app. The stub servers'
+ports are picked up front for the same reason.
+"""
+import os
+import tempfile
+import uuid
+
+import pytest
+
+from backend.benchmarks.stubs import Faults, StubServer, duckduckgo_app, free_port, mcp_app
+
+_TMP = tempfile.mkdtemp(prefix="aigen-tests-")
+MCP_PORT = free_port()
+DDG_PORT = free_port()
+
+os.environ.update({
+    "DATABASE_URL": f"sqlite+aiosqlite:///{os.path.join(_TMP, 'test.db')}",
+    "BLOB_STORE_DIR": os.path.join(_TMP, "blobs"),
+    "MCP_SEARCH_URL": f"http://127.0.0.1:{MCP_PORT}/mcp",
+    "MCP_IMAGE_URL": f"http://127.0.0.1:{MCP_PORT}/mcp",
+    "DUCKDUCKGO_API_URL": f"http://127.0.0.1:{DDG_PORT}/",
+    "BCRYPT_ROUNDS": "4",
+    "RATE_LIMIT_ENABLED": "0",
+    "HISTORY_PURGE_INTERVAL": "0",
+    "MCP_CONNECT_TIMEOUT": "5",
+})
+
+
+@pytest.fixture(scope="session")
+def anyio_backend():
+    return "asyncio"
+
+
+class Upstreams:
+    """The running stubs; tests change their faults, which are reset after each test"""
+
+    def __init__(self):
+        self.mcp = Faults()
+        self.ddg = Faults()
+
+    def reset(self):
+        for faults in (self.mcp, self.ddg):
+            faults.__init__()
+
+
+@pytest.fixture(scope="session")
+def upstreams():
+    stubs = Upstreams()
+    with StubServer(mcp_app(faults=stubs.mcp), port=MCP_PORT), \
+            StubServer(duckduckgo_app(faults=stubs.ddg), port=DDG_PORT):
+        yield stubs
+
+
+@pytest.fixture(scope="session")
+def client(upstreams):
+    """The app with its lifespan run once for the whole session (init_db, warm-up, workers)"""
+    from fastapi.testclient import TestClient
+
+    from backend.main import app
+
+    with TestClient(app) as c:
+        yield c
+
+
+@pytest.fixture(autouse=True)
+def _reset_upstreams(request):
+    yield
+    if "upstreams" in request.fixturenames:
+        request.getfixturevalue("upstreams").reset()
+
+
+@pytest.fixture(autouse=True)
+def _fresh_breakers(request):
+    """Failures injected by one test must not leave a breaker open for the next"""
+    yield
+    if "client" in request.fixturenames:
+        from backend.mcp_clients import CircuitBreaker, image_client, search_client
+
+        for mcp_client in (search_client, image_client):
+            mcp_client.breaker = CircuitBreaker(mcp_client.breaker.name)
+
+
+def register(client, password: str = "secret123") -> dict:
+    """Register and log in a fresh user; returns the login response with auth headers added"""
+    name = f"user{uuid.uuid4().hex[:12]}"
+    r = client.post("/auth/register", json={"username": name, "email": f"{name}@example.com", "password": password})
+    assert r.status_code == 200, r.text
+    r = client.post("/auth/login", data={"username": f"{name}@example.com", "password": password})
+    assert r.status_code == 200, r.text
+    body = r.json()
+    body["headers"] = {"Authorization": f"Bearer {body['access_token']}"}
+    return body
+
+
+@pytest.fixture
+def make_user(client):
+    return lambda **kw: register(client, **kw)
+
+
+@pytest.fixture
+def user(client):
+    return register(client)
+
+
+@pytest.fixture
+def auth(user) -> dict:
+    return user["headers"]
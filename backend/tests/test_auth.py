@@ -0,0 +1,63 @@
+# backend/tests/test_auth.py
+import asyncio
+import threading
+import uuid
+
+import pytest
+from fastapi import HTTPException
+
+from backend import utils
+
+
+def test_register_and_login(client, make_user):
+    user = make_user()
+    assert user["token_type"] == "bearer"
+    assert user["user"]["username"].startswith("user")
+    r = client.get("/dashboard", headers=user["headers"])
+    assert r.status_code == 200
+    assert r.json()["items"] == []
+
+
+def test_register_rejects_duplicates(client, user):
+    email = user["user"]["email"]
+    r = client.post("/auth/register", json={"username": f"other{uuid.uuid4().hex[:8]}", "email": email, "password": "secret123"})
+    assert r.status_code == 400
+    assert r.json()["detail"] == "Email already registered"
+
+    r = client.post("/auth/register", json={"username": user["user"]["username"], "email": "fresh@example.com", "password": "secret123"})
+    assert r.status_code == 400
+    assert r.json()["detail"] == "Username already taken"
+
+
+def test_login_rejects_bad_credentials(client, user):
+    email = user["user"]["email"]
+    assert client.post("/auth/login", data={"username": email, "password": "wrong-password"}).status_code == 401
+    assert client.post("/auth/login", data={"username": "nobody@example.com", "password": "secret123"}).status_code == 401
+
+
+def test_protected_routes_need_a_token(client):
+    assert client.get("/dashboard").status_code == 401
+    assert client.get("/dashboard", headers={"Authorization": "Bearer not-a-token"}).status_code == 401
+
+
+@pytest.mark.anyio
+async def test_password_queue_counts_jobs_abandoned_by_their_caller(monkeypatch):
+    monkeypatch.setattr(utils, "_password_queue_limit", 1)
+    release = threading.Event()
+    waiter = asyncio.ensure_future(utils._run_password_op(release.wait, 5))
+    await asyncio.sleep(0.05)
+    # The client went away, but the job still holds a worker
+    waiter.cancel()
+    await asyncio.sleep(0)
+    assert utils.password_pool_stats()["pending"] == 1
+    with pytest.raises(HTTPException) as exc:
+        await utils._run_password_op(release.wait, 5)
+    assert exc.value.status_code == 503
+
+    release.set()
+    for _ in range(100):
+        if utils.password_pool_stats()["pending"] == 0:
+            break
+        await asyncio.sleep(0.01)
+    assert utils.password_pool_stats()["pending"] == 0
+    assert await utils._run_password_op(sum, [1, 2]) == 3
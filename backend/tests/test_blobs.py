@@ -0,0 +1,87 @@
+# backend/tests/test_blobs.py
+import base64
+import struct
+import uuid
+
+from backend.blobstore import store_image_bytes
+from backend.compression import history_payload
+from backend.database import SessionLocal
+from backend.migrate_blobs import migrate
+from backend.models import HistoryItem
+
+
+def png(width=3, height=2, body=b""):
+    """A PNG header with the given size; the store and /images only look at the header"""
+    return b"\x89PNG\r\n\x1a\n" + struct.pack(">I", 13) + b"IHDR" + struct.pack(">II", width, height) + body
+
+
+def test_serves_blob_with_etag_and_ranges(client):
+    data = png(body=uuid.uuid4().bytes * 8)
+    digest = store_image_bytes(data)["sha256"]
+
+    r = client.get(f"/images/{digest}")
+    assert r.status_code == 200
+    assert r.content == data
+    assert r.headers["content-type"] == "image/png"
+    assert r.headers["etag"] == f'"{digest}"'
+    assert "immutable" in r.headers["cache-control"]
+
+    r = client.get(f"/images/{digest}", headers={"Range": "bytes=0-7"})
+    assert r.status_code == 206
+    assert r.content == data[:8]
+    assert r.headers["content-range"] == f"bytes 0-7/{len(data)}"
+
+    r = client.get(f"/images/{digest}", headers={"If-None-Match": f'"{digest}"'})
+    assert r.status_code == 304
+    assert r.content == b""
+
+
+def test_unknown_or_malformed_digest_is_404(client):
+    assert client.get(f"/images/{'0' * 64}").status_code == 404
+    assert client.get("/images/not-a-digest").status_code == 404
+
+
+def test_migrate_moves_inline_image_to_the_blob_store(client, user):
+    raw = png(640, 480, uuid.uuid4().bytes)
+    legacy = {
+        "prompt": "a lighthouse",
+        "image_url": None,
+        "image_data": base64.b64encode(raw).decode(),
+        "metadata": {"requested_params": {"width": 512, "height": 512}},
+    }
+
+    async def insert():
+        async with SessionLocal() as db:
+            db.add(HistoryItem(item_type="image", query="a lighthouse", data=legacy, user_id=user["user"]["id"]))
+            await db.commit()
+
+    client.portal.call(insert)
+    stats = client.portal.call(migrate, 50, False)
+    assert stats["migrated"] >= 1 and stats["undecodable"] == 0
+
+    [item] = client.get("/dashboard", params={"item_type": "image"}, headers=user["headers"]).json()["items"]
+    data = item["data"]
+    assert "image_data" not in data
+    assert (data["width"], data["height"]) == (640, 480)
+    assert data["image"]["media_type"] == "image/png"
+    assert data["image_url"] == data["image"]["url"]
+    assert client.get(f"/images/{data['image']['sha256']}").content == raw
+
+    # Re-running finds nothing left inline in this row
+    assert client.portal.call(migrate, 50, False)["migrated"] == 0
+
+
+def test_migrate_reads_compressed_rows(client, user):
+    raw = png(body=uuid.uuid4().bytes)
+    payload = {"prompt": "a harbour", "image_data": base64.b64encode(raw).decode()}
+
+    async def insert():
+        async with SessionLocal() as db:
+            db.add(HistoryItem(item_type="image", query="a harbour", user_id=user["user"]["id"], **history_payload(payload)))
+            await db.commit()
+
+    client.portal.call(insert)
+    assert client.portal.call(migrate, 50, False)["migrated"] >= 1
+    [item] = client.get("/dashboard", params={"item_type": "image"}, headers=user["headers"]).json()["items"]
+    assert "image_data" not in item["data"]
+    assert client.get(f"/images/{item['data']['image']['sha256']}").content == raw
@@ -0,0 +1,194 @@
+# backend/tests/test_circuit_breaker.py
+import asyncio
+import time
+import uuid
+
+import pytest
+
+from backend.mcp_clients import breaker as breaker_module, search_client
+from backend.mcp_clients.breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+
+
+async def ok():
+    return "ok"
+
+
+async def boom():
+    raise RuntimeError("upstream failed")
+
+
+def make_breaker(**kw) -> CircuitBreaker:
+    settings = dict(window=10, min_calls=4, failure_rate=0.5, consecutive_failures=3, open_seconds=30, half_open_calls=1, enabled=True)
+    return CircuitBreaker("test", **{**settings, **kw})
+
+
+@pytest.mark.anyio
+async def test_opens_after_consecutive_failures():
+    breaker = make_breaker()
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            await breaker.call(boom)
+    assert breaker.state == CLOSED
+    with pytest.raises(RuntimeError):
+        await breaker.call(boom)
+    assert breaker.state == OPEN and breaker.opened == 1
+
+
+@pytest.mark.anyio
+async def test_opens_on_failure_rate_once_the_window_has_min_calls():
+    breaker = make_breaker(consecutive_failures=100)
+    for fn in (ok, boom, ok):
+        try:
+            await breaker.call(fn)
+        except RuntimeError:
+            pass
+    assert breaker.state == CLOSED  # 1 failure in 3 calls, below min_calls anyway
+    with pytest.raises(RuntimeError):
+        await breaker.call(boom)
+    assert breaker.state == OPEN  # 2 of 4 failed
+
+
+@pytest.mark.anyio
+async def test_open_breaker_rejects_without_calling():
+    breaker = make_breaker(consecutive_failures=1)
+    with pytest.raises(RuntimeError):
+        await breaker.call(boom)
+    calls = []
+
+    async def tracked():
+        calls.append(1)
+
+    with pytest.raises(CircuitOpenError):
+        await breaker.call(tracked)
+    assert calls == [] and breaker.rejected == 1
+
+
+@pytest.mark.anyio
+async def test_half_open_probe_success_closes():
+    breaker = make_breaker(consecutive_failures=1, open_seconds=0.05)
+    with pytest.raises(RuntimeError):
+        await breaker.call(boom)
+    await asyncio.sleep(0.06)
+    assert breaker.allow() and breaker.state == HALF_OPEN
+    assert await breaker.call(ok) == "ok"
+    assert breaker.state == CLOSED and breaker.failure_rate() == 0.0
+
+
+@pytest.mark.anyio
+async def test_half_open_probe_failure_reopens():
+    breaker = make_breaker(consecutive_failures=1, open_seconds=0.05)
+    with pytest.raises(RuntimeError):
+        await breaker.call(boom)
+    await asyncio.sleep(0.06)
+    with pytest.raises(RuntimeError):
+        await breaker.call(boom)
+    assert breaker.state == OPEN and breaker.opened == 2
+    with pytest.raises(CircuitOpenError):
+        await breaker.call(ok)
+
+
+@pytest.mark.anyio
+async def test_half_open_lets_one_probe_through():
+    breaker = make_breaker(consecutive_failures=1, open_seconds=0.05)
+    with pytest.raises(RuntimeError):
+        await breaker.call(boom)
+    await asyncio.sleep(0.06)
+    release = asyncio.Event()
+
+    async def slow_probe():
+        await release.wait()
+        return "ok"
+
+    probe = asyncio.ensure_future(breaker.call(slow_probe))
+    await asyncio.sleep(0)
+    with pytest.raises(CircuitOpenError):
+        await breaker.call(ok)
+    release.set()
+    assert await probe == "ok"
+    assert breaker.state == CLOSED
+
+
+def test_timeout_follows_p99(monkeypatch):
+    monkeypatch.setattr(breaker_module, "MCP_TIMEOUT_MIN", 0.1)
+    monkeypatch.setattr(breaker_module, "MCP_TIMEOUT_MULTIPLIER", 2.0)
+    monkeypatch.setattr(breaker_module, "MCP_CALL_TIMEOUT", 10.0)
+    breaker = make_breaker(window=100)
+    assert breaker.timeout() == 10.0  # too few samples: the static timeout
+    for _ in range(99):
+        breaker.record(True, 0.2)
+    breaker.record(True, 1.5)
+    assert breaker.timeout() == pytest.approx(0.4)  # p99 of 100 samples ignores the one outlier
+    for _ in range(5):
+        breaker.record(True, 1.5)
+    assert breaker.timeout() == pytest.approx(3.0)
+    for _ in range(50):
+        breaker.record(True, 8.0)
+    assert breaker.timeout() == 10.0  # clamped to the static timeout
+    for _ in range(100):
+        breaker.record(True, 0.01)
+    assert breaker.timeout() == 0.1  # and to the floor
+
+
+@pytest.mark.anyio
+async def test_slow_call_is_cut_at_the_adaptive_timeout(monkeypatch):
+    monkeypatch.setattr(breaker_module, "MCP_TIMEOUT_MIN", 0.05)
+    breaker = make_breaker(min_calls=2, consecutive_failures=100)
+    breaker.record(True, 0.02)
+    breaker.record(True, 0.02)
+
+    async def slow():
+        await asyncio.sleep(1)
+
+    start = time.monotonic()
+    with pytest.raises(Exception, match="timed out"):
+        await breaker.call(slow)
+    assert time.monotonic() - start < 0.5
+    assert breaker.timeouts == 1
+
+
+def search(client, auth):
+    r = client.get("/search", params={"q": f"breaker {uuid.uuid4().hex[:8]}", "max_results": 2}, headers=auth)
+    assert r.status_code == 200, r.text
+    return r.json()["search_method"]
+
+
+def test_search_falls_back_while_open_and_recovers(client, auth, upstreams, monkeypatch):
+    breaker = make_breaker(open_seconds=0.3)
+    monkeypatch.setattr(search_client, "breaker", breaker)
+
+    upstreams.mcp.error_rate = 1.0
+    assert [search(client, auth) for _ in range(3)] == ["fallback"] * 3
+    assert breaker.state == OPEN
+    assert client.get("/health").json()["services"]["mcp_search"] == "circuit_open"
+
+    # While open, MCP is not even tried
+    calls = upstreams.mcp.calls
+    start = time.monotonic()
+    assert search(client, auth) == "fallback"
+    assert upstreams.mcp.calls == calls
+    assert breaker.rejected == 1
+    assert time.monotonic() - start < 0.3
+
+    # The probe after open_seconds fails and reopens, then one succeeds and closes
+    time.sleep(0.35)
+    assert search(client, auth) == "fallback"
+    assert breaker.state == OPEN and upstreams.mcp.calls == calls + 1
+    upstreams.mcp.error_rate = 0.0
+    time.sleep(0.35)
+    assert search(client, auth) == "mcp"
+    assert breaker.state == CLOSED
+
+
+def test_slow_mcp_falls_back_at_the_adaptive_timeout(client, auth, upstreams, monkeypatch):
+    monkeypatch.setattr(breaker_module, "MCP_TIMEOUT_MIN", 0.2)
+    breaker = make_breaker(min_calls=3, consecutive_failures=100)
+    monkeypatch.setattr(search_client, "breaker", breaker)
+    for _ in range(3):
+        assert search(client, auth) == "mcp"
+    assert breaker.timeout() == pytest.approx(0.2)
+
+    upstreams.mcp.latency = 2.0
+    start = time.monotonic()
+    assert search(client, auth) == "fallback"
+    assert time.monotonic() - start < 1.5
+    assert breaker.timeouts == 1
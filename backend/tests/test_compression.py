@@ -0,0 +1,118 @@
+# backend/tests/test_compression.py
+import uuid
+
+import orjson
+import pytest
+from sqlalchemy import LargeBinary, select, type_coerce
+
+from backend import compression
+from backend.compress_history import RAW_DATA, RAW_DATA_Z, compress
+from backend.compression import (
+    Dictionaries, blob_dictionary, compress_json, decompress_json, history_payload, train_dictionary,
+)
+from backend.database import SessionLocal
+from backend.models import CompressionDictionary, HistoryItem
+
+
+def payload(i=0):
+    return {
+        "prompt": f"a lighthouse at dusk {i}",
+        "image_url": f"https://example.com/{uuid.uuid4().hex}.png",
+        "width": 512,
+        "height": 512,
+        "metadata": {"model": "flux", "seed": i, "requested_params": {"width": 512, "height": 512}, "note": "café ✓"},
+    }
+
+
+@pytest.fixture
+def fresh_dictionaries(monkeypatch):
+    """An empty dictionary registry, as in a process that hasn't loaded any yet"""
+    registry = Dictionaries()
+    monkeypatch.setattr(compression, "dictionaries", registry)
+    return registry
+
+
+def insert(client, user_id, **columns) -> int:
+    async def go():
+        async with SessionLocal() as db:
+            item = HistoryItem(item_type="image", query="compression", user_id=user_id, **columns)
+            db.add(item)
+            await db.commit()
+            return item.id
+    return client.portal.call(go)
+
+
+def raw_columns(client, item_id):
+    async def go():
+        async with SessionLocal() as db:
+            return (await db.execute(select(RAW_DATA, RAW_DATA_Z).where(HistoryItem.id == item_id))).one()
+    return client.portal.call(go)
+
+
+def dashboard_data(client, auth):
+    return {item["id"]: item["data"] for item in client.get("/dashboard", headers=auth).json()["items"]}
+
+
+def test_zlib_round_trip_with_and_without_a_dictionary(fresh_dictionaries):
+    samples = [orjson.dumps(payload(i)) for i in range(20)]
+    fresh_dictionaries.add(7, "zlib", train_dictionary(samples, "zlib"))
+    raw = orjson.dumps(payload(99))
+
+    plain = compress_json(raw, "zlib")
+    primed = compress_json(raw, "zlib", 7)
+    assert (blob_dictionary(plain), blob_dictionary(primed)) == (0, 7)
+    assert decompress_json(plain) == decompress_json(primed) == raw
+    assert len(primed) < len(plain)
+    # Primed streams are copied, so repeated use doesn't carry state over
+    assert decompress_json(compress_json(raw, "zlib", 7)) == raw
+
+    # A blob naming a dictionary nobody loaded can't be read
+    with pytest.raises(LookupError):
+        decompress_json(primed[:1] + (8).to_bytes(4, "big") + primed[5:])
+
+
+def test_compressed_row_reads_back_through_the_dashboard(client, user, fresh_dictionaries):
+    value = payload()
+    item_id = insert(client, user["user"]["id"], **history_payload(value))
+    legacy, blob = raw_columns(client, item_id)
+    assert legacy is None and blob_dictionary(bytes(blob)) == 0
+    assert dashboard_data(client, user["headers"])[item_id] == value
+
+
+def test_dictionary_is_loaded_on_demand(client, user, fresh_dictionaries, monkeypatch):
+    value = payload(1)
+    zdict = train_dictionary([orjson.dumps(payload(i)) for i in range(20)], "zlib")
+
+    # Another process trains a dictionary and writes a row with it
+    async def add_dictionary():
+        async with SessionLocal() as db:
+            item = CompressionDictionary(codec="zlib", data=zdict, samples=20)
+            db.add(item)
+            await db.commit()
+            return item.id
+    dict_id = client.portal.call(add_dictionary)
+    fresh_dictionaries.add(dict_id, "zlib", zdict)
+    blob = compress_json(orjson.dumps(value), "zlib", dict_id)
+    item_id = insert(client, user["user"]["id"], data_z=type_coerce(blob, LargeBinary))
+
+    # This process has never seen it
+    monkeypatch.setattr(compression, "dictionaries", Dictionaries())
+    assert dashboard_data(client, user["headers"])[item_id] == value
+    assert dict_id in compression.dictionaries
+
+
+def test_legacy_rows_switch_to_data_z(client, user, fresh_dictionaries):
+    value = payload(2)
+    item_id = insert(client, user["user"]["id"], data=value, data_z=None)
+    legacy, blob = raw_columns(client, item_id)
+    assert blob is None and orjson.loads(legacy) == value
+    assert dashboard_data(client, user["headers"])[item_id] == value
+
+    stats = client.portal.call(compress, 500, False, False)
+    assert stats["compressed"] >= 1
+    legacy, blob = raw_columns(client, item_id)
+    assert legacy is None and blob is not None
+    assert dashboard_data(client, user["headers"])[item_id] == value
+
+    # Already compressed rows are left alone on a re-run
+    assert client.portal.call(compress, 500, False, False)["compressed"] == 0
@@ -0,0 +1,57 @@
+# backend/tests/test_dashboard.py
+import uuid
+
+
+def _search(client, auth, q):
+    r = client.get("/search", params={"q": q, "max_results": 3}, headers=auth)
+    assert r.status_code == 200, r.text
+    return r.json()
+
+
+def test_search_round_trip(client, auth):
+    q = f"round trip {uuid.uuid4().hex}"
+    saved = _search(client, auth, q)
+    assert saved["search_method"] == "mcp"
+    assert saved["total_results"] == 3
+
+    items = client.get("/dashboard", headers=auth).json()["items"]
+    assert [item["id"] for item in items] == [saved["id"]]
+    item = items[0]
+    assert item["uid"] == saved["uid"]
+    assert item["query"] == q
+    assert item["data"]["results"] == saved["results"]
+
+    light = client.get("/dashboard", params={"include_data": "false"}, headers=auth).json()["items"]
+    assert "data" not in light[0]
+
+    assert client.delete(f"/dashboard/{saved['id']}", headers=auth).json() == {"ok": True}
+    assert client.get("/dashboard", headers=auth).json()["items"] == []
+    assert client.delete(f"/dashboard/{saved['id']}", headers=auth).status_code == 404
+
+
+def test_dashboard_pages_with_cursor(client, auth):
+    ids = [_search(client, auth, f"page {i} {uuid.uuid4().hex}")["id"] for i in range(5)]
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        page = client.get("/dashboard", params=params, headers=auth).json()
+        seen += [item["id"] for item in page["items"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == ids[::-1]
+
+
+def test_full_text_search(client, auth):
+    token = uuid.uuid4().hex
+    hit = _search(client, auth, f"zebra {token}")
+    _search(client, auth, f"giraffe {uuid.uuid4().hex}")
+    items = client.get("/dashboard", params={"q": f"zebra {token}"}, headers=auth).json()["items"]
+    assert [item["id"] for item in items] == [hit["id"]]
+
+
+def test_users_only_see_their_own_history(client, auth, make_user):
+    saved = _search(client, auth, f"private {uuid.uuid4().hex}")
+    other = make_user()["headers"]
+    assert client.get("/dashboard", headers=other).json()["items"] == []
+    assert client.delete(f"/dashboard/{saved['id']}", headers=other).status_code == 404
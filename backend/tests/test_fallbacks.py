@@ -0,0 +1,36 @@
+# backend/tests/test_fallbacks.py
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+SLOW_FALLBACK = 1.0
+SEARCHES = 10
+
+
+def test_health_stays_fast_while_slow_fallbacks_are_in_flight(client, auth, upstreams):
+    upstreams.mcp.error_rate = 1.0
+    upstreams.ddg.latency = SLOW_FALLBACK
+
+    def search(i):
+        r = client.get("/search", params={"q": f"slow {i} {uuid.uuid4().hex[:8]}", "max_results": 2}, headers=auth)
+        return r.status_code, r.json().get("search_method")
+
+    with ThreadPoolExecutor(SEARCHES) as pool:
+        start = time.monotonic()
+        searches = [pool.submit(search, i) for i in range(SEARCHES)]
+        health = []
+        time.sleep(0.2)
+        while time.monotonic() - start < SLOW_FALLBACK - 0.2:
+            t = time.monotonic()
+            assert client.get("/health").status_code == 200
+            health.append(time.monotonic() - t)
+            time.sleep(0.05)
+        outcomes = [f.result() for f in searches]
+        elapsed = time.monotonic() - start
+
+    assert outcomes == [(200, "fallback")] * SEARCHES
+    assert upstreams.ddg.calls == SEARCHES
+    # The fallbacks overlap instead of queueing behind each other
+    assert elapsed < SLOW_FALLBACK * 2
+    # and the event loop keeps serving other requests meanwhile
+    assert health and max(health) < 0.25
@@ -0,0 +1,93 @@
+# backend/tests/test_hedging.py
+import asyncio
+
+import pytest
+
+from backend.hedging import Hedge
+
+pytestmark = pytest.mark.anyio
+
+
+def _hedge(percentiles=None, delay=0.05):
+    """A Hedge whose primary latency is ``percentiles`` (pct -> seconds, None = too few samples)"""
+    abandoned = []
+    hedge = Hedge(
+        "test",
+        latency_percentile=lambda pct: (percentiles or {}).get(pct),
+        on_abandon=abandoned.append,
+        default_delay=delay,
+        min_delay=0.01,
+    )
+    return hedge, abandoned
+
+
+def _call(result, after=0.0, fail=False):
+    async def call():
+        await asyncio.sleep(after)
+        if fail:
+            raise RuntimeError(result)
+        return result
+    return call
+
+
+async def test_primary_wins_before_the_delay():
+    hedge, abandoned = _hedge()
+    backup_calls = []
+
+    async def backup():
+        backup_calls.append(1)
+        return "backup"
+
+    assert await hedge.race(_call("primary"), backup) == ("primary", False)
+    assert backup_calls == []
+    assert hedge.stats()["fired"] == 0
+    assert abandoned == []
+
+
+async def test_backup_wins_after_the_delay():
+    hedge, abandoned = _hedge(delay=0.05)
+
+    assert await hedge.race(_call("primary", after=1.0), _call("backup", after=0.01)) == ("backup", True)
+    stats = hedge.stats()
+    assert (stats["fired"], stats["backup_won"], stats["primary_won"]) == (1, 1, 0)
+    # The abandoned primary's time is fed back as a latency sample
+    assert len(abandoned) == 1 and abandoned[0] >= 0.05
+
+
+async def test_slow_primary_still_wins_when_backup_is_slower():
+    hedge, abandoned = _hedge(delay=0.02)
+
+    assert await hedge.race(_call("primary", after=0.05), _call("backup", after=1.0)) == ("primary", False)
+    stats = hedge.stats()
+    assert (stats["fired"], stats["backup_won"], stats["primary_won"]) == (1, 0, 1)
+    assert abandoned == []
+
+
+async def test_primary_failing_early_falls_through_without_a_hedge():
+    hedge, abandoned = _hedge(delay=0.5)
+
+    assert await hedge.race(_call("mcp down", fail=True), _call("backup")) == ("backup", True)
+    stats = hedge.stats()
+    assert (stats["calls"], stats["fired"], stats["backup_won"]) == (1, 0, 0)
+    assert abandoned == []
+
+
+async def test_both_failing_raises():
+    hedge, _ = _hedge(delay=0.02)
+
+    with pytest.raises(RuntimeError):
+        await hedge.race(_call("primary", after=0.05, fail=True), _call("backup", after=0.01, fail=True))
+    assert hedge.stats()["fired"] == 1
+
+    # A primary that fails before the delay surfaces the backup's error
+    with pytest.raises(RuntimeError, match="backup"):
+        await hedge.race(_call("primary", fail=True), _call("backup", fail=True))
+
+
+async def test_delay_is_capped_relative_to_the_median():
+    # Too few samples: the configured default
+    assert _hedge(delay=0.3)[0].delay() == 0.3
+    # The percentile is the primary's typical slow-ish latency
+    assert _hedge({0.95: 0.12, 0.5: 0.05})[0].delay() == 0.12
+    # A tail so common that p95 lands on it would delay the backup past any use
+    assert _hedge({0.95: 2.0, 0.5: 0.05})[0].delay() == pytest.approx(0.15)
@@ -0,0 +1,80 @@
+# backend/tests/test_history.py
+import uuid
+
+import pytest
+
+from backend import history
+from backend.history import history_writer
+
+
+def search(client, auth, request_id, q="history replay"):
+    r = client.get("/search", params={"q": q, "max_results": 2}, headers={**auth, "X-Request-ID": request_id})
+    assert r.status_code == 200, r.text
+    return r.json()
+
+
+def listing(client, auth):
+    return [(item["id"], item["uid"]) for item in client.get("/dashboard", headers=auth).json()["items"]]
+
+
+@pytest.fixture
+def write_behind(client, monkeypatch):
+    """History writes go through the write-behind queue for this test"""
+    monkeypatch.setattr(history, "HISTORY_WRITE_BEHIND", True)
+    client.portal.call(history_writer.start)
+    yield
+    client.portal.call(history_writer.stop)
+
+
+def test_retry_with_same_request_id_returns_the_first_row(client, auth, upstreams):
+    request_id = str(uuid.uuid4())
+    first = search(client, auth, request_id)
+    retry = search(client, auth, request_id)
+    assert first["uid"] == retry["uid"] == request_id
+    assert retry["id"] == first["id"] is not None
+    assert listing(client, auth) == [(first["id"], request_id)]
+
+
+def test_request_ids_are_scoped_to_the_user(client, make_user, upstreams):
+    request_id = str(uuid.uuid4())
+    alice, bob = make_user()["headers"], make_user()["headers"]
+    a = search(client, alice, request_id)
+    b = search(client, bob, request_id)
+    assert a["uid"] == b["uid"] == request_id
+    assert a["id"] != b["id"]
+    assert listing(client, alice) == [(a["id"], request_id)]
+    assert listing(client, bob) == [(b["id"], request_id)]
+
+
+def test_write_behind_retry_while_queued_is_written_once(client, auth, upstreams, write_behind):
+    request_id = str(uuid.uuid4())
+    replayed, failed = history_writer.replayed, history_writer.failed
+    assert search(client, auth, request_id)["uid"] == request_id
+    assert search(client, auth, request_id)["uid"] == request_id
+    client.portal.call(history_writer.stop)
+    assert [uid for _, uid in listing(client, auth)] == [request_id]
+    assert history_writer.replayed == replayed + 1
+    assert history_writer.failed == failed
+
+
+def test_write_behind_retry_after_flush_is_not_a_failure(client, auth, upstreams, write_behind):
+    request_id = str(uuid.uuid4())
+    replayed, failed = history_writer.replayed, history_writer.failed
+    search(client, auth, request_id)
+    client.portal.call(history_writer.stop)
+    client.portal.call(history_writer.start)
+    assert search(client, auth, request_id)["uid"] == request_id
+    client.portal.call(history_writer.stop)
+    assert [uid for _, uid in listing(client, auth)] == [request_id]
+    assert history_writer.replayed == replayed + 1
+    assert history_writer.failed == failed
+
+
+def test_write_behind_keeps_other_users_rows_with_the_same_id(client, make_user, upstreams, write_behind):
+    request_id = str(uuid.uuid4())
+    alice, bob = make_user()["headers"], make_user()["headers"]
+    search(client, alice, request_id)
+    search(client, bob, request_id)
+    client.portal.call(history_writer.stop)
+    assert [uid for _, uid in listing(client, alice)] == [request_id]
+    assert [uid for _, uid in listing(client, bob)] == [request_id]
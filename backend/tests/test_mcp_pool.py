@@ -0,0 +1,105 @@
+# backend/tests/test_mcp_pool.py
+import asyncio
+
+import anyio
+import httpx
+import pytest
+from mcp.shared.exceptions import McpError
+from mcp.types import ErrorData
+
+from backend.benchmarks.stubs import Faults, StubServer, free_port, mcp_app
+from backend.mcp_clients.pool import MCPSessionPool, _never_sent
+
+pytestmark = pytest.mark.anyio
+
+ARGS = {"query": "pool test", "max_results": 1}
+
+
+@pytest.fixture
+def stub():
+    faults = Faults()
+    port = free_port()
+    server = StubServer(mcp_app(faults=faults), port=port)
+    with server:
+        yield faults, server, port
+
+
+def test_only_unsent_failures_count_as_stale():
+    assert _never_sent(httpx.ConnectError("refused"))
+    assert _never_sent(anyio.BrokenResourceError())
+    assert _never_sent(ExceptionGroup("transport", [httpx.ConnectError("refused")]))
+    assert _never_sent(McpError(ErrorData(code=32600, message="Session terminated")))
+    assert not _never_sent(httpx.ReadError("reset"))
+    assert not _never_sent(httpx.ReadTimeout("slow"))
+    assert not _never_sent(ExceptionGroup("transport", [httpx.ConnectError("refused"), httpx.ReadError("reset")]))
+    assert not _never_sent(McpError(ErrorData(code=-32603, message="tool blew up")))
+    assert not _never_sent(None)
+
+
+async def test_stale_session_is_retried_once(stub):
+    faults, server, port = stub
+    pool = MCPSessionPool(f"http://127.0.0.1:{port}/mcp", name="test", size=1, min_idle=1)
+    await pool.warm()
+    # The server restarts and forgets every session; the pooled one is now stale
+    server.__exit__()
+    with StubServer(mcp_app(faults=faults), port=port):
+        await asyncio.sleep(0.2)
+        result = await pool.call_tool("duckduckgo_search", ARGS)
+        assert not result.isError
+        assert pool.stale_retries == 1
+        assert faults.calls == 1
+        await pool.close()
+
+
+async def test_tool_errors_are_not_retried(stub):
+    faults, _, port = stub
+    faults.error_rate = 1.0
+    pool = MCPSessionPool(f"http://127.0.0.1:{port}/mcp", name="test", size=1)
+    result = await pool.call_tool("duckduckgo_search", ARGS)
+    assert result.isError
+    assert faults.calls == 1
+    assert pool.stale_retries == 0
+    await pool.close()
+
+
+async def test_timed_out_calls_are_not_retried(stub):
+    faults, _, port = stub
+    pool = MCPSessionPool(f"http://127.0.0.1:{port}/mcp", name="test", size=1)
+    await pool.warm()
+    faults.latency = 1.0
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(pool.call_tool("duckduckgo_search", ARGS), 0.3)
+    await asyncio.sleep(0.2)
+    assert faults.calls == 1
+    assert pool.stale_retries == 0
+    await pool.close()
+    assert not pool._discards
+
+
+async def test_warm_up_alongside_traffic_stays_within_size(stub):
+    _, _, port = stub
+    pool = MCPSessionPool(f"http://127.0.0.1:{port}/mcp", name="test", size=2, min_idle=2)
+    borrowed, done = asyncio.Event(), asyncio.Event()
+
+    async def borrow():
+        async with pool.session():
+            borrowed.set()
+            await done.wait()
+
+    # Traffic holds one session while warm-up wants two idle ones
+    task = asyncio.create_task(borrow())
+    await borrowed.wait()
+    await pool.warm()
+    assert pool.open_count == 2
+    assert pool.stats()["idle"] == 1
+
+    # Every slot busy: warm-up opens nothing
+    async with pool.session():
+        await pool.warm()
+        assert pool.open_count == 2
+    done.set()
+    await task
+    assert pool.connects == 2
+    assert await pool.warm() == 2
+    assert pool.connects == 2
+    await pool.close()
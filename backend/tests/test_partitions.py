@@ -0,0 +1,115 @@
+# backend/tests/test_partitions.py
+"""PostgreSQL partitioning. Skipped unless TEST_POSTGRES_URL names a throwaway
+database; the tests wipe and rebuild its public schema."""
+import os
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, insert, select, text
+from sqlalchemy.exc import IntegrityError
+
+from backend import partitions
+from backend.database import Base, to_sync_url
+from backend.models import HistoryItem, HistoryResult, SearchResult, User
+
+TEST_POSTGRES_URL = os.getenv("TEST_POSTGRES_URL")
+
+pytestmark = pytest.mark.skipif(not TEST_POSTGRES_URL, reason="TEST_POSTGRES_URL is not set")
+
+
+@pytest.fixture
+def pg():
+    engine = create_engine(to_sync_url(TEST_POSTGRES_URL))
+    with engine.begin() as conn:
+        conn.execute(text("DROP SCHEMA public CASCADE"))
+        conn.execute(text("CREATE SCHEMA public"))
+        Base.metadata.create_all(conn)
+        conn.execute(insert(User.__table__), [
+            {"id": 1, "username": "alice", "email": "alice@example.com", "hashed_password": "x"},
+            {"id": 2, "username": "bob", "email": "bob@example.com", "hashed_password": "x"},
+        ])
+    yield engine
+    engine.dispose()
+
+
+def add(conn, user_id: int, uid: str, created_at: datetime) -> int:
+    return conn.execute(
+        insert(HistoryItem.__table__).returning(HistoryItem.__table__.c.id),
+        {"uid": uid, "item_type": "search", "query": "q", "user_id": user_id, "created_at": created_at},
+    ).scalar_one()
+
+
+def test_history_is_partitioned_with_months_ahead(pg):
+    with pg.begin() as conn:
+        assert partitions.is_partitioned(conn)
+        months = [month for _, month in partitions.month_partitions(conn)]
+        assert len(months) == partitions.HISTORY_PARTITION_MONTHS_AHEAD + 1
+
+
+def test_uid_is_unique_per_user_across_partitions(pg):
+    uid = str(uuid.uuid4())
+    now = datetime.utcnow()
+    with pg.begin() as conn:
+        add(conn, 1, uid, now)
+        add(conn, 2, uid, now)  # another user's id is theirs to use
+    # Same user, different month: different partition, still a duplicate
+    with pytest.raises(IntegrityError):
+        with pg.begin() as conn:
+            add(conn, 1, uid, now - timedelta(days=40))
+    with pytest.raises(IntegrityError):
+        with pg.begin() as conn:
+            add(conn, 1, uid, now)
+    # Deleting the row frees its uid
+    with pg.begin() as conn:
+        conn.execute(text("DELETE FROM history WHERE user_id = 1"))
+        add(conn, 1, uid, now)
+
+
+def test_new_partition_takes_over_rows_in_default(pg):
+    far = datetime.utcnow() + timedelta(days=400)  # past the months made ahead
+    uid = str(uuid.uuid4())
+    with pg.begin() as conn:
+        row_id = add(conn, 1, uid, far)
+        result_id = conn.execute(
+            insert(SearchResult.__table__).returning(SearchResult.__table__.c.id),
+            {"digest": "d" * 64, "title": "t", "body": "b", "href": "h"},
+        ).scalar_one()
+        conn.execute(insert(HistoryResult.__table__), {"history_id": row_id, "position": 0, "result_id": result_id})
+        assert conn.execute(text("SELECT count(*) FROM history_default")).scalar() == 1
+
+    with pg.begin() as conn:
+        assert partitions.ensure_partitions(conn, far.date(), far.date()) == 1
+        name = f"history_p{far:%Y%m}"
+        assert conn.execute(text("SELECT count(*) FROM history_default")).scalar() == 0
+        assert conn.execute(text(f"SELECT id FROM {name}")).scalar() == row_id
+        # Links and the uid claim survive the move, and the default partition is back
+        assert conn.execute(text("SELECT count(*) FROM history_results WHERE history_id = :id"), {"id": row_id}).scalar() == 1
+        assert conn.execute(text("SELECT to_regclass('history_default')")).scalar() is not None
+    with pytest.raises(IntegrityError):
+        with pg.begin() as conn:
+            add(conn, 1, uid, datetime.utcnow())
+
+
+def test_dropping_a_month_frees_its_uids(pg):
+    old = datetime.utcnow() - timedelta(days=120)
+    uid = str(uuid.uuid4())
+    with pg.begin() as conn:
+        partitions.ensure_partitions(conn, old.date(), old.date())
+        add(conn, 1, uid, old)
+        dropped = partitions.drop_partitions_before(conn, datetime.utcnow() - timedelta(days=60))
+        assert f"history_p{old:%Y%m}" in dropped
+        assert conn.execute(select(HistoryItem.__table__.c.id).where(HistoryItem.__table__.c.uid == uid)).first() is None
+        add(conn, 1, uid, datetime.utcnow())
+
+
+def test_unpartition_restores_the_unique_index(pg):
+    uid = str(uuid.uuid4())
+    with pg.begin() as conn:
+        add(conn, 1, uid, datetime.utcnow())
+        partitions.unpartition_history(conn)
+        assert not partitions.is_partitioned(conn)
+        assert conn.execute(text("SELECT to_regclass('history_uids')")).scalar() is None
+    with pytest.raises(IntegrityError):
+        with pg.begin() as conn:
+            add(conn, 1, uid, datetime.utcnow())
@@ -0,0 +1,98 @@
+# backend/tests/test_ratelimit.py
+import uuid
+
+import pytest
+
+from backend import ratelimit
+from backend.ratelimit import MemoryRateLimitBackend, UpstreamSlots, image_limiter, search_limiter, set_rate_limit_backend
+from backend.routers import search as search_router
+
+
+class StandInBackend(MemoryRateLimitBackend):
+    """What a shared backend would see: every bucket key the limiters take from"""
+
+    def __init__(self):
+        super().__init__()
+        self.keys = []
+
+    async def take(self, key, rate, burst, cost=1):
+        self.keys.append(key)
+        return await super().take(key, rate, burst, cost)
+
+
+@pytest.fixture
+def buckets(monkeypatch):
+    """Limits on, one token a minute so nothing refills mid-test, in a fresh stand-in backend"""
+    backend = StandInBackend()
+    previous = ratelimit._backend
+    set_rate_limit_backend(backend)
+    for limiter, burst in ((search_limiter, 2), (image_limiter, 1)):
+        monkeypatch.setattr(limiter, "enabled", True)
+        monkeypatch.setattr(limiter, "rate", 1 / 60)
+        monkeypatch.setattr(limiter, "burst", burst)
+    yield backend
+    set_rate_limit_backend(previous)
+
+
+def search(client, headers):
+    return client.get("/search", params={"q": f"limited {uuid.uuid4().hex[:8]}", "max_results": 1}, headers=headers)
+
+
+def test_search_is_limited_once_the_burst_is_spent(client, auth, upstreams, buckets):
+    assert [search(client, auth).status_code for _ in range(2)] == [200, 200]
+    r = search(client, auth)
+    assert r.status_code == 429
+    # The next token is a minute away at one a minute
+    assert 55 <= int(r.headers["Retry-After"]) <= 60
+    assert search_limiter.rejected >= 1
+
+
+def test_buckets_are_per_route_group_and_per_user(client, make_user, upstreams, buckets):
+    alice, bob = make_user(), make_user()
+    for _ in range(2):
+        assert search(client, alice["headers"]).status_code == 200
+    assert search(client, alice["headers"]).status_code == 429
+    # Alice's image bucket and Bob's search bucket are untouched
+    r = client.post("/image", json={"prompt": "a lighthouse"}, headers=alice["headers"])
+    assert r.status_code == 200, r.text
+    assert search(client, bob["headers"]).status_code == 200
+    assert client.post("/image", json={"prompt": "a lighthouse"}, headers=alice["headers"]).status_code == 429
+    alice_id, bob_id = alice["user"]["id"], bob["user"]["id"]
+    assert set(buckets.keys) == {f"search:{alice_id}", f"image:{alice_id}", f"search:{bob_id}"}
+
+
+def test_batch_takes_a_token_per_query(client, auth, upstreams, buckets):
+    queries = [f"batch {i} {uuid.uuid4().hex[:8]}" for i in range(4)]
+    r = client.post("/search/batch", json={"queries": queries, "max_results": 1}, headers=auth)
+    assert r.status_code == 200, r.text
+    body = r.json()
+    assert [item["status"] for item in body["items"]] == ["ok", "ok", "error", "error"]
+    assert body["succeeded"] == 2 and body["failed"] == 2
+    for item in body["items"]:
+        if item["status"] == "error":
+            assert item["error"] == "Rate limit exceeded" and item["retry_after"] >= 1
+    # The batch spent the bucket, so a plain search is turned away too
+    assert search(client, auth).status_code == 429
+
+
+def test_busy_upstreams_answer_429_with_retry_after(client, auth, upstreams, monkeypatch):
+    slots = UpstreamSlots(limit=0, queue_timeout=0.05)
+    monkeypatch.setattr(search_router, "upstream_slots", slots)
+    r = search(client, auth)
+    assert r.status_code == 429
+    assert int(r.headers["Retry-After"]) >= 1
+    assert slots.rejected == 1 and upstreams.mcp.calls == 0
+
+
+@pytest.mark.anyio
+async def test_upstream_retry_after_follows_slot_hold_times():
+    slots = UpstreamSlots(limit=1, queue_timeout=0.01)
+    for _ in range(3):
+        slots._hold_times.append(4.2)
+    async with slots.slot():
+        with pytest.raises(Exception) as excinfo:
+            async with slots.slot():
+                pass
+    assert excinfo.value.status_code == 429
+    assert excinfo.value.headers["Retry-After"] == "5"
+    assert slots.in_use == 0 and slots.waiting == 0
@@ -0,0 +1,126 @@
+# backend/tests/test_result_store.py
+import uuid
+
+from sqlalchemy import func, select
+
+from backend.database import SessionLocal
+from backend.history import save_history, save_history_batch
+from backend.models import HistoryResult, SearchResult
+from backend.result_store import result_key, split_payload
+
+
+def result(name):
+    return {"title": f"{name} title", "body": f"About {name}", "href": f"https://example.com/{name}"}
+
+
+def payload(query, results, **extra):
+    return {"results": results, "query": query, "search_method": "mcp", "total_results": len(results), **extra}
+
+
+def save(client, user_id, data):
+    async def go():
+        async with SessionLocal() as db:
+            return (await save_history(db, user_id, "search", data["query"], data)).id
+    return client.portal.call(go)
+
+
+def links(client, history_id):
+    async def go():
+        async with SessionLocal() as db:
+            return (await db.execute(
+                select(HistoryResult.position, SearchResult.digest)
+                .join(SearchResult, SearchResult.id == HistoryResult.result_id)
+                .where(HistoryResult.history_id == history_id)
+                .order_by(HistoryResult.position)
+            )).all()
+    return client.portal.call(go)
+
+
+def stored_results(client, digest):
+    async def go():
+        async with SessionLocal() as db:
+            return await db.scalar(select(func.count()).select_from(SearchResult).where(SearchResult.digest == digest))
+    return client.portal.call(go)
+
+
+def dashboard_data(client, auth):
+    return {item["id"]: item["data"] for item in client.get("/dashboard", headers=auth).json()["items"]}
+
+
+def test_split_payload_only_moves_plain_results():
+    data = payload("q", [result("a"), result("b")])
+    stored, results = split_payload("search", data)
+    assert "results" not in stored and stored["query"] == "q"
+    assert results == data["results"]
+
+    scored = payload("q", [{**result("a"), "score": 0.9}])
+    assert split_payload("search", scored) == (scored, [])
+    assert split_payload("search", payload("q", [])) == (payload("q", []), [])
+    assert split_payload("image", data) == (data, [])
+
+
+def test_rows_read_back_with_results_in_order(client, user):
+    tag = uuid.uuid4().hex
+    data = payload(f"order {tag}", [result(f"{tag}-{name}") for name in ("c", "a", "b")])
+    item_id = save(client, user["user"]["id"], data)
+
+    assert [digest for _, digest in links(client, item_id)] == [result_key(r) for r in data["results"]]
+    read = dashboard_data(client, user["headers"])[item_id]
+    assert read == data
+    assert next(iter(read)) == "results"
+
+
+def test_duplicate_results_are_stored_once(client, user):
+    tag = uuid.uuid4().hex
+    shared, other = result(f"{tag}-shared"), result(f"{tag}-other")
+    rows = [
+        (f"first {tag}", payload(f"first {tag}", [shared, other, shared])),
+        (f"second {tag}", payload(f"second {tag}", [other, shared])),
+    ]
+
+    async def go():
+        async with SessionLocal() as db:
+            return [saved.id for saved in await save_history_batch(db, user["user"]["id"], "search", rows)]
+    first, second = client.portal.call(go)
+
+    assert stored_results(client, result_key(shared)) == stored_results(client, result_key(other)) == 1
+    assert [digest for _, digest in links(client, first)] == [result_key(shared), result_key(other), result_key(shared)]
+    read = dashboard_data(client, user["headers"])
+    assert read[first] == rows[0][1]
+    assert read[second] == rows[1][1]
+
+    # Saving the same result again later links the stored row rather than copying it
+    third = save(client, user["user"]["id"], payload(f"third {tag}", [shared]))
+    assert stored_results(client, result_key(shared)) == 1
+    assert dashboard_data(client, user["headers"])[third]["results"] == [shared]
+
+
+def test_other_result_shapes_stay_inline(client, user):
+    tag = uuid.uuid4().hex
+    data = payload(f"inline {tag}", [{**result(tag), "score": 0.5}, result(f"{tag}-plain")])
+    item_id = save(client, user["user"]["id"], data)
+    assert links(client, item_id) == []
+    assert stored_results(client, result_key(data["results"][1])) == 0
+    assert dashboard_data(client, user["headers"])[item_id] == data
+
+    empty = payload(f"empty {tag}", [])
+    empty_id = save(client, user["user"]["id"], empty)
+    assert links(client, empty_id) == []
+    assert dashboard_data(client, user["headers"])[empty_id] == empty
+
+
+def test_deleting_history_unlinks_its_results(client, user):
+    tag = uuid.uuid4().hex
+    shared = result(f"{tag}-shared")
+    kept = save(client, user["user"]["id"], payload(f"kept {tag}", [shared]))
+    single = save(client, user["user"]["id"], payload(f"single {tag}", [shared, result(f"{tag}-a")]))
+    bulk = save(client, user["user"]["id"], payload(f"bulk {tag}", [shared]))
+
+    assert client.delete(f"/dashboard/{single}", headers=user["headers"]).json() == {"ok": True}
+    r = client.post("/dashboard/delete", json={"ids": [bulk]}, headers=user["headers"])
+    assert r.json() == {"deleted": 1}
+
+    assert links(client, single) == links(client, bulk) == []
+    # The shared result is still there for the row that kept it
+    assert stored_results(client, result_key(shared)) == 1
+    assert dashboard_data(client, user["headers"]) == {kept: payload(f"kept {tag}", [shared])}
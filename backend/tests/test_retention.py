@@ -0,0 +1,45 @@
+# backend/tests/test_retention.py
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from sqlalchemy import insert, select
+
+from backend import retention
+from backend.database import SessionLocal
+from backend.models import HistoryItem, RetentionPolicy
+
+
+class BrokenPostgres:
+    """Stands in for a PostgreSQL engine whose partition maintenance fails"""
+    dialect = SimpleNamespace(name="postgresql")
+
+    def begin(self):
+        raise RuntimeError("history_default contains rows for the new partition")
+
+
+def test_purge_runs_when_partition_maintenance_fails(client, user, monkeypatch):
+    owner = user["user"]["id"]
+
+    async def setup():
+        async with SessionLocal() as db:
+            db.add(RetentionPolicy(user_id=owner, max_age_days=30))
+            await db.execute(insert(HistoryItem), [
+                {"uid": None, "item_type": "search", "query": "expired", "user_id": owner,
+                 "created_at": datetime.utcnow() - timedelta(days=60)},
+                {"uid": None, "item_type": "search", "query": "kept", "user_id": owner,
+                 "created_at": datetime.utcnow()},
+            ])
+            await db.commit()
+
+    client.portal.call(setup)
+    monkeypatch.setattr(retention, "engine", BrokenPostgres())
+    purger = retention.HistoryPurger(interval=0, pause=0)
+    assert client.portal.call(purger.run_once)["deleted"] == 1
+    assert purger.partition_errors == 1
+    assert "partition maintenance" in purger.last_error
+
+    async def remaining():
+        async with SessionLocal() as db:
+            return (await db.execute(select(HistoryItem.query).where(HistoryItem.user_id == owner))).scalars().all()
+
+    assert client.portal.call(remaining) == ["kept"]
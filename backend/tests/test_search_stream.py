@@ -0,0 +1,82 @@
+# backend/tests/test_search_stream.py
+import json
+import uuid
+
+from fastapi import HTTPException
+
+from backend.ratelimit import UpstreamSlots
+from backend.routers import search as search_router
+
+
+def stream(client, auth, q, **params):
+    """Run /search/stream and return its events as (name, data) pairs"""
+    events = []
+    with client.stream("GET", "/search/stream", params={"q": q, "max_results": 3, **params}, headers=auth) as r:
+        assert r.status_code == 200
+        assert r.headers["content-type"].startswith("text/event-stream")
+        for frame in r.read().decode().split("\n\n"):
+            if frame.strip():
+                name, data = frame.split("\n")
+                events.append((name.removeprefix("event: "), json.loads(data.removeprefix("data: "))))
+    return events
+
+
+def query() -> str:
+    return f"stream {uuid.uuid4().hex[:8]}"
+
+
+def test_events_come_in_order(client, auth, upstreams):
+    q = query()
+    events = stream(client, auth, q)
+    names = [name for name, _ in events]
+    assert names == ["method"] + ["result"] * 3 + ["summary"]
+    assert events[0][1] == {"search_method": "mcp"}
+    assert [data["index"] for name, data in events if name == "result"] == [0, 1, 2]
+    summary = events[-1][1]
+    assert summary["search_method"] == "mcp" and summary["total_results"] == 3
+    assert summary["id"] is not None and summary["uid"]
+
+    items = client.get("/dashboard", headers=auth).json()["items"]
+    assert [(item["id"], item["query"]) for item in items] == [(summary["id"], q)]
+
+    # The same query again is served from the cache
+    cached = stream(client, auth, q)
+    assert cached[0] == ("method", {"search_method": "cache"})
+    assert cached[-1][1]["cache_hit"] is True
+
+
+def test_mcp_error_falls_back(client, auth, upstreams):
+    upstreams.mcp.error_rate = 1.0
+    events = stream(client, auth, query())
+    names = [name for name, _ in events]
+    assert names[:2] == ["method", "fallback"]
+    assert events[1][1]["search_method"] == "fallback" and events[1][1]["reason"]
+    assert names[2:] == ["result"] * 3 + ["summary"]
+    assert events[-1][1]["search_method"] == "fallback"
+
+
+def test_every_source_failing_ends_with_an_error(client, auth, upstreams):
+    upstreams.mcp.error_rate = 1.0
+    upstreams.ddg.error_rate = 1.0
+    events = stream(client, auth, query())
+    assert [name for name, _ in events] == ["method", "fallback", "error"]
+    assert "retry_after" not in events[-1][1]
+
+
+def test_exhausted_slots_send_retry_after(client, auth, upstreams, monkeypatch):
+    monkeypatch.setattr(search_router, "upstream_slots", UpstreamSlots(limit=0, queue_timeout=0.05))
+    events = stream(client, auth, query())
+    assert [name for name, _ in events] == ["method", "error"]
+    assert events[-1][1]["retry_after"] >= 1
+    assert upstreams.mcp.calls == 0
+
+
+def test_unsaved_history_still_ends_with_a_summary(client, auth, upstreams, monkeypatch):
+    async def backpressure(*args, **kwargs):
+        raise HTTPException(status_code=503, detail="History queue is full, please retry")
+
+    monkeypatch.setattr(search_router, "save_history", backpressure)
+    events = stream(client, auth, query())
+    assert [name for name, _ in events] == ["method"] + ["result"] * 3 + ["summary"]
+    assert events[-1][1]["id"] is None and events[-1][1]["uid"] is None
+    assert events[-1][1]["total_results"] == 3
@@ -1,30 +1,178 @@
 import os
+import json
+import time
+import asyncio
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from jose import jwt, JWTError
-from passlib.context import CryptContext
 from fastapi import HTTPException, status, Depends
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.cache import TTLCache
+from backend.database import get_db
+from backend.metrics import stage_timer
+from backend.models import User
 
 JWT_SECRET = os.getenv("JWT_SECRET", "dev-secret-change-me")
 JWT_ALG = "HS256"
 ACCESS_MINUTES = 60 * 12
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "60"))
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_POOL_SIZE = int(os.getenv("PASSWORD_POOL_SIZE", str(min(4, os.cpu_count() or 1))))
+PASSWORD_QUEUE_LIMIT = int(os.getenv("PASSWORD_QUEUE_LIMIT", "64"))
 
-pwd_ctx = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
+# passlib and jose are imported on first use (or by the startup warm-up) to keep boot fast
+_pwd_ctx = None
+
+def password_context():
+    global _pwd_ctx
+    if _pwd_ctx is None:
+        from passlib.context import CryptContext
+        # Hashes below the configured cost are flagged by needs_update and re-hashed on login
+        _pwd_ctx = CryptContext(
+            schemes=["bcrypt"],
+            deprecated="auto",
+            bcrypt__rounds=BCRYPT_ROUNDS,
+            bcrypt__min_rounds=BCRYPT_ROUNDS,
+        )
+    return _pwd_ctx
+
+def warm_auth():
+    """Import the auth libraries ahead of the first login (blocking; run in a thread)"""
+    import jose.jwt  # noqa: F401
+    password_context().hash("warm-up")
+
 def hash_password(p: str) -> str:
-    return pwd_ctx.hash(p)
+    return password_context().hash(p)
 
 def verify_password(p: str, hashed: str) -> bool:
-    return pwd_ctx.verify(p, hashed)
+    return password_context().verify(p, hashed)
+
+# bcrypt releases the GIL, so a small thread pool keeps hashing off the event loop
+_password_executor = ThreadPoolExecutor(max_workers=PASSWORD_POOL_SIZE, thread_name_prefix="password")
+_password_queue_limit = PASSWORD_QUEUE_LIMIT
+_password_pending = 0
+_password_pending_lock = threading.Lock()
+
+def configure_password_pool(size: int, queue_limit: int = None):
+    """Resize the hashing pool (used by benchmarks; call before serving traffic)"""
+    global _password_executor, _password_queue_limit
+    old = _password_executor
+    _password_executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix="password")
+    if queue_limit is not None:
+        _password_queue_limit = queue_limit
+    old.shutdown(wait=False)
+
+def _password_op_done(_):
+    global _password_pending
+    with _password_pending_lock:
+        _password_pending -= 1
+
+async def _run_password_op(fn, *args):
+    global _password_pending
+    # Reject instead of queueing without bound when a login spike outruns the pool
+    with _password_pending_lock:
+        if _password_pending >= _password_queue_limit:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Authentication is busy, please retry",
+                headers={"Retry-After": "1"},
+            )
+        _password_pending += 1
+    # Count the job until the executor is done with it, not until the caller stops
+    # waiting: a disconnected client's bcrypt run still occupies a worker
+    job = _password_executor.submit(fn, *args)
+    job.add_done_callback(_password_op_done)
+    return await asyncio.wrap_future(job)
+
+async def hash_password_async(p: str) -> str:
+    return await _run_password_op(password_context().hash, p)
+
+async def verify_password_async(p: str, hashed: str):
+    """Returns (ok, new_hash); new_hash is set when the stored hash should be upgraded"""
+    return await _run_password_op(password_context().verify_and_update, p, hashed)
+
+def password_pool_stats() -> dict:
+    return {
+        "workers": _password_executor._max_workers,
+        "pending": _password_pending,
+        "queue_limit": _password_queue_limit,
+        "bcrypt_rounds": BCRYPT_ROUNDS,
+    }
 
 def create_access_token(sub: str) -> str:
+    from jose import jwt
     payload = {"sub": sub, "exp": datetime.utcnow() + timedelta(minutes=ACCESS_MINUTES)}
     return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALG)
 
+# Verified token digest -> subject, each entry expiring at the token's exp claim
+token_cache = TTLCache(ttl=ACCESS_MINUTES * 60, max_entries=TOKEN_CACHE_SIZE, max_bytes=64 * 1024 * 1024)
+# User id -> detached User row
+user_cache = TTLCache(ttl=USER_CACHE_TTL, max_entries=USER_CACHE_SIZE, max_bytes=64 * 1024 * 1024)
+
+def _invalid_token():
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid or expired token",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
 def decode_token(token: str) -> str:
+    digest = hashlib.sha256(token.encode()).digest()
+    sub = token_cache.get(digest)
+    if sub is not None:
+        return sub
+    from jose import jwt, JWTError
     try:
         payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALG])
-        return payload.get("sub")
     except JWTError:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid or expired token")
+        raise _invalid_token()
+    sub = payload.get("sub")
+    if sub is None:
+        raise _invalid_token()
+    exp = payload.get("exp")
+    ttl = exp - time.time() if exp is not None else None
+    if ttl is None or ttl > 0:
+        token_cache.set(digest, sub, ttl=ttl)
+    return sub
+
+async def get_current_user_id(token: str = Depends(oauth2_scheme)) -> int:
+    """Subject of a valid bearer token, without touching the database"""
+    try:
+        with stage_timer("auth", "decode_token"):
+            return int(decode_token(token))
+    except ValueError:
+        raise _invalid_token()
+
+async def get_current_user(
+    user_id: int = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_db),
+) -> User:
+    """The authenticated User, served from a short-lived cache when possible"""
+    user = user_cache.get(user_id)
+    if user is not None:
+        return user
+    with stage_timer("auth", "user_lookup"):
+        user = await db.get(User, user_id)
+    if user is None:
+        raise _invalid_token()
+    db.expunge(user)
+    user_cache.set(user_id, user)
+    return user
+
+def invalidate_user(user_id: int):
+    user_cache.delete(user_id)
+
+@event.listens_for(User, "after_delete")
+def _drop_deleted_user(mapper, connection, target):
+    invalidate_user(target.id)
+
+def sse_event(event: str, data) -> str:
+    """Format one Server-Sent Events frame"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
@@ -0,0 +1,125 @@
+# backend/warmup.py
+"""Concurrent startup warm-up with a time budget, reported on /ready.
+
+Every step (database setup, each MCP handshake, loading the auth libraries)
+starts at once. Startup only waits for the ``required`` steps; the rest
+keep running in the background while the app serves traffic, and any of
+them still running when ``budget`` seconds are up is cancelled. Pools and
+libraries that weren't warmed in time are simply set up by the first
+request that needs them.
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+STARTUP_WARMUP_BUDGET = float(os.getenv("STARTUP_WARMUP_BUDGET", "20"))
+STARTUP_WARMUP_BLOCKING = os.getenv("STARTUP_WARMUP_BLOCKING", "0") in ("1", "true", "True")
+
+
+class WarmupStep:
+    def __init__(self, name: str, fn: Callable[[], Awaitable[Any]], required: bool):
+        self.name = name
+        self.fn = fn
+        self.required = required
+        self.status = "pending"
+        self.error: Optional[str] = None
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("ok", "failed", "timed_out")
+
+    async def run(self):
+        self.status = "running"
+        self.started_at = time.monotonic()
+        try:
+            # A step may report failure by returning False instead of raising
+            ok = await self.fn()
+            self.status = "failed" if ok is False else "ok"
+        except asyncio.CancelledError:
+            self.status = "timed_out"
+            raise
+        except Exception as e:
+            self.status = "failed"
+            self.error = str(e) or type(e).__name__
+            logger.error(f"Warm-up step {self.name} failed: {self.error}")
+        finally:
+            self.finished_at = time.monotonic()
+
+    def stats(self) -> Dict[str, Any]:
+        end = self.finished_at or time.monotonic()
+        return {
+            "status": self.status,
+            "required": self.required,
+            "seconds": round(end - self.started_at, 3) if self.started_at else None,
+            "error": self.error,
+        }
+
+
+class Warmup:
+    def __init__(self, budget: float = STARTUP_WARMUP_BUDGET):
+        self.budget = budget
+        self.steps: List[WarmupStep] = []
+        self._started_at: Optional[float] = None
+        self._supervisor: Optional[asyncio.Task] = None
+
+    def add(self, name: str, fn: Callable[[], Awaitable[Any]], required: bool = False):
+        # Re-adding a name replaces the step, so a restarted lifespan starts fresh
+        self.steps = [step for step in self.steps if step.name != name]
+        self.steps.append(WarmupStep(name, fn, required))
+
+    async def start(self):
+        self._started_at = time.monotonic()
+        for step in self.steps:
+            step.task = asyncio.create_task(step.run())
+        self._supervisor = asyncio.create_task(self._enforce_budget())
+
+    async def _enforce_budget(self):
+        tasks = [step.task for step in self.steps]
+        await asyncio.wait(tasks, timeout=self.budget)
+        # Required steps are never abandoned: the app can't serve without them
+        for step in self.steps:
+            if not step.required and not step.task.done():
+                step.task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        logger.info(
+            f"Warm-up finished in {time.monotonic() - self._started_at:.2f}s: "
+            + ", ".join(f"{step.name}={step.status}" for step in self.steps)
+        )
+
+    async def wait(self, required_only: bool = False):
+        """Wait for the required steps, or for every step (optional ones are bounded by the budget)"""
+        tasks = [step.task for step in self.steps if step.task and (step.required or not required_only)]
+        if tasks:
+            await asyncio.wait(tasks)
+
+    async def stop(self):
+        for step in self.steps:
+            if step.task is not None and not step.task.done():
+                step.task.cancel()
+        if self._supervisor is not None:
+            await asyncio.gather(self._supervisor, return_exceptions=True)
+
+    @property
+    def ready(self) -> bool:
+        """Required steps succeeded and nothing is still warming"""
+        return all(step.done for step in self.steps) and all(
+            step.status == "ok" for step in self.steps if step.required
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "elapsed": round(time.monotonic() - self._started_at, 3) if self._started_at else None,
+            "budget": self.budget,
+            "steps": {step.name: step.stats() for step in self.steps},
+        }
+
+
+warmup = Warmup()
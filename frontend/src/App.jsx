@@ -207,17 +207,38 @@ function ImageGen({ token, onSaved }) {
 // ---------------- Dashboard ----------------
 function Dashboard({ token, reloadFlag }) {
   const [items, setItems] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
+
+  // The API returns one page at a time; next_cursor fetches the page after it
+  const fetchPage = async (cursor) => {
+    const params = cursor ? `?cursor=${encodeURIComponent(cursor)}` : "";
+    const r = await fetch(`${API_URL}/dashboard${params}`, { headers: { Authorization: `Bearer ${token}` }});
+    return r.json();
+  };
 
   const load = async () => {
-    const r = await fetch(`${API_URL}/dashboard`, { headers: { Authorization: `Bearer ${token}` }});
-    const data = await r.json();
+    const data = await fetchPage(null);
     setItems(data.items || []);
+    setNextCursor(data.next_cursor || null);
   };
   useEffect(()=>{ load(); }, [reloadFlag]);
 
+  const loadMore = async () => {
+    setLoadingMore(true);
+    try {
+      const data = await fetchPage(nextCursor);
+      setItems(prev => [...prev, ...(data.items || [])]);
+      setNextCursor(data.next_cursor || null);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const del = async (id) => {
     await fetch(`${API_URL}/dashboard/${id}`, { method: "DELETE", headers: { Authorization: `Bearer ${token}` }});
-    load();
+    // Drop it in place so the pages already loaded stay on screen
+    setItems(prev => prev.filter(it => it.id !== id));
   };
 
   const downloadImage = async (url, name="download.png") => {
@@ -293,6 +314,15 @@ function Dashboard({ token, reloadFlag }) {
           </li>
         ))}
       </ul>
+      {nextCursor && (
+        <button
+          onClick={loadMore}
+          disabled={loadingMore}
+          className="mt-3 w-full p-2 border rounded text-gray-900 dark:text-gray-100 disabled:opacity-50"
+        >
+          {loadingMore ? "Loading…" : "Load more"}
+        </button>
+      )}
     </div>
   );
 }